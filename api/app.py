@@ -1,20 +1,93 @@
 from __future__ import annotations
 
 import base64
-from contextlib import closing
-from typing import List, Optional, Any, Dict
+from contextlib import closing, contextmanager
+import csv
+import io
+import sqlite3
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator, List, Optional, Any, Dict, Tuple
 import json
+import os
+import re
 
-from fastapi import Depends, FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi import Body, Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 try:
     # When running via `uvicorn api.app:app` (package import)
-    from api.db import get_connection, ensure_table, initialize_database
+    from api.db import (
+        DATA_DIR,
+        INSERT_SQL,
+        REBUILD_ON_STARTUP,
+        STORAGE_MODE,
+        to_row,
+        close_pool,
+        get_connection,
+        get_pool_stats,
+        ensure_table,
+        initialize_database,
+        refresh_daily_rollups,
+        rows_encoded,
+        set_connection_wrapper,
+    )
 except Exception:
     # When running file directly: `python api/app.py`
-    from db import get_connection, ensure_table, initialize_database
+    from db import (
+        DATA_DIR,
+        INSERT_SQL,
+        REBUILD_ON_STARTUP,
+        STORAGE_MODE,
+        to_row,
+        close_pool,
+        get_connection,
+        get_pool_stats,
+        ensure_table,
+        initialize_database,
+        refresh_daily_rollups,
+        rows_encoded,
+        set_connection_wrapper,
+    )
+
+try:
+    from api.cache import ResponseCache, etag_matches
+except Exception:
+    from cache import ResponseCache, etag_matches
+
+try:
+    from api.metrics import MetricsMiddleware, MetricsRegistry, render_stats
+except Exception:
+    from metrics import MetricsMiddleware, MetricsRegistry, render_stats
+
+try:
+    from api.profiling import ProfiledRoute, ProfileMiddleware
+except Exception:
+    from profiling import ProfiledRoute, ProfileMiddleware
+
+try:
+    from api import fast_json
+except Exception:
+    import fast_json
+
+from dsa.telemetry import configure_ingest_logging
+from dsa.transaction_index import TransactionIndex
+
+try:
+    from api.storage import (
+        decoded_select,
+        encode_body,
+        materialize_clauses,
+        patch_assignments,
+    )
+except Exception:
+    from storage import (
+        decoded_select,
+        encode_body,
+        materialize_clauses,
+        patch_assignments,
+    )
 
 
 # -----------------------------
@@ -42,12 +115,25 @@ def parse_basic_auth_header(request: Request) -> tuple[str, str]:
         )
 
 
+ADMIN_CREDENTIALS = ("admin", "secret")
+
+
+def is_admin_authorization(auth_header: Optional[str]) -> bool:
+    """Non-raising check of an Authorization header, for middleware."""
+    if not auth_header or not auth_header.startswith("Basic "):
+        return False
+    try:
+        decoded = base64.b64decode(auth_header.split(" ", 1)[1]).decode("utf-8")
+    except Exception:
+        return False
+    return tuple(decoded.split(":", 1)) == ADMIN_CREDENTIALS
+
+
 def require_basic_auth(
     credentials: tuple[str, str] = Depends(parse_basic_auth_header),
 ) -> None:
     username, password = credentials
-    expected_username = "admin"
-    expected_password = "secret"
+    expected_username, expected_password = ADMIN_CREDENTIALS
     if not (username == expected_username and password == expected_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
@@ -58,9 +144,33 @@ def require_basic_auth(
 # Pydantic Schemas (import from api.schemas with fallback)
 # -----------------------------
 try:
-    from api.schemas import Transaction, TransactionCreate, TransactionUpdate
+    from api.schemas import (
+        BulkItemResult,
+        BulkResult,
+        CounterpartyTotal,
+        HistogramBucket,
+        SearchResults,
+        StatsSummary,
+        Transaction,
+        TransactionCreate,
+        TransactionPatch,
+        TransactionUpdate,
+        VolumeBucket,
+    )
 except Exception:
-    from schemas import Transaction, TransactionCreate, TransactionUpdate
+    from schemas import (
+        BulkItemResult,
+        BulkResult,
+        CounterpartyTotal,
+        HistogramBucket,
+        SearchResults,
+        StatsSummary,
+        Transaction,
+        TransactionCreate,
+        TransactionPatch,
+        TransactionUpdate,
+        VolumeBucket,
+    )
 
 
 # -----------------------------
@@ -68,11 +178,348 @@ except Exception:
 # -----------------------------
 app = FastAPI(title="SMS Transactions API")
 
+# METRICS_ENABLED=1 times every request and SQL statement for GET /metrics. Off, neither
+# the middleware nor the connection wrapper is installed, so requests pay nothing.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+metrics = MetricsRegistry()
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+    set_connection_wrapper(metrics.instrument)
+
+# REQUEST_PROFILING=1: an admin request with an X-Profile header or ?profile=1 is run
+# under cProfile and written to PROFILE_DIR (api/profiling.py). Off, there is no hook.
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(DATA_DIR, "logs", "profiles")
+if REQUEST_PROFILING:
+    # Must be set before the routes below are declared
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(
+        ProfileMiddleware, directory=PROFILE_DIR, authorize=is_admin_authorization
+    )
+
 
 @app.on_event("startup")
 def on_startup() -> None:
-    # Recreate and repopulate the database on each server start
-    initialize_database()
+    # Pick up new messages from the XML backup; a full reload only when asked for.
+    # The run's counters and timings go to the ingest log (dsa/telemetry.py).
+    configure_ingest_logging()
+    initialize_database(rebuild=REBUILD_ON_STARTUP)
+    _use_row_decoding(rows_encoded())
+    if transaction_index is not None:
+        _load_index()
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    close_pool()
+
+
+# -----------------------------
+# Response cache (GET /transactions, GET /transactions/{id})
+# -----------------------------
+# RESPONSE_CACHE_SIZE=0 or RESPONSE_CACHE_TTL=0 turns caching off; ETags are still sent
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "30")),
+)
+
+
+def _cache_key(request: Request) -> str:
+    # Same query in a different parameter order is the same response
+    query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+    return f"{request.url.path}?{query}"
+
+
+def _cached_json(
+    request: Request, build: Callable[[], Tuple[Any, Dict[str, str]]]
+) -> Response:
+    """
+    Serve a JSON response from the cache (or build and store it) with a strong ETag.
+    `build` returns the JSON-ready content (or the already encoded body, as bytes) and
+    any extra headers. A matching If-None-Match gets an empty 304.
+    """
+    key = _cache_key(request)
+    entry = response_cache.get(key) if response_cache.enabled else None
+    cache_status = "HIT"
+    if entry is None:
+        cache_status = "MISS"
+        version = response_cache.version
+        content, headers = build()
+        body = content if isinstance(content, bytes) else JSONResponse(content=content).body
+        entry = response_cache.put(key, body, headers, version)
+
+    headers = {**entry.headers, "ETag": entry.etag, "X-Cache": cache_status}
+    if etag_matches(request.headers.get("If-None-Match"), entry.etag):
+        response_cache.record_not_modified()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# -----------------------------
+# Fast serialization (opt-in per endpoint)
+# -----------------------------
+# Endpoints that skip model validation and encode rows straight from the table
+# (api/fast_json.py), e.g. FAST_JSON_ENDPOINTS=list,get. The body is the same JSON as
+# the model path; byte-for-byte (and so the ETag) unless orjson writes a float differently.
+FAST_JSON_CHOICES = ("list", "get", "search")
+FAST_JSON_ENDPOINTS = {
+    name.strip() for name in os.getenv("FAST_JSON_ENDPOINTS", "").split(",") if name.strip()
+}
+if not FAST_JSON_ENDPOINTS <= set(FAST_JSON_CHOICES):
+    raise ValueError(
+        f"FAST_JSON_ENDPOINTS must be a subset of {', '.join(FAST_JSON_CHOICES)}, "
+        f"got {', '.join(sorted(FAST_JSON_ENDPOINTS))}"
+    )
+
+
+# -----------------------------
+# Row helpers and list filters
+# -----------------------------
+# Selected column order: id first, raw_json last (value_band, generated, before it)
+TRANSACTION_COLUMNS = (
+    ["id"]
+    + [f for f in Transaction.model_fields if f not in ("id", "raw_json")]
+    + ["raw_json"]
+)
+# Columns SQLite computes (api.db._ensure_value_band); never written
+GENERATED_COLUMNS = ("value_band",)
+# Every column, use instead of *. Plain columns while the database holds full rows only;
+# once it may hold compact/compressed ones (api/storage.py), _use_row_decoding switches
+# this and _select_list to decoding SQL, which calls three Python functions per row.
+ROW_SELECT = ", ".join(TRANSACTION_COLUMNS)
+_decode_rows = False
+# Key order of a serialized Transaction (id last)
+MODEL_FIELDS = list(Transaction.model_fields)
+MAX_PAGE_SIZE = 1000
+
+
+def _select_list(columns: List[str]) -> str:
+    """SELECT (or RETURNING) list for `columns`, decoding them when rows may be encoded."""
+    return decoded_select(columns) if _decode_rows else ", ".join(columns)
+
+
+def _use_row_decoding(decode: bool) -> None:
+    # on_startup, from the database's storage state (api.db.rows_encoded)
+    global ROW_SELECT, _decode_rows
+    _decode_rows = decode
+    ROW_SELECT = _select_list(TRANSACTION_COLUMNS)
+
+
+def _row_to_data(row: Any) -> Dict[str, Any]:
+    data = dict(row)
+    if data.get("raw_json"):
+        try:
+            data["raw_json"] = json.loads(data["raw_json"])  # type: ignore
+        except Exception:
+            data["raw_json"] = None
+    return data
+
+
+def _rows_content(rows: List[Any], columns: Optional[List[str]]) -> Any:
+    """JSON-ready list of rows; full rows go through the model, as response_model would."""
+    names = columns or TRANSACTION_COLUMNS
+    items = [_row_to_data(zip(names, row)) for row in rows]
+    if columns is None:
+        items = [Transaction(**item) for item in items]
+    return jsonable_encoder(items)
+
+
+def _rows_body(rows: List[Any], columns: Optional[List[str]]) -> bytes:
+    """Fast path for _rows_content, already encoded: plain tuples in, same JSON out."""
+    if columns is None:
+        return fast_json.dumps(
+            fast_json.row_dicts(rows, TRANSACTION_COLUMNS, ["sms_date"], MODEL_FIELDS)
+        )
+    return fast_json.dumps(fast_json.row_dicts(rows, columns))
+
+
+def _as_utc_iso(value: datetime) -> str:
+    # sms_date is stored as a UTC isoformat string, so filters must match that form
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+class TransactionFilters:
+    """WHERE clause shared by the list-style endpoints."""
+
+    def __init__(
+        self,
+        transaction_type: Optional[str] = None,
+        sms_address: Optional[str] = None,
+        date_from: Optional[datetime] = Query(None, description="sms_date >= date_from"),
+        date_to: Optional[datetime] = Query(None, description="sms_date <= date_to"),
+        min_amount: Optional[int] = None,
+        max_amount: Optional[int] = None,
+    ) -> None:
+        self.clauses: List[str] = []
+        self.params: List[Any] = []
+        self.transaction_type = transaction_type
+        self.sms_address = sms_address
+        self.date_from = date_from
+        self.date_to = date_to
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        # Filters daily_rollups can't answer (see rollup_where)
+        partial_day = date_from is not None and not _as_utc_iso(date_from).endswith(
+            "T00:00:00+00:00"
+        )
+        self.row_level = partial_day or any(
+            value is not None for value in (sms_address, date_to, min_amount, max_amount)
+        )
+        if transaction_type is not None:
+            self.add("transaction_type = ?", transaction_type)
+        if sms_address is not None:
+            self.add("sms_address = ?", sms_address)
+        if date_from is not None:
+            self.add("sms_date >= ?", _as_utc_iso(date_from))
+        if date_to is not None:
+            self.add("sms_date <= ?", _as_utc_iso(date_to))
+        if min_amount is not None:
+            self.add("amount >= ?", min_amount)
+        if max_amount is not None:
+            self.add("amount <= ?", max_amount)
+
+    def add(self, clause: str, value: Any) -> None:
+        self.clauses.append(clause)
+        self.params.append(value)
+
+    def where(self) -> str:
+        return f"WHERE {' AND '.join(self.clauses)}" if self.clauses else ""
+
+    def rollup_where(self) -> Optional[Tuple[str, List[Any]]]:
+        """
+        The same filter over daily_rollups, or None when it needs row-level data.
+        Only transaction_type and a date_from at midnight UTC map onto whole days.
+        """
+        if self.row_level:
+            return None
+        clauses: List[str] = []
+        params: List[Any] = []
+        if self.transaction_type is not None:
+            clauses.append("transaction_type = ?")
+            params.append(self.transaction_type)
+        if self.date_from is not None:
+            clauses.append("day >= ?")
+            params.append(_as_utc_iso(self.date_from)[:10])
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def index_predicates(self) -> Tuple[Dict[str, Any], Dict[str, Tuple[Any, Any]]]:
+        """The same filter as TransactionIndex.query() arguments: (equals, ranges)."""
+        equals = {
+            key: value
+            for key, value in (
+                ("transaction_type", self.transaction_type),
+                ("sms_address", self.sms_address),
+            )
+            if value is not None
+        }
+        ranges: Dict[str, Tuple[Any, Any]] = {}
+        if self.date_from is not None or self.date_to is not None:
+            ranges["sms_date"] = (
+                _as_utc_iso(self.date_from) if self.date_from is not None else None,
+                _as_utc_iso(self.date_to) if self.date_to is not None else None,
+            )
+        if self.min_amount is not None or self.max_amount is not None:
+            ranges["amount"] = (self.min_amount, self.max_amount)
+        return equals, ranges
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Turn `fields=a,b` into a column list (id always included) or None for all columns."""
+    if fields is None:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in TRANSACTION_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    return [c for c in TRANSACTION_COLUMNS if c in requested or c == "id"]
+
+
+# Position of transaction_id in INSERT_SQL / to_row order (no id column there)
+TXID_COLUMN = TRANSACTION_COLUMNS.index("transaction_id") - 1
+# Insert, or overwrite every column of the row holding the same transaction_id
+# (RETURNING ROW_SELECT is added when it runs)
+UPSERT_BY_TXID_SQL = f"""
+    {INSERT_SQL.strip()}
+    ON CONFLICT (transaction_id) DO UPDATE SET
+        {", ".join(
+            f"{c} = excluded.{c}" for c in TRANSACTION_COLUMNS[1:] if c not in GENERATED_COLUMNS
+        )}
+"""
+
+
+@contextmanager
+def _translate_conflicts() -> Iterator[None]:
+    """Turn a clash on the unique transaction_id index into a 409."""
+    try:
+        yield
+    except sqlite3.IntegrityError as exc:
+        if "transaction_id" not in str(exc):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A transaction with this transaction_id already exists",
+        )
+
+
+# -----------------------------
+# In-memory index (opt-in)
+# -----------------------------
+# TRANSACTION_INDEX=1 keeps every row in a dsa.transaction_index.TransactionIndex,
+# loaded at startup and kept up to date by this process's writes, so
+# GET /transactions and GET /transactions/{id} never touch SQLite. Only for a single
+# server process: rows written by another process (or the CLI) show up after a restart.
+transaction_index: Optional[TransactionIndex] = (
+    TransactionIndex(
+        id_key="id",
+        equality_keys=("transaction_type", "sms_address", "transaction_id"),
+        range_keys=("sms_date", "amount"),
+    )
+    if os.getenv("TRANSACTION_INDEX", "0") == "1"
+    else None
+)
+
+
+def _load_index() -> int:
+    with closing(get_connection()) as conn:
+        rows = conn.execute(f"SELECT {ROW_SELECT} FROM transactions").fetchall()
+    transaction_index.clear()
+    return transaction_index.load(dict(row) for row in rows)
+
+
+# Writers call these before their commit, while they hold SQLite's write lock, so
+# concurrent writes reach the index in the same order as the table.
+def _index_put(rows: Iterable[Any]) -> None:
+    if transaction_index is not None:
+        for row in rows:
+            transaction_index.insert(dict(row))
+
+
+def _index_reload(conn: sqlite3.Connection, ids: Iterable[int]) -> None:
+    """Copy rows just written by a bulk endpoint from the table into the index."""
+    if transaction_index is not None:
+        _index_put(
+            conn.execute(
+                f"SELECT {ROW_SELECT} FROM transactions "
+                "WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(ids)),),
+            )
+        )
+
+
+def _index_drop(ids: Iterable[int]) -> None:
+    if transaction_index is not None:
+        for transaction_id in ids:
+            transaction_index.delete(transaction_id)
+
+
+def _index_rows(records: List[Dict[str, Any]], columns: List[str]) -> List[Tuple[Any, ...]]:
+    """Index records as the tuples a SELECT of `columns` would return."""
+    return [tuple(record[c] for c in columns) for record in records]
 
 
 # -----------------------------
@@ -83,19 +530,373 @@ def on_startup() -> None:
     response_model=List[Transaction],
     dependencies=[Depends(require_basic_auth)],
 )
-def list_transactions() -> List[Transaction]:
-    with closing(get_connection()) as conn:
-        rows = conn.execute("SELECT * FROM transactions ORDER BY id ASC").fetchall()
-        items: List[Dict[str, Any]] = []
-        for row in rows:
-            data = dict(row)
-            if data.get("raw_json"):
-                try:
-                    data["raw_json"] = json.loads(data["raw_json"])  # type: ignore
-                except Exception:
-                    data["raw_json"] = None
-            items.append(data)
-        return [Transaction(**item) for item in items]
+def list_transactions(
+    request: Request,
+    filters: TransactionFilters = Depends(),
+    cursor: Optional[int] = Query(
+        None, description="Return rows with id greater than this (X-Next-Cursor)"
+    ),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated columns to return, e.g. id,amount,sms_date"
+    ),
+) -> Any:
+    columns = _parse_fields(fields)
+    if cursor is not None:
+        filters.add("id > ?", cursor)
+
+    select = _select_list(columns) if columns else ROW_SELECT
+    sql = f"SELECT {select} FROM transactions {filters.where()} ORDER BY id ASC"
+    params = list(filters.params)
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    fast = "list" in FAST_JSON_ENDPOINTS
+
+    def build() -> Tuple[Any, Dict[str, str]]:
+        if transaction_index is not None:
+            equals, ranges = filters.index_predicates()
+            if cursor is not None:
+                ranges["id"] = (cursor + 1, None)
+            records = transaction_index.query(equals, ranges, limit)
+            rows = _index_rows(records, columns or TRANSACTION_COLUMNS)
+        else:
+            with closing(get_connection()) as conn:
+                if fast:
+                    conn.row_factory = None
+                rows = conn.execute(sql, params).fetchall()
+
+        headers: Dict[str, str] = {}
+        if limit is not None and len(rows) == limit:
+            # Keyset pagination: pass this back as ?cursor= to get the next page
+            headers["X-Next-Cursor"] = str(rows[-1][0])
+
+        if fast:
+            return _rows_body(rows, columns), headers
+        return _rows_content(rows, columns), headers
+
+    return _cached_json(request, build)
+
+
+# -----------------------------
+# Streaming export
+# -----------------------------
+EXPORT_BATCH_SIZE = 500
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _ndjson_batch(rows: List[Any], columns: List[str]) -> str:
+    # raw_json is already JSON text in the table: splice it in instead of loads/dumps
+    with_raw = columns[-1] == "raw_json"
+    plain = columns[:-1] if with_raw else columns
+    lines = []
+    for row in rows:
+        line = json.dumps(dict(zip(plain, row)), ensure_ascii=False)
+        if with_raw:
+            line = f'{line[:-1]}, "raw_json": {row[-1] or "null"}}}'
+        lines.append(line)
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _csv_batch(rows: List[Any], header: Optional[List[str]] = None) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _stream_export(
+    conn: sqlite3.Connection, cursor: sqlite3.Cursor, columns: List[str], fmt: str
+) -> Iterator[str]:
+    try:
+        if fmt == "csv":
+            yield _csv_batch([], header=columns)
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield _csv_batch(rows) if fmt == "csv" else _ndjson_batch(rows, columns)
+    finally:
+        conn.close()
+
+
+@app.get(
+    "/transactions/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(require_basic_auth)],
+)
+def export_transactions(
+    filters: TransactionFilters = Depends(),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to export"),
+) -> StreamingResponse:
+    """Stream every matching row straight from the cursor, without building models."""
+    columns = _parse_fields(fields) or TRANSACTION_COLUMNS
+    sql = (
+        f"SELECT {_select_list(columns)} FROM transactions {filters.where()} ORDER BY id ASC"
+    )
+
+    # Rows are pulled batch by batch from Starlette's threadpool; pooled connections
+    # are not tied to one thread. Plain tuples are all the batch writers need.
+    conn = get_connection()
+    conn.row_factory = None
+    try:
+        cursor = conn.execute(sql, filters.params)
+    except Exception:
+        conn.close()
+        raise
+
+    return StreamingResponse(
+        _stream_export(conn, cursor, columns, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="transactions.{format}"'
+        },
+    )
+
+
+# -----------------------------
+# Full-text search
+# -----------------------------
+# Relative weight of sms_body, message and contact_name in the bm25 score
+SEARCH_WEIGHTS = (1.0, 1.0, 2.0)
+SEARCH_TOKEN_RE = re.compile(r"[^\W_]+\*?")
+
+
+def _fts_query(q: str) -> str:
+    """
+    Turn free text into an FTS5 query: every word must match, as a quoted string so
+    user input can't trip FTS5 syntax. A trailing * keeps prefix search ("Jan*").
+    """
+    terms = []
+    for token in SEARCH_TOKEN_RE.findall(q):
+        word = token.rstrip("*")
+        terms.append(f'"{word}"*' if token.endswith("*") else f'"{word}"')
+    return " ".join(terms)
+
+
+@app.get(
+    "/transactions/search",
+    response_model=SearchResults,
+    dependencies=[Depends(require_basic_auth)],
+)
+def search_transactions(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Words to find in the SMS text or contact"),
+    filters: TransactionFilters = Depends(),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+) -> Any:
+    """Best matches first (bm25), each with a highlighted snippet of the matching text."""
+    match = _fts_query(q)
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query has no searchable words",
+        )
+    filters.clauses.insert(0, "transactions_fts MATCH ?")
+    filters.params.insert(0, match)
+    joined = (
+        "FROM transactions_fts JOIN transactions ON transactions.id = transactions_fts.rowid "
+        + filters.where()
+    )
+    weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+
+    def build() -> Tuple[Any, Dict[str, str]]:
+        with closing(get_connection()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) {joined}", filters.params).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT transactions.id, -bm25(transactions_fts, {weights}) AS score,
+                       snippet(transactions_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+                       sms_date, transaction_type, amount, transactions.contact_name
+                {joined}
+                ORDER BY bm25(transactions_fts, {weights}), transactions.id
+                LIMIT ? OFFSET ?
+                """,
+                [*filters.params, limit, offset],
+            ).fetchall()
+        if "search" in FAST_JSON_ENDPOINTS:
+            hits = [dict(r, sms_date=fast_json.utc_z(r["sms_date"])) for r in rows]
+            return fast_json.dumps(
+                {"query": q, "total": total, "limit": limit, "offset": offset, "hits": hits}
+            ), {}
+        results = SearchResults(
+            query=q, total=total, limit=limit, offset=offset, hits=[dict(r) for r in rows]
+        )
+        return jsonable_encoder(results), {}
+
+    return _cached_json(request, build)
+
+
+# -----------------------------
+# Bulk Endpoints
+# -----------------------------
+# Declared before /transactions/{transaction_id}, which would otherwise match "bulk"
+BULK_MAX_ITEMS = 10000
+# Columns a PATCH item may set, in TransactionUpdate order; None leaves a column as is
+PATCH_COLUMNS = list(TransactionUpdate.model_fields)
+
+
+def _existing_days(conn: sqlite3.Connection, ids: List[int]) -> Dict[int, str]:
+    """id -> sms_date day for the ids that exist, in one query however many ids."""
+    rows = conn.execute(
+        "SELECT id, substr(sms_date, 1, 10) FROM transactions "
+        "WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(ids),),
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def _patch_row(item: TransactionPatch) -> Dict[str, Any]:
+    values: Dict[str, Any] = {"id": item.id}
+    for column in PATCH_COLUMNS:
+        value = getattr(item, column)
+        if column == "sms_date" and value is not None:
+            value = value.isoformat()
+        elif column == "sms_body" and value is not None:
+            value = encode_body(value, STORAGE_MODE)
+        elif column == "raw_json" and value is not None:
+            value = json.dumps(value)
+        values[column] = value
+    return values
+
+
+@app.post(
+    "/transactions/bulk",
+    response_model=BulkResult,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(require_basic_auth)],
+)
+def bulk_create_transactions(
+    items: List[TransactionCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+) -> BulkResult:
+    """
+    Insert the items in one transaction; ids come back in request order. An item
+    whose transaction_id is already stored, or was used by an earlier item of the
+    batch, is not inserted and comes back as "conflict" with the id of the row that
+    holds it; the rest of the batch is still written.
+    """
+    rows = [to_row(item) for item in items]
+    tx_ids = [row[TXID_COLUMN] for row in rows]
+    with _translate_conflicts(), closing(get_connection()) as conn, conn:
+        # Holding the write lock from the start makes the new ids one contiguous run,
+        # and keeps the transaction_ids checked below from being taken meanwhile
+        conn.execute("BEGIN IMMEDIATE")
+        holders: Dict[str, int] = {
+            tx_id: row_id
+            for tx_id, row_id in conn.execute(
+                "SELECT transaction_id, id FROM transactions "
+                "WHERE transaction_id IN (SELECT value FROM json_each(?))",
+                (json.dumps([t for t in tx_ids if t is not None]),),
+            )
+        }
+        before = conn.execute(
+            "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'transactions'), 0)"
+        ).fetchone()[0]
+        outcomes: List[Tuple[str, int]] = []
+        new_rows = []
+        for row, tx_id in zip(rows, tx_ids):
+            if tx_id is not None and tx_id in holders:
+                outcomes.append(("conflict", holders[tx_id]))
+                continue
+            new_id = before + len(new_rows) + 1
+            new_rows.append(row)
+            outcomes.append(("created", new_id))
+            if tx_id is not None:
+                holders[tx_id] = new_id
+        conn.executemany(INSERT_SQL, new_rows)
+        refresh_daily_rollups(conn, sorted({row[1][:10] for row in new_rows}))
+        _index_reload(conn, range(before + 1, before + 1 + len(new_rows)))
+    if new_rows:
+        response_cache.invalidate()
+    return BulkResult(
+        processed=len(items),
+        succeeded=len(new_rows),
+        results=[
+            BulkItemResult(index=i, id=row_id, status=outcome)
+            for i, (outcome, row_id) in enumerate(outcomes)
+        ],
+    )
+
+
+@app.patch(
+    "/transactions/bulk",
+    response_model=BulkResult,
+    dependencies=[Depends(require_basic_auth)],
+)
+def bulk_update_transactions(
+    items: List[TransactionPatch] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+) -> BulkResult:
+    """
+    Apply partial updates (like PUT /transactions/{id}) to many rows in one
+    transaction. All or nothing: an update giving a row a transaction_id held by
+    another row fails the whole batch with 409.
+    """
+    assignments = ", ".join(patch_assignments(PATCH_COLUMNS))
+    with _translate_conflicts(), closing(get_connection()) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        old_days = _existing_days(conn, [item.id for item in items])
+        found = [item for item in items if item.id in old_days]
+        conn.executemany(
+            f"UPDATE transactions SET {assignments} WHERE id = :id",
+            [_patch_row(item) for item in found],
+        )
+        days = set(old_days.values())
+        days.update(item.sms_date.isoformat()[:10] for item in found if item.sms_date)
+        refresh_daily_rollups(conn, sorted(days))
+        _index_reload(conn, old_days)
+    if found:
+        response_cache.invalidate()
+    return BulkResult(
+        processed=len(items),
+        succeeded=len(found),
+        results=[
+            BulkItemResult(
+                index=i,
+                id=item.id,
+                status="updated" if item.id in old_days else "not_found",
+            )
+            for i, item in enumerate(items)
+        ],
+    )
+
+
+@app.delete(
+    "/transactions/bulk",
+    response_model=BulkResult,
+    dependencies=[Depends(require_basic_auth)],
+)
+def bulk_delete_transactions(
+    ids: List[int] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+) -> BulkResult:
+    """Delete many rows by id in one transaction; unknown ids are reported, not fatal."""
+    with closing(get_connection()) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        old_days = _existing_days(conn, ids)
+        conn.executemany(
+            "DELETE FROM transactions WHERE id = ?", [(i,) for i in old_days]
+        )
+        refresh_daily_rollups(conn, sorted(set(old_days.values())))
+        _index_drop(old_days)
+    if old_days:
+        response_cache.invalidate()
+    seen: set = set()
+    results: List[BulkItemResult] = []
+    for i, transaction_id in enumerate(ids):
+        # A repeated id is deleted once; later copies find nothing left
+        deleted = transaction_id in old_days and transaction_id not in seen
+        seen.add(transaction_id)
+        results.append(
+            BulkItemResult(
+                index=i, id=transaction_id, status="deleted" if deleted else "not_found"
+            )
+        )
+    return BulkResult(processed=len(ids), succeeded=len(old_days), results=results)
 
 
 @app.get(
@@ -103,22 +904,27 @@ def list_transactions() -> List[Transaction]:
     response_model=Transaction,
     dependencies=[Depends(require_basic_auth)],
 )
-def get_transaction(transaction_id: int) -> Transaction:
-    with closing(get_connection()) as conn:
-        row = conn.execute(
-            "SELECT * FROM transactions WHERE id = ?", (transaction_id,)
-        ).fetchone()
+def get_transaction(request: Request, transaction_id: int) -> Any:
+    def build() -> Tuple[Any, Dict[str, str]]:
+        if transaction_index is not None:
+            record = transaction_index.get(transaction_id)
+            row = _index_rows([record], TRANSACTION_COLUMNS)[0] if record else None
+        else:
+            with closing(get_connection()) as conn:
+                row = conn.execute(
+                    f"SELECT {ROW_SELECT} FROM transactions WHERE id = ?", (transaction_id,)
+                ).fetchone()
         if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
             )
-        data = dict(row)
-        if data.get("raw_json"):
-            try:
-                data["raw_json"] = json.loads(data["raw_json"])  # type: ignore
-            except Exception:
-                data["raw_json"] = None
-        return Transaction(**data)
+        if "get" in FAST_JSON_ENDPOINTS:
+            return fast_json.dumps(
+                fast_json.row_dicts([row], TRANSACTION_COLUMNS, ["sms_date"], MODEL_FIELDS)[0]
+            ), {}
+        return jsonable_encoder(Transaction(**_row_to_data(zip(TRANSACTION_COLUMNS, row)))), {}
+
+    return _cached_json(request, build)
 
 
 @app.post(
@@ -128,50 +934,15 @@ def get_transaction(transaction_id: int) -> Transaction:
     dependencies=[Depends(require_basic_auth)],
 )
 def create_transaction(payload: TransactionCreate) -> Transaction:
-    with closing(get_connection()) as conn, conn:
-        cursor = conn.execute(
-            """
-            INSERT INTO transactions (
-                sms_address, sms_date, sms_type, sms_body, transaction_type, amount, currency,
-                sender, receiver, balance, fee, transaction_id, external_transaction_id, message,
-                readable_date, contact_name, raw_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                payload.sms_address,
-                payload.sms_date.isoformat(),
-                payload.sms_type,
-                payload.sms_body,
-                payload.transaction_type,
-                payload.amount,
-                payload.currency,
-                payload.sender,
-                payload.receiver,
-                payload.balance,
-                payload.fee,
-                payload.transaction_id,
-                payload.external_transaction_id,
-                payload.message,
-                payload.readable_date,
-                payload.contact_name,
-                (
-                    json.dumps(payload.raw_json)
-                    if payload.raw_json is not None
-                    else json.dumps({})
-                ),
-            ),
-        )
-        new_id = cursor.lastrowid
+    with _translate_conflicts(), closing(get_connection()) as conn, conn:
         row = conn.execute(
-            "SELECT * FROM transactions WHERE id = ?", (new_id,)
+            f"{INSERT_SQL.strip()} RETURNING {ROW_SELECT}", to_row(payload)
         ).fetchone()
-        data = dict(row)
-        if data.get("raw_json"):
-            try:
-                data["raw_json"] = json.loads(data["raw_json"])  # type: ignore
-            except Exception:
-                data["raw_json"] = None
-        return Transaction(**data)
+        refresh_daily_rollups(conn, [row["sms_date"][:10]])
+        _index_put([row])
+    # After the commit, so no reader can cache the pre-write state at the new version
+    response_cache.invalidate()
+    return Transaction(**_row_to_data(row))
 
 
 @app.put(
@@ -180,70 +951,118 @@ def create_transaction(payload: TransactionCreate) -> Transaction:
     dependencies=[Depends(require_basic_auth)],
 )
 def update_transaction(transaction_id: int, payload: TransactionUpdate) -> Transaction:
-    with closing(get_connection()) as conn, conn:
-        existing = conn.execute(
-            "SELECT * FROM transactions WHERE id = ?", (transaction_id,)
-        ).fetchone()
-        if not existing:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
-            )
-
-        # Build dynamic update based on provided fields
-        fields = [
-            ("sms_address", payload.sms_address),
-            ("sms_date", payload.sms_date.isoformat() if payload.sms_date else None),
-            ("sms_type", payload.sms_type),
-            ("sms_body", payload.sms_body),
-            ("transaction_type", payload.transaction_type),
-            ("amount", payload.amount),
-            ("currency", payload.currency),
-            ("sender", payload.sender),
-            ("receiver", payload.receiver),
-            ("balance", payload.balance),
-            ("fee", payload.fee),
-            ("transaction_id", payload.transaction_id),
-            ("external_transaction_id", payload.external_transaction_id),
-            ("message", payload.message),
-            ("readable_date", payload.readable_date),
-            ("contact_name", payload.contact_name),
-            (
-                "raw_json",
-                json.dumps(payload.raw_json) if payload.raw_json is not None else None,
-            ),
-        ]
-        set_clauses = []
-        values: List[object] = []
-        for column, value in fields:
-            if value is not None:
-                set_clauses.append(f"{column} = ?")
-                values.append(value)
+    # Build dynamic update based on provided fields
+    fields = [
+        ("sms_address", payload.sms_address),
+        ("sms_date", payload.sms_date.isoformat() if payload.sms_date else None),
+        ("sms_type", payload.sms_type),
+        (
+            "sms_body",
+            encode_body(payload.sms_body, STORAGE_MODE)
+            if payload.sms_body is not None
+            else None,
+        ),
+        ("transaction_type", payload.transaction_type),
+        ("amount", payload.amount),
+        ("currency", payload.currency),
+        ("sender", payload.sender),
+        ("receiver", payload.receiver),
+        ("balance", payload.balance),
+        ("fee", payload.fee),
+        ("transaction_id", payload.transaction_id),
+        ("external_transaction_id", payload.external_transaction_id),
+        ("message", payload.message),
+        ("readable_date", payload.readable_date),
+        ("contact_name", payload.contact_name),
+        (
+            "raw_json",
+            json.dumps(payload.raw_json) if payload.raw_json is not None else None,
+        ),
+    ]
+    set_clauses = []
+    values: List[object] = []
+    for column, value in fields:
+        if value is not None:
+            set_clauses.append(f"{column} = ?")
+            values.append(value)
+    changed = {clause.split(" = ")[0] for clause in set_clauses}
+    # Compact rows derive message/raw_json from other columns: pin them first
+    set_clauses += materialize_clauses(changed)
 
+    with _translate_conflicts(), closing(get_connection()) as conn, conn:
         if not set_clauses:
             row = conn.execute(
-                "SELECT * FROM transactions WHERE id = ?", (transaction_id,)
+                f"SELECT {ROW_SELECT} FROM transactions WHERE id = ?", (transaction_id,)
+            ).fetchone()
+            if not row:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
+                )
+            return Transaction(**_row_to_data(row))
+
+        # RETURNING only sees the new row, so fetch the old day only if it can change
+        old_day = None
+        if payload.sms_date is not None:
+            old_day = conn.execute(
+                "SELECT substr(sms_date, 1, 10) FROM transactions WHERE id = ?",
+                (transaction_id,),
             ).fetchone()
-            data = dict(row)
-            if data.get("raw_json"):
-                try:
-                    data["raw_json"] = json.loads(data["raw_json"])  # type: ignore
-                except Exception:
-                    data["raw_json"] = None
-            return Transaction(**data)
 
         values.append(transaction_id)
-        sql = f"UPDATE transactions SET {', '.join(set_clauses)} WHERE id = ?"
-        conn.execute(sql, tuple(values))
+        sql = (
+            f"UPDATE transactions SET {', '.join(set_clauses)} WHERE id = ? "
+            f"RETURNING {ROW_SELECT}"
+        )
+        row = conn.execute(sql, tuple(values)).fetchone()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
+            )
+        # The row may have moved day or type: refresh the old and the new bucket
+        days = {row["sms_date"][:10]}
+        if old_day is not None:
+            days.add(old_day[0])
+        refresh_daily_rollups(conn, sorted(days))
+        _index_put([row])
+    response_cache.invalidate()
+    return Transaction(**_row_to_data(row))
+
+
+@app.put(
+    "/transactions/by-txid/{transaction_id}",
+    response_model=Transaction,
+    responses={201: {"model": Transaction, "description": "Created"}},
+    dependencies=[Depends(require_basic_auth)],
+)
+def upsert_transaction_by_txid(
+    transaction_id: str, payload: TransactionCreate, response: Response
+) -> Transaction:
+    """
+    Idempotent create-or-replace keyed on the MoMo transaction_id (the path wins over
+    any transaction_id in the body). Retrying the same request is safe: the first
+    call creates the row (201), later ones rewrite it with the same values (200).
+    """
+    row_values = list(to_row(payload))
+    row_values[TXID_COLUMN] = transaction_id
+    with _translate_conflicts(), closing(get_connection()) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        # Needed for the rollups if the replacement moves the row to another day
+        existing = conn.execute(
+            "SELECT substr(sms_date, 1, 10) FROM transactions WHERE transaction_id = ?",
+            (transaction_id,),
+        ).fetchone()
         row = conn.execute(
-            "SELECT * FROM transactions WHERE id = ?", (transaction_id,)
+            f"{UPSERT_BY_TXID_SQL.rstrip()} RETURNING {ROW_SELECT}", row_values
         ).fetchone()
-        data = dict(row)
-        if data.get("raw_json"):
-            try:
-                data["raw_json"] = json.loads(data["raw_json"])  # type: ignore
-            except Exception:
-                data["raw_json"] = None
-        return Transaction(**data)
+        days = {row["sms_date"][:10]}
+        if existing is not None:
+            days.add(existing[0])
+        refresh_daily_rollups(conn, sorted(days))
+        _index_put([row])
+    response_cache.invalidate()
+    if existing is None:
+        response.status_code = status.HTTP_201_CREATED
+    return Transaction(**_row_to_data(row))
 
 
 @app.delete(
@@ -251,17 +1070,224 @@ def update_transaction(transaction_id: int, payload: TransactionUpdate) -> Trans
     status_code=status.HTTP_204_NO_CONTENT,
     dependencies=[Depends(require_basic_auth)],
 )
-def delete_transaction(transaction_id: int) -> JSONResponse:
+def delete_transaction(transaction_id: int) -> Response:
     with closing(get_connection()) as conn, conn:
         row = conn.execute(
-            "SELECT id FROM transactions WHERE id = ?", (transaction_id,)
+            "DELETE FROM transactions WHERE id = ? RETURNING sms_date", (transaction_id,)
         ).fetchone()
         if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
             )
-        conn.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-    return JSONResponse(status_code=status.HTTP_204_NO_CONTENT, content=None)
+        refresh_daily_rollups(conn, [row["sms_date"][:10]])
+        _index_drop([transaction_id])
+    response_cache.invalidate()
+    # No body at all: a JSON "null" on a 204 makes uvicorn drop the connection
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# -----------------------------
+# Aggregates (/stats)
+# -----------------------------
+# sms_date is an isoformat string, so a prefix of it is the calendar bucket
+VOLUME_INTERVALS = {"day": 10, "month": 7}
+# Outgoing rows carry the other party in receiver, money_in rows in sender
+COUNTERPARTY_SQL = "COALESCE(receiver, sender, contact_name)"
+
+
+@app.get(
+    "/stats/summary",
+    response_model=StatsSummary,
+    dependencies=[Depends(require_basic_auth)],
+)
+def stats_summary(filters: TransactionFilters = Depends()) -> StatsSummary:
+    """Count, amount and fee totals per transaction_type, plus the overall totals."""
+    rollup = filters.rollup_where()
+    if rollup is not None:
+        where, params = rollup
+        sql = f"""
+            SELECT transaction_type, SUM(count) AS count, SUM(amount_sum) AS total_amount,
+                   SUM(fee_sum) AS total_fees,
+                   CAST(SUM(amount_sum) AS REAL) / SUM(count) AS avg_amount,
+                   MIN(min_amount) AS min_amount, MAX(max_amount) AS max_amount
+            FROM daily_rollups {where}
+            GROUP BY transaction_type
+            ORDER BY total_amount DESC
+        """
+    else:
+        params = filters.params
+        sql = f"""
+            SELECT transaction_type, COUNT(*) AS count, SUM(amount) AS total_amount,
+                   SUM(fee) AS total_fees, AVG(amount) AS avg_amount,
+                   MIN(amount) AS min_amount, MAX(amount) AS max_amount
+            FROM transactions {filters.where()}
+            GROUP BY transaction_type
+            ORDER BY total_amount DESC
+        """
+    with closing(get_connection()) as conn:
+        by_type = [dict(row) for row in conn.execute(sql, params)]
+    return StatsSummary(
+        count=sum(t["count"] for t in by_type),
+        total_amount=sum(t["total_amount"] for t in by_type),
+        total_fees=sum(t["total_fees"] for t in by_type),
+        by_type=by_type,
+    )
+
+
+@app.get(
+    "/stats/volume",
+    response_model=List[VolumeBucket],
+    dependencies=[Depends(require_basic_auth)],
+)
+def stats_volume(
+    filters: TransactionFilters = Depends(),
+    interval: str = Query("day", pattern="^(day|month)$"),
+) -> Any:
+    """Transaction count, amount and fees per day or month, oldest first."""
+    rollup = filters.rollup_where()
+    if rollup is not None:
+        # O(days) instead of O(transactions)
+        where, params = rollup
+        sql = f"""
+            SELECT substr(day, 1, {VOLUME_INTERVALS[interval]}) AS period,
+                   SUM(count) AS count, SUM(amount_sum) AS total_amount,
+                   SUM(fee_sum) AS total_fees
+            FROM daily_rollups {where}
+            GROUP BY period
+            ORDER BY period ASC
+        """
+    else:
+        params = filters.params
+        sql = f"""
+            SELECT substr(sms_date, 1, {VOLUME_INTERVALS[interval]}) AS period,
+                   COUNT(*) AS count, SUM(amount) AS total_amount, SUM(fee) AS total_fees
+            FROM transactions {filters.where()}
+            GROUP BY period
+            ORDER BY period ASC
+        """
+    with closing(get_connection()) as conn:
+        return [dict(row) for row in conn.execute(sql, params)]
+
+
+@app.get(
+    "/stats/counterparties",
+    response_model=List[CounterpartyTotal],
+    dependencies=[Depends(require_basic_auth)],
+)
+def stats_counterparties(
+    filters: TransactionFilters = Depends(),
+    limit: int = Query(10, ge=1, le=100),
+    order_by: str = Query("total_amount", pattern="^(total_amount|count)$"),
+) -> Any:
+    """The counterparties with the most money (or transactions) exchanged."""
+    filters.clauses.append(f"{COUNTERPARTY_SQL} IS NOT NULL")
+    sql = f"""
+        SELECT {COUNTERPARTY_SQL} AS counterparty, COUNT(*) AS count,
+               SUM(amount) AS total_amount
+        FROM transactions {filters.where()}
+        GROUP BY counterparty
+        ORDER BY {order_by} DESC, counterparty ASC
+        LIMIT ?
+    """
+    with closing(get_connection()) as conn:
+        return [dict(row) for row in conn.execute(sql, [*filters.params, limit])]
+
+
+@app.get(
+    "/stats/histogram",
+    response_model=List[HistogramBucket],
+    dependencies=[Depends(require_basic_auth)],
+)
+def stats_histogram(
+    filters: TransactionFilters = Depends(),
+    bins: int = Query(10, ge=1, le=100),
+    width: Optional[int] = Query(
+        None, ge=1, description="Bucket width in RWF (default: range split into `bins`)"
+    ),
+) -> Any:
+    """Amount distribution as [lower, upper) buckets; empty buckets are left out."""
+    where = filters.where()
+    with closing(get_connection()) as conn:
+        low, high = conn.execute(
+            f"SELECT MIN(amount), MAX(amount) FROM transactions {where}", filters.params
+        ).fetchone()
+        if low is None:
+            return []
+        if width is None:
+            width = max(1, -(-(high - low + 1) // bins))
+        rows = conn.execute(
+            f"""
+            SELECT (amount - ?) / ? AS bucket, COUNT(*) AS count
+            FROM transactions {where}
+            GROUP BY bucket
+            ORDER BY bucket ASC
+            """,
+            [low, width, *filters.params],
+        ).fetchall()
+    return [
+        {
+            "lower": low + bucket * width,
+            "upper": low + (bucket + 1) * width,
+            "count": count,
+        }
+        for bucket, count in rows
+    ]
+
+
+# -----------------------------
+# Diagnostics
+# -----------------------------
+@app.get("/debug/pool", dependencies=[Depends(require_basic_auth)])
+def pool_stats() -> Dict[str, Any]:
+    """Connection pool counters: hits, misses, waits and time spent waiting."""
+    return get_pool_stats()
+
+
+@app.get("/debug/cache", dependencies=[Depends(require_basic_auth)])
+def cache_stats() -> Dict[str, Any]:
+    """Response cache counters: hits, misses, 304s, evictions and invalidations."""
+    return response_cache.stats()
+
+
+@app.get("/debug/index", dependencies=[Depends(require_basic_auth)])
+def index_stats() -> Dict[str, Any]:
+    """In-memory index size per key, or just enabled=false without TRANSACTION_INDEX=1."""
+    if transaction_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **transaction_index.stats()}
+
+
+@app.get("/metrics", dependencies=[Depends(require_basic_auth)])
+def prometheus_metrics() -> Response:
+    """
+    Prometheus text format: per-route request counts, latency and response size
+    histograms and per-statement SQLite timings (METRICS_ENABLED=1), plus the
+    connection pool and response cache counters (always).
+    """
+    body = "".join(
+        (
+            render_stats("api_metrics", {"enabled": METRICS_ENABLED}),
+            metrics.render() if METRICS_ENABLED else "",
+            render_stats(
+                "sqlite_pool",
+                get_pool_stats(),
+                counters=("hits", "misses", "waits", "timeouts", "wait_seconds_total"),
+            ),
+            render_stats(
+                "response_cache",
+                response_cache.stats(),
+                counters=(
+                    "hits",
+                    "misses",
+                    "expired",
+                    "evictions",
+                    "invalidations",
+                    "not_modified",
+                ),
+            ),
+        )
+    )
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # -----------------------------
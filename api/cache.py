@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+    created: float
+
+
+def make_etag(body: bytes) -> str:
+    """Strong validator: identical bodies always get the same ETag."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 If-None-Match check (weak comparison, as the spec requires for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class ResponseCache:
+    """
+    In-process LRU of serialized responses, keyed by request path + query string.
+
+    Every write to the transactions table calls invalidate(), which bumps `version`
+    and drops all entries. A response built while a write was in flight is not
+    stored, because put() only accepts bodies built at the current version.
+    Entries also expire after `ttl` seconds; this bounds staleness when several
+    processes serve the same database, since each has its own cache.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0) -> None:
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.version = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.not_modified = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.monotonic() - entry.created > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(
+        self, key: str, body: bytes, headers: Dict[str, str], version: int
+    ) -> CachedResponse:
+        entry = CachedResponse(body, make_etag(body), headers, time.monotonic())
+        if not self.enabled:
+            return entry
+        with self._lock:
+            if version != self.version:
+                # The table changed while this body was being built
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "not_modified": self.not_modified,
+            }
+
+
+__all__ = [
+    "CachedResponse",
+    "ResponseCache",
+    "etag_matches",
+    "make_etag",
+]
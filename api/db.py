@@ -1,15 +1,63 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
 import os
 import sys
 import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from contextlib import closing
-from typing import Iterable, List
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
 
 # Ensure project root is on sys.path so we can import the 'dsa' package
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from dsa.data_loader import load_data_from_xml
+from dsa.categorizer import default_categorizer
+from dsa.data_loader import build_transaction, iter_sms_attributes
+from dsa.dead_letter import (
+    DEAD_LETTER_ENABLED,
+    DEAD_LETTER_PATH,
+    REASONS,
+    DeadLetterWriter,
+    Rejection,
+    extract_record,
+    mark_replayed,
+    pending_entries,
+)
+from dsa.telemetry import (
+    IngestTelemetry,
+    ProgressCallback,
+    configure_ingest_logging,
+    log_event,
+    print_progress,
+)
+from api.pool import DEFAULT_PRAGMAS, ConnectionPool, parse_pragmas
+from api.storage import (
+    STORAGE_MODES,
+    encode_row,
+    reencode_rows,
+    register_functions,
+    storage_report,
+)
 from api.schemas import TransactionCreate
 
 
@@ -17,15 +65,100 @@ DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 DATABASE_PATH = os.path.join(DATA_DIR, "db.sqlite3")
 RAW_XML_PATH = os.path.join(DATA_DIR, "raw", "momo.xml")
 
+# Parallel ingest settings; INGEST_WORKERS <= 1 keeps the serial path
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "2000"))
+
+# The API normally ingests incrementally on startup; set to 1 to force a full reload
+REBUILD_ON_STARTUP = os.getenv("REBUILD_DB_ON_STARTUP", "0") == "1"
+
+
+# Connection pool: sized to match the default uvicorn/anyio threadpool (40 threads)
+POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "40"))
+POOL_TIMEOUT = float(os.getenv("SQLITE_POOL_TIMEOUT", "30"))
+# Overrides on top of api.pool.DEFAULT_PRAGMAS, e.g. "synchronous=FULL,cache_size=-64000"
+SQLITE_PRAGMAS = {**DEFAULT_PRAGMAS, **parse_pragmas(os.getenv("SQLITE_PRAGMAS"))}
+
+# How new rows are stored: full | compact | compressed (see api/storage.py).
+# Reads handle all three, so switching only affects rows written afterwards;
+# `python -m api.db --storage-mode` rewrites the existing ones.
+STORAGE_MODE = os.getenv("STORAGE_MODE", "full")
+if STORAGE_MODE not in STORAGE_MODES:
+    raise ValueError(f"STORAGE_MODE must be one of {', '.join(STORAGE_MODES)}")
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+# Applied to every connection get_connection() hands out (api/metrics.py sets it)
+_connection_wrapper: Optional[Callable[[sqlite3.Connection], Any]] = None
+
+
+def _get_pool() -> ConnectionPool:
+    global _pool
+    pool = _pool
+    if pool is not None and pool.path == DATABASE_PATH:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DATABASE_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(
+                DATABASE_PATH,
+                size=POOL_SIZE,
+                pragmas=SQLITE_PRAGMAS,
+                timeout=POOL_TIMEOUT,
+                setup=register_functions,
+            )
+        return _pool
+
 
 def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DATABASE_PATH)
+    """
+    Borrow a connection from the pool. Calling close() (e.g. via contextlib.closing)
+    returns it to the pool instead of closing it.
+    """
+    conn = _get_pool().acquire()
+    wrap = _connection_wrapper
+    return conn if wrap is None else wrap(conn)
+
+
+def set_connection_wrapper(wrap: Optional[Callable[[sqlite3.Connection], Any]]) -> None:
+    """Wrap every connection get_connection() returns from now on (None to stop)."""
+    global _connection_wrapper
+    _connection_wrapper = wrap
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    return _get_pool().stats()
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    A standalone (unpooled) connection to `path`, set up like the pooled ones, for
+    loaders working on a database other than DATABASE_PATH (etl/run.py). close() closes it.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False)
+    for name, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    register_functions(conn)
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def ensure_table() -> None:
-    with closing(get_connection()) as conn, conn:
+def ensure_table(conn: Optional[sqlite3.Connection] = None) -> None:
+    """Create or upgrade the schema, on `conn` if given, else on a pooled connection."""
+    if conn is None:
+        with closing(get_connection()) as conn:
+            ensure_table(conn)
+        return
+    with conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS transactions (
@@ -50,97 +183,933 @@ def ensure_table() -> None:
             )
             """
         )
+        # Back the GET /transactions filters
+        for column in ("transaction_type", "sms_address", "sms_date", "amount"):
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_transactions_{column} "
+                f"ON transactions({column})"
+            )
+        _ensure_unique_transaction_id(conn)
+        _ensure_value_band(conn)
+        # One row: whether compact/compressed rows may exist (see rows_encoded)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS storage_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                encoded INTEGER NOT NULL
+            )
+            """
+        )
+        if STORAGE_MODE != "full":
+            # Before any row is written compact: the search triggers must decode it
+            _set_rows_encoded(conn, True)
+        _ensure_search_index(conn)
+        # Covering indexes so the /stats GROUP BYs never touch the table rows
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_type_amount_fee "
+            "ON transactions(transaction_type, amount, fee)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_date_amount_fee "
+            "ON transactions(sms_date, amount, fee)"
+        )
+        # One row per calendar day (the sms_date prefix) and transaction_type; see
+        # refresh_daily_rollups for how it is kept in step with transactions
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS daily_rollups (
+                day TEXT NOT NULL,
+                transaction_type TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                amount_sum INTEGER NOT NULL,
+                fee_sum INTEGER NOT NULL,
+                min_amount INTEGER,
+                max_amount INTEGER,
+                min_balance INTEGER,
+                max_balance INTEGER,
+                PRIMARY KEY (day, transaction_type)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_state (
+                source_path TEXT PRIMARY KEY,
+                source_size INTEGER NOT NULL,
+                source_mtime_ns INTEGER NOT NULL,
+                source_sha256 TEXT NOT NULL,
+                high_water_ms INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
 
 
-def _insert_transactions(transactions: Iterable[TransactionCreate]) -> None:
+def _ensure_unique_transaction_id(conn: sqlite3.Connection) -> None:
+    """
+    transaction_id is unique (NULLs excepted): it backs ingest dedupe and the
+    ON CONFLICT upsert behind PUT /transactions/by-txid/{transaction_id}.
+    Databases from before the constraint keep their plain index, with a warning,
+    until their duplicate ids are cleaned up.
+    """
+    try:
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_transaction_id_unique "
+            "ON transactions(transaction_id)"
+        )
+    except sqlite3.IntegrityError:
+        duplicates = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM transactions "
+            "WHERE transaction_id IS NOT NULL GROUP BY transaction_id HAVING COUNT(*) > 1)"
+        ).fetchone()[0]
+        log_event(
+            "db.duplicate_transaction_ids",
+            f"{duplicates} transaction_id values occur more than once; "
+            "upserts by transaction_id are unavailable until they are removed "
+            "(or the database is rebuilt with `python -m api.db --rebuild`)",
+            level=logging.WARNING,
+            database=conn.execute("PRAGMA database_list").fetchone()[2],
+            duplicates=duplicates,
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_transaction_id "
+            "ON transactions(transaction_id)"
+        )
+        return
+    # The unique index replaces the old plain one
+    conn.execute("DROP INDEX IF EXISTS idx_transactions_transaction_id")
+
+
+def _ensure_value_band(conn: sqlite3.Connection) -> None:
+    """
+    value_band is a virtual generated column: SQLite computes it from amount on
+    read with the shared categorizer's bands (VALUE_BAND_HIGH / VALUE_BAND_MEDIUM),
+    so every loader and every write agrees and nothing stores it. When those
+    settings change, the column is dropped and added again with the new bands.
+    """
+    definition = (
+        "value_band TEXT GENERATED ALWAYS AS "
+        f"({default_categorizer().value_band_sql('amount')}) VIRTUAL"
+    )
+    schema = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"
+    ).fetchone()[0]
+    if definition in schema:
+        return
+    columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(transactions)")]
+    if "value_band" in columns:
+        conn.execute("ALTER TABLE transactions DROP COLUMN value_band")
+    conn.execute(f"ALTER TABLE transactions ADD COLUMN {definition}")
+
+
+# Whether rows may be stored compact/compressed (api/storage.py). Until then the
+# schema below is plain SQL, so any SQLite client can read and write the table; the
+# decoding functions only exist on our pooled connections.
+def rows_encoded(conn: Optional[sqlite3.Connection] = None) -> bool:
+    """Whether reads must decode (api.storage.decoded_select); on a pooled connection if none."""
+    if conn is None:
+        with closing(get_connection()) as conn, conn:
+            return rows_encoded(conn)
+    row = conn.execute("SELECT encoded FROM storage_state").fetchone()
+    if row is not None:
+        return bool(row[0])
+    # First run with this table: look for encoded values once (databases from before it)
+    encoded = (
+        conn.execute(
+            "SELECT 1 FROM transactions WHERE typeof(sms_body) = 'blob' "
+            "OR typeof(message) = 'blob' OR typeof(raw_json) = 'blob' LIMIT 1"
+        ).fetchone()
+        is not None
+    )
+    _set_rows_encoded(conn, encoded)
+    return encoded
+
+
+def _set_rows_encoded(conn: sqlite3.Connection, encoded: bool) -> None:
+    """Record whether encoded rows may exist; _ensure_search_index then picks its SQL."""
+    conn.execute(
+        "INSERT INTO storage_state (id, encoded) VALUES (1, ?) "
+        "ON CONFLICT(id) DO UPDATE SET encoded = excluded.encoded",
+        (int(encoded),),
+    )
+
+
+# Full-text index over the searchable text columns (GET /transactions/search).
+# External content: the index stores only tokens and reads the text back through
+# the transactions_text view, which leaves out a message that only repeats sms_body.
+# Triggers keep it in step with every write path. The view and triggers only use
+# the decoding functions when the database holds encoded rows; for full rows both
+# forms give the same text, so switching doesn't touch the index.
+SEARCH_COLUMNS = ("sms_body", "message", "contact_name")
+PLAIN_SEARCH_VALUES = (
+    "{row}.sms_body",
+    "NULLIF({row}.message, {row}.sms_body)",
+    "{row}.contact_name",
+)
+DECODED_SEARCH_VALUES = (
+    "momo_body({row}.sms_body)",
+    "momo_distinct_message({row}.message, {row}.sms_body)",
+    "{row}.contact_name",
+)
+SEARCH_TRIGGERS = ("transactions_fts_insert", "transactions_fts_delete", "transactions_fts_update")
+
+
+def _ensure_search_index(conn: sqlite3.Connection) -> None:
+    definition = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'"
+    ).fetchone()
+    rebuild = definition is None
+    if definition is not None and "transactions_text" not in definition[0]:
+        # Index from before the view: it read the raw columns, so start over
+        _drop_search_triggers(conn)
+        conn.execute("DROP TABLE transactions_fts")
+        rebuild = True
+
+    search_values = DECODED_SEARCH_VALUES if rows_encoded(conn) else PLAIN_SEARCH_VALUES
+    columns = ", ".join(SEARCH_COLUMNS)
+    view_values = ", ".join(v.format(row="transactions") for v in search_values)
+    view = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'transactions_text'"
+    ).fetchone()
+    if view is not None and view_values not in view[0]:
+        # Written for the other storage state: replace the view and the triggers
+        conn.execute("DROP VIEW transactions_text")
+        _drop_search_triggers(conn)
+    conn.execute(
+        f"""
+        CREATE VIEW IF NOT EXISTS transactions_text (id, {columns}) AS
+        SELECT id, {view_values}
+        FROM transactions
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+            {columns},
+            content = 'transactions_text',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """
+    )
+    new_values = ", ".join(v.format(row="new") for v in search_values)
+    old_values = ", ".join(v.format(row="old") for v in search_values)
+    insert, delete, update = SEARCH_TRIGGERS
+    triggers = {
+        insert: f"""
+            AFTER INSERT ON transactions BEGIN
+                INSERT INTO transactions_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        """,
+        delete: f"""
+            AFTER DELETE ON transactions BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, {columns})
+                VALUES ('delete', old.id, {old_values});
+            END
+        """,
+        update: f"""
+            AFTER UPDATE OF {columns} ON transactions BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, {columns})
+                VALUES ('delete', old.id, {old_values});
+                INSERT INTO transactions_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        """,
+    }
+    for name, body in triggers.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    if rebuild:
+        # Index whatever the table already holds (databases from before the index)
+        conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+def _drop_search_triggers(conn: sqlite3.Connection) -> None:
+    for name in SEARCH_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+INSERT_SQL = """
+    INSERT INTO transactions (
+        sms_address, sms_date, sms_type, sms_body, transaction_type, amount, currency,
+        sender, receiver, balance, fee, transaction_id, external_transaction_id, message,
+        readable_date, contact_name, raw_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Same columns as INSERT_SQL, but skips rows whose transaction_id (?12) is already stored
+INSERT_NEW_SQL = """
+    INSERT INTO transactions (
+        sms_address, sms_date, sms_type, sms_body, transaction_type, amount, currency,
+        sender, receiver, balance, fee, transaction_id, external_transaction_id, message,
+        readable_date, contact_name, raw_json
+    )
+    SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, ?12, ?13, ?14, ?15, ?16, ?17
+    WHERE ?12 IS NULL
+       OR NOT EXISTS (SELECT 1 FROM transactions WHERE transaction_id = ?12)
+"""
+
+
+def to_row(t: TransactionCreate) -> Tuple[Any, ...]:
+    """INSERT_SQL parameters for one transaction, encoded for STORAGE_MODE."""
+    values = (
+        t.sms_address,
+        t.sms_date.isoformat(),
+        t.sms_type,
+        t.sms_body,
+        t.transaction_type,
+        t.amount,
+        t.currency,
+        t.sender,
+        t.receiver,
+        t.balance,
+        t.fee,
+        t.transaction_id,
+        t.external_transaction_id,
+        t.message,
+        t.readable_date,
+        t.contact_name,
+        t.raw_json if t.raw_json is not None else {},
+    )
+    return encode_row(values, STORAGE_MODE)
+
+
+def _insert_rows(rows: Iterable[Tuple[Any, ...]]) -> None:
+    rows = list(rows)
     with closing(get_connection()) as conn, conn:
-        conn.executemany(
-            """
-            INSERT INTO transactions (
-                sms_address, sms_date, sms_type, sms_body, transaction_type, amount, currency,
-                sender, receiver, balance, fee, transaction_id, external_transaction_id, message,
-                readable_date, contact_name, raw_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            [
-                (
-                    t.sms_address,
-                    t.sms_date.isoformat(),
-                    t.sms_type,
-                    t.sms_body,
-                    t.transaction_type,
-                    t.amount,
-                    t.currency,
-                    t.sender,
-                    t.receiver,
-                    t.balance,
-                    t.fee,
-                    t.transaction_id,
-                    t.external_transaction_id,
-                    t.message,
-                    t.readable_date,
-                    t.contact_name,
-                    __import__("json").dumps(t.raw_json),
-                )
-                for t in transactions
-            ],
+        conn.executemany(INSERT_SQL, rows)
+        refresh_daily_rollups(conn, row_days(rows))
+
+
+def _insert_transactions(transactions: Iterable[TransactionCreate]) -> None:
+    _insert_rows([to_row(t) for t in transactions])
+
+
+# -----------------------------
+# Daily rollups
+# -----------------------------
+ROLLUP_SELECT_SQL = """
+    SELECT substr(sms_date, 1, 10) AS day, transaction_type, COUNT(*), SUM(amount),
+           SUM(fee), MIN(amount), MAX(amount), MIN(balance), MAX(balance)
+    FROM transactions
+"""
+
+
+def row_days(rows: Iterable[Tuple[Any, ...]]) -> List[str]:
+    """Calendar days (sms_date prefixes) touched by a batch of to_row tuples."""
+    return sorted({row[1][:10] for row in rows})
+
+
+def refresh_daily_rollups(conn: sqlite3.Connection, days: Iterable[str]) -> None:
+    """
+    Recompute the daily_rollups rows for `days` ("YYYY-MM-DD") from transactions.
+    Call it inside the transaction that changed those days so both commit together.
+    Whole days are recomputed because MIN/MAX can't be undone incrementally; each one
+    is a range scan on idx_transactions_sms_date, so the cost is one day of rows.
+    """
+    for day in days:
+        conn.execute("DELETE FROM daily_rollups WHERE day = ?", (day,))
+        # "~" sorts after every character that follows the date in an isoformat string
+        conn.execute(
+            f"INSERT INTO daily_rollups {ROLLUP_SELECT_SQL} "
+            "WHERE sms_date >= ?1 AND sms_date < ?1 || '~' GROUP BY day, transaction_type",
+            (day,),
         )
 
 
-def initialize_database() -> None:
-    # Remove existing database file if present
-    if os.path.exists(DATABASE_PATH):
-        os.remove(DATABASE_PATH)
+def rebuild_daily_rollups(conn: sqlite3.Connection) -> int:
+    """Recompute every rollup row from scratch (repair); returns the number of rows."""
+    conn.execute("DELETE FROM daily_rollups")
+    conn.execute(
+        f"INSERT INTO daily_rollups {ROLLUP_SELECT_SQL} GROUP BY day, transaction_type"
+    )
+    return conn.execute("SELECT COUNT(*) FROM daily_rollups").fetchone()[0]
+
+
+def _rollups_missing(conn: sqlite3.Connection) -> bool:
+    # Databases created before daily_rollups existed have transactions but no rollups
+    has_rollups = conn.execute("SELECT 1 FROM daily_rollups LIMIT 1").fetchone()
+    has_rows = conn.execute("SELECT 1 FROM transactions LIMIT 1").fetchone()
+    return has_rows is not None and has_rollups is None
+
+
+def transform_item(item: Dict[str, Any]) -> TransactionCreate:
+    """Map one loader record (see dsa.data_loader.build_transaction) onto our schema."""
+    timestamp_ms = item.get("timestamp_ms") or 0
+    dt = datetime.fromtimestamp((timestamp_ms or 0) / 1000.0, tz=timezone.utc)
+    amount_float = item.get("amount") or 0.0
+    amount_int = int(math.floor(amount_float))
+    transaction_type = item.get("type") or "unknown"
+    counterparty = item.get("counterparty")
+    balance = item.get("balance")
+    tx_id = item.get("tx_id")
+
+    return TransactionCreate(
+        sms_address=item.get("sms_address") or "N/A",
+        sms_date=dt,
+        sms_type="SMS",
+        sms_body=item.get("raw_body") or "",
+        transaction_type=transaction_type,
+        amount=amount_int,
+        currency="RWF",
+        sender=counterparty if transaction_type == "money_in" else None,
+        receiver=counterparty if transaction_type != "money_in" else None,
+        balance=int(math.floor(balance)) if balance is not None else None,
+        fee=int(math.floor((item.get("fee") or 0.0)) or 0),
+        # The loader uses "N/A" for messages without a TxId; store those as NULL
+        transaction_id=tx_id if tx_id and tx_id != "N/A" else None,
+        external_transaction_id=None,
+        message=item.get("raw_body") or "",
+        readable_date=item.get("readable_date") or None,
+        contact_name=None,
+        raw_json=item,
+    )
+
+
+# -----------------------------
+# Parallel ingest
+# -----------------------------
+class ChunkResult(NamedTuple):
+    """Rows of one chunk, plus what telemetry needs from the (possibly remote) worker."""
+
+    rows: List[Tuple[Any, ...]]
+    unknown_type: int
+    missing_tx_id: int
+    extract_seconds: float
+    validate_seconds: float
+    # Messages for the dead-letter writer (only when quarantining)
+    rejected: List[Rejection]
+
+
+def _process_chunk(
+    chunk: List[Tuple[int, Dict[str, str]]], quarantine: bool = False
+) -> ChunkResult:
+    """
+    Worker side: extract, validate and flatten one chunk of raw <sms> attributes.
+    With `quarantine`, messages failing the dsa/dead_letter.py checks or validation
+    come back in `rejected` instead of raising or becoming rows.
+    """
+    start = time.perf_counter()
+    rejected: List[Rejection] = []
+    if quarantine:
+        records = []
+        for row_id, sms in chunk:
+            record, rejection = extract_record(row_id, sms)
+            if rejection is None:
+                records.append(record)
+            else:
+                rejected.append(rejection)
+    else:
+        records = [build_transaction(row_id, sms) for row_id, sms in chunk]
+    extracted = time.perf_counter()
+    if quarantine:
+        rows = []
+        for record in records:
+            try:
+                rows.append(to_row(transform_item(record)))
+            except (ValueError, OverflowError, OSError) as exc:  # ValidationError included
+                row_id = record["id"]
+                sms = next(sms for chunk_id, sms in chunk if chunk_id == row_id)
+                rejected.append(
+                    Rejection(row_id, sms, "validation_error", f"{type(exc).__name__}: {exc}")
+                )
+    else:
+        rows = [to_row(transform_item(record)) for record in records]
+    return ChunkResult(
+        rows,
+        sum(1 for record in records if record["type"] == "unknown"),
+        sum(1 for record in records if record["tx_id"] == "N/A"),
+        extracted - start,
+        time.perf_counter() - extracted,
+        rejected,
+    )
+
+
+def iter_chunks(
+    xml_path: str,
+    chunk_size: int,
+    since_ms: int,
+    scan: Dict[str, int],
+    telemetry: Optional[IngestTelemetry] = None,
+    dead_letter: Optional[DeadLetterWriter] = None,
+) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    """
+    Group the raw <sms> attributes into chunks, skipping messages at or below the
+    `since_ms` high-water mark. The largest `date` seen is recorded in `scan`; with
+    `telemetry`, messages seen, bytes read and time spent parsing are counted, and
+    progress is reported between chunks. With `dead_letter`, recovered XML errors
+    are reported to it and messages with an unreadable date are passed on for the
+    workers to reject, rather than raising here.
+    """
+    chunk: List[Tuple[int, Dict[str, str]]] = []
+    row_id = 0
+    start = time.perf_counter()
+    for row_id, sms in enumerate(iter_sms_attributes(xml_path, telemetry, dead_letter), start=1):
+        try:
+            timestamp_ms = int(sms.get("date", 0) or 0)
+        except ValueError:
+            if dead_letter is None:
+                raise
+            chunk.append((row_id, sms))
+            continue
+        if timestamp_ms > scan["high_water_ms"]:
+            scan["high_water_ms"] = timestamp_ms
+        if timestamp_ms <= since_ms:
+            continue
+        chunk.append((row_id, sms))
+        if len(chunk) >= chunk_size:
+            if telemetry is not None:
+                telemetry.counters["messages_seen"] = row_id
+                telemetry.add_time("parse", time.perf_counter() - start)
+                telemetry.tick()
+            yield chunk
+            chunk = []
+            start = time.perf_counter()
+    if telemetry is not None:
+        telemetry.counters["messages_seen"] = row_id
+        telemetry.add_time("parse", time.perf_counter() - start)
+    if chunk:
+        yield chunk
+
+
+def _iter_rows_parallel(
+    chunks: Iterable[List[Tuple[int, Dict[str, str]]]], workers: int, quarantine: bool = False
+) -> Iterator[ChunkResult]:
+    """
+    Fan chunks out to a process pool and yield their rows back in submission order,
+    so ids come out exactly as in the serial path. Only a few chunks per worker are
+    in flight at once, which keeps memory bounded on multi-million-message backups.
+    """
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque["Future[ChunkResult]"] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_process_chunk, chunk, quarantine))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# -----------------------------
+# Incremental ingest
+# -----------------------------
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_ingest_state(conn: sqlite3.Connection, source_path: str) -> Optional[sqlite3.Row]:
+    return conn.execute(
+        "SELECT * FROM ingest_state WHERE source_path = ?", (source_path,)
+    ).fetchone()
+
+
+def _write_ingest_state(
+    conn: sqlite3.Connection, source_path: str, stat: os.stat_result, sha256: str, high_water_ms: int
+) -> None:
+    conn.execute(
+        """
+        INSERT INTO ingest_state (
+            source_path, source_size, source_mtime_ns, source_sha256, high_water_ms, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(source_path) DO UPDATE SET
+            source_size = excluded.source_size,
+            source_mtime_ns = excluded.source_mtime_ns,
+            source_sha256 = excluded.source_sha256,
+            high_water_ms = excluded.high_water_ms,
+            updated_at = excluded.updated_at
+        """,
+        (
+            source_path,
+            stat.st_size,
+            stat.st_mtime_ns,
+            sha256,
+            high_water_ms,
+            datetime.now(timezone.utc).isoformat(),
+        ),
+    )
+
+
+class IngestPlan(NamedTuple):
+    """What an incremental load of one XML file has to do (see plan_ingest)."""
+
+    source_path: str
+    stat: os.stat_result
+    sha256: str
+    since_ms: int  # messages at or below this `date` are already stored
+    first_load: bool
+
+
+def plan_ingest(conn: sqlite3.Connection, source_path: str) -> Optional[IngestPlan]:
+    """
+    Compare `source_path` with its stored ingest state; None means it is up to date.
+    Also repairs missing rollups, and records a new mtime when only that changed.
+    """
+    stat = os.stat(source_path)
+    if _rollups_missing(conn):
+        with conn:
+            rebuild_daily_rollups(conn)
+
+    state = _read_ingest_state(conn, source_path)
+
+    if state is not None and (
+        state["source_size"] == stat.st_size
+        and state["source_mtime_ns"] == stat.st_mtime_ns
+    ):
+        # Cheap check first: same size and mtime means nothing to do
+        return None
+
+    sha256 = _file_sha256(source_path)
+    since_ms = state["high_water_ms"] if state is not None else -1
+
+    if state is not None and state["source_sha256"] == sha256:
+        # Touched but not changed: just remember the new mtime
+        with conn:
+            _write_ingest_state(conn, source_path, stat, sha256, since_ms)
+        return None
+
+    return IngestPlan(source_path, stat, sha256, since_ms, state is None)
+
+
+def begin_load(conn: sqlite3.Connection, plan: IngestPlan) -> None:
+    # Explicit BEGIN so the trigger swap below is part of the transaction too
+    conn.execute("BEGIN IMMEDIATE")
+    if plan.first_load:
+        # First load: index the text in one pass at the end, not row by row
+        conn.execute("DROP TRIGGER IF EXISTS transactions_fts_insert")
+
+
+def finish_load(
+    conn: sqlite3.Connection, plan: IngestPlan, days: Iterable[str], high_water_ms: int
+) -> None:
+    """Rollups, search index and ingest state for the rows inserted since begin_load."""
+    if plan.first_load:
+        # Likewise one GROUP BY over the table beats a scan per day
+        rebuild_daily_rollups(conn)
+        conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+        _ensure_search_index(conn)
+    else:
+        refresh_daily_rollups(conn, sorted(days))
+    _write_ingest_state(conn, plan.source_path, plan.stat, plan.sha256, high_water_ms)
+
+
+def database_exists(path: Optional[str] = None) -> bool:
+    """Whether `path` (default DATABASE_PATH) holds a transactions table."""
+    path = path or DATABASE_PATH
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    with closing(sqlite3.connect(path)) as conn:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"
+        ).fetchone()
+    return row is not None
+
+
+def reset_database_file(path: Optional[str] = None) -> None:
+    """Delete `path` (default DATABASE_PATH) and its WAL files, making its directory."""
+    path = path or DATABASE_PATH
+    if _pool is not None and _pool.path == path:
+        # Pooled connections still point at the old file
+        close_pool()
+
+    # Remove existing database file (and its WAL side files) if present
+    for file_path in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(file_path):
+            os.remove(file_path)
 
     # Ensure parent directory exists
-    parent_dir = os.path.dirname(DATABASE_PATH)
+    parent_dir = os.path.dirname(path)
     if parent_dir and not os.path.exists(parent_dir):
         os.makedirs(parent_dir, exist_ok=True)
 
+
+def initialize_database(
+    rebuild: bool = False,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    quarantine: Optional[bool] = None,
+) -> int:
+    """
+    Bring the database up to date with RAW_XML_PATH and return the number of rows inserted.
+
+    By default this is incremental: if the XML is unchanged since the last run
+    (same size/mtime, or same SHA-256) nothing is parsed at all; otherwise only
+    messages newer than the stored high-water mark are inserted, skipping any
+    transaction_id that is already present. Rows created through the API survive.
+    `rebuild=True` (or a missing database) deletes the file and reloads everything.
+
+    `workers` > 1 (default INGEST_WORKERS) spreads extraction and validation over a
+    process pool in chunks of `chunk_size` messages (default INGEST_CHUNK_SIZE).
+
+    Counters and stage timings are reported as "momo.ingest" log events (see
+    dsa/telemetry.py), and `progress` is called with an IngestProgress every few seconds.
+
+    With `quarantine` (default DEAD_LETTER_ENABLED), messages failing the checks in
+    dsa/dead_letter.py are appended to the dead-letter file instead of being stored
+    (see replay_dead_letter), and recovered XML errors are reported there too.
+    """
+    workers = INGEST_WORKERS if workers is None else workers
+    quarantine = DEAD_LETTER_ENABLED if quarantine is None else quarantine
+    chunk_size = max(1, INGEST_CHUNK_SIZE if chunk_size is None else chunk_size)
+
+    # A wrong XML path must not cost the existing database: no rebuild without input
+    xml_found = os.path.exists(RAW_XML_PATH)
+    if (rebuild and xml_found) or not database_exists():
+        reset_database_file()
+
     # Create tables
     ensure_table()
 
-    # Load and populate transactions from raw XML, transformed to our schema
-    raw_items = load_data_from_xml(RAW_XML_PATH)
+    if not xml_found:
+        log_event(
+            "ingest.error",
+            f"XML file '{RAW_XML_PATH}' not found. Did you check the path?",
+            level=logging.ERROR,
+            source=RAW_XML_PATH,
+            reason="file_not_found",
+        )
+        return 0
+
+    source_path = os.path.abspath(RAW_XML_PATH)
+    telemetry = IngestTelemetry("initialize_database", source_path, progress)
+    dead_letter: Optional[DeadLetterWriter] = None
+    try:
+        with closing(get_connection()) as conn:
+            with telemetry.stage("plan"):
+                plan = plan_ingest(conn, source_path)
+            if plan is None:
+                telemetry.finish("up_to_date")
+                return 0
+
+            dead_letter = (
+                DeadLetterWriter("initialize_database", source_path, telemetry)
+                if quarantine
+                else None
+            )
+            scan = {"high_water_ms": plan.since_ms}
+            chunks = iter_chunks(
+                source_path, chunk_size, plan.since_ms, scan, telemetry, dead_letter
+            )
+            if workers > 1:
+                results = _iter_rows_parallel(chunks, workers, quarantine)
+            else:
+                results = (_process_chunk(chunk, quarantine) for chunk in chunks)
+
+            # Single writer: rows, their rollups and the new high-water mark commit together
+            counters = telemetry.counters
+            days: Set[str] = set()
+            with conn:
+                begin_load(conn, plan)
+                for result in results:
+                    counters["messages_parsed"] += len(result.rows) + len(result.rejected)
+                    if result.rejected:
+                        dead_letter.reject_all(result.rejected)
+                    counters["unknown_type"] += result.unknown_type
+                    counters["missing_tx_id"] += result.missing_tx_id
+                    # Summed over workers in parallel mode, so they can exceed the wall time
+                    telemetry.add_time("extract", result.extract_seconds)
+                    telemetry.add_time("validate", result.validate_seconds)
+                    with telemetry.stage("insert"):
+                        # rowcount, unlike total_changes, leaves out the search-index triggers
+                        counters["rows_inserted"] += conn.executemany(
+                            INSERT_NEW_SQL, result.rows
+                        ).rowcount
+                    days.update(row_days(result.rows))
+                with telemetry.stage("finalize"):
+                    finish_load(conn, plan, days, scan["high_water_ms"])
+                if dead_letter is not None:
+                    # Before the commit: rows are only stored once their rejects are on disk
+                    dead_letter.close()
+    except BaseException as exc:
+        if dead_letter is not None:
+            dead_letter.close()
+        telemetry.finish("error", exc)
+        raise
+
+    telemetry.finish()
+    return counters["rows_inserted"]
+
+
+# -----------------------------
+# Dead-letter replay
+# -----------------------------
+def replay_dead_letter(
+    reasons: Optional[Iterable[str]] = None,
+    dry_run: bool = False,
+    directory: str = DEAD_LETTER_PATH,
+) -> Dict[str, Any]:
+    """
+    Re-run the pending quarantined messages (dsa/dead_letter.py), optionally only
+    those quarantined for `reasons`, through extraction, the checks and validation,
+    e.g. after fixing a rule in dsa/sms_extractor.py. Messages that pass now are
+    inserted in one transaction with their daily rollups (a TxId already stored
+    counts as a duplicate) and recorded in the replay ledger, so they stop being
+    pending; the others stay quarantined. `dry_run` reports without writing anything.
+    """
+    ensure_table()
+    entries = pending_entries(directory, reasons)
+    passed: List[Tuple[Dict[str, Any], Tuple[Any, ...]]] = []
+    still_failing: Dict[str, int] = {}
+    for entry in entries:
+        record, rejection = extract_record(entry["row_id"] or 0, entry["sms"])
+        if rejection is None:
+            try:
+                passed.append((entry, to_row(transform_item(record))))
+                continue
+            except (ValueError, OverflowError, OSError):
+                reason = "validation_error"
+        else:
+            reason = rejection.reason
+        still_failing[reason] = still_failing.get(reason, 0) + 1
+
+    results: List[Tuple[Dict[str, Any], str]] = []
+    if passed and not dry_run:
+        with closing(get_connection()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for entry, row in passed:
+                inserted = conn.execute(INSERT_NEW_SQL, row).rowcount
+                results.append((entry, "inserted" if inserted else "duplicate"))
+            refresh_daily_rollups(conn, row_days(row for _, row in passed))
+        # Only after the commit; a crash in between means these get replayed again,
+        # which the TxId check absorbs for every message that has one
+        mark_replayed(results, directory)
 
-    # # Log raw_items to a file for inspection
-    # import json as _json
+    report = {
+        "pending": len(entries),
+        "passed": len(passed),
+        "inserted": sum(1 for _, result in results if result == "inserted"),
+        "duplicates": sum(1 for _, result in results if result == "duplicate"),
+        "still_failing": still_failing,
+        "dry_run": dry_run,
+    }
+    log_event(
+        "ingest.dead_letter_replay",
+        f"dead-letter replay: {report['passed']} of {report['pending']} pending messages pass"
+        + (" (dry run)" if dry_run else f", {report['inserted']} inserted"),
+        **report,
+    )
+    return report
 
-    # with open("raw_items_log.json", "w", encoding="utf-8") as f:
-    #     _json.dump(raw_items, f, ensure_ascii=False, indent=2)
 
-    if not raw_items:
+def migrate_storage(mode: str, vacuum: bool = True) -> Dict[str, Any]:
+    """
+    Rewrite every existing row in storage `mode` (full | compact | compressed) and
+    return the size report from before and after. The search triggers are set aside
+    while rows are rewritten: the decoded text, and so the index, stays the same.
+    Back in full mode, the view and triggers go back to plain SQL as well.
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage mode: {mode!r}")
+    ensure_table()
+    with closing(get_connection()) as conn:
+        before = storage_report(conn)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            _drop_search_triggers(conn)
+            rewritten = reencode_rows(conn, mode)
+            _set_rows_encoded(conn, mode != "full" or STORAGE_MODE != "full")
+            _ensure_search_index(conn)
+    if vacuum:
+        # Pooled connections would keep the old pages pinned; VACUUM needs its own
+        close_pool()
+        with closing(sqlite3.connect(DATABASE_PATH)) as conn:
+            conn.execute("VACUUM")
+    with closing(get_connection()) as conn:
+        after = storage_report(conn)
+    return {"mode": mode, "rewritten": rewritten, "before": before, "after": after}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Load data/raw/momo.xml into the SQLite database (incremental by default)"
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="delete the database and reload everything"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="ingest worker processes")
+    parser.add_argument("--chunk-size", type=int, default=None, help="messages per worker chunk")
+    parser.add_argument(
+        "--progress", action="store_true", help="print messages/s every few seconds"
+    )
+    parser.add_argument(
+        "--rebuild-rollups",
+        action="store_true",
+        help="recompute daily_rollups from transactions (repair) and exit",
+    )
+    parser.add_argument(
+        "--rebuild-search",
+        action="store_true",
+        help="rebuild the full-text search index from transactions (repair) and exit",
+    )
+    parser.add_argument(
+        "--storage-mode",
+        choices=STORAGE_MODES,
+        default=None,
+        help="rewrite existing rows in this storage mode, print bytes/row before and after",
+    )
+    parser.add_argument(
+        "--storage-report", action="store_true", help="print bytes/row and exit"
+    )
+    parser.add_argument(
+        "--replay-dead-letter",
+        action="store_true",
+        help="re-run quarantined messages, insert the ones that pass now and exit",
+    )
+    parser.add_argument(
+        "--reason",
+        action="append",
+        choices=sorted(REASONS),
+        help="with --replay-dead-letter: only messages quarantined for this reason (repeatable)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="with --replay-dead-letter: report what would pass without writing anything",
+    )
+    args = parser.parse_args(argv)
+
+    if args.replay_dead_letter:
+        configure_ingest_logging()
+        print(json.dumps(replay_dead_letter(args.reason, args.dry_run), indent=2))
         return
 
-    transformed: List[TransactionCreate] = []
-    from datetime import datetime, timezone
-    import math
-
-    for item in raw_items:
-        timestamp_ms = item.get("timestamp_ms") or 0
-        dt = datetime.fromtimestamp((timestamp_ms or 0) / 1000.0, tz=timezone.utc)
-        amount_float = item.get("amount") or 0.0
-        amount_int = int(math.floor(amount_float))
-
-        tx = TransactionCreate(
-            sms_address=item.get("sms_address") or "N/A",
-            sms_date=dt,
-            sms_type="SMS",
-            sms_body=item.get("raw_body") or "",
-            transaction_type=item.get("type") or "unknown",
-            amount=amount_int,
-            currency="RWF",
-            sender=None,
-            receiver=None,
-            balance=None,
-            fee=int(math.floor((item.get("fee") or 0.0)) or 0),
-            transaction_id=(item.get("tx_id") or None),
-            external_transaction_id=None,
-            message=item.get("raw_body") or "",
-            readable_date=item.get("readable_date") or None,
-            contact_name=None,
-            raw_json=item,
-        )
-        transformed.append(tx)
+    if args.storage_mode:
+        print(json.dumps(migrate_storage(args.storage_mode), indent=2))
+        return
+
+    if args.storage_report:
+        ensure_table()
+        with closing(get_connection()) as conn:
+            print(json.dumps(storage_report(conn), indent=2))
+        return
+
+    if args.rebuild_search:
+        ensure_table()
+        with closing(get_connection()) as conn, conn:
+            conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+        print(f"Rebuilt the full-text search index in {DATABASE_PATH}")
+        return
+
+    if args.rebuild_rollups:
+        ensure_table()
+        with closing(get_connection()) as conn, conn:
+            count = rebuild_daily_rollups(conn)
+        print(f"Rebuilt {count} daily rollup rows in {DATABASE_PATH}")
+        return
+
+    configure_ingest_logging()
+    inserted = initialize_database(
+        rebuild=args.rebuild,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        progress=print_progress if args.progress else None,
+    )
+    print(f"Inserted {inserted} transactions into {DATABASE_PATH}")
+
 
-    _insert_transactions(transformed)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
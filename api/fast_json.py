@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is slower
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Compact UTF-8 JSON, with orjson if installed. The stdlib fallback gives exactly
+    the bytes of Starlette's JSONResponse; orjson gives the same values but writes
+    some floats differently (1.5e20 where json writes 1.5e+20).
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def loads(text: Any) -> Any:
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def utc_z(value: Any) -> Any:
+    # pydantic writes a UTC datetime as "...Z"; the table stores isoformat ("+00:00")
+    if isinstance(value, str) and value.endswith("+00:00"):
+        return value[:-6] + "Z"
+    return value
+
+
+def row_dicts(
+    rows: Iterable[Sequence[Any]],
+    columns: List[str],
+    datetime_columns: Iterable[str] = (),
+    fields: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Plain tuples from our own table to the dicts a response_model would produce,
+    without building or validating models. raw_json is parsed (the same way
+    as _row_to_data does: bad text -> None), `datetime_columns` get the model's
+    "Z" suffix and keys come out in `fields` order (the model's field order).
+    """
+    fields = fields or columns
+    order = [columns.index(f) for f in fields]
+    raw_at = fields.index("raw_json") if "raw_json" in fields else -1
+    date_at = [fields.index(c) for c in datetime_columns if c in fields]
+    items = []
+    for row in rows:
+        values = [row[i] for i in order]
+        if raw_at >= 0:
+            raw = values[raw_at]
+            if raw:
+                try:
+                    values[raw_at] = loads(raw)
+                except ValueError:
+                    values[raw_at] = None
+        for i in date_at:
+            values[i] = utc_z(values[i])
+        items.append(dict(zip(fields, values)))
+    return items
+
+
+__all__ = [
+    "dumps",
+    "loads",
+    "row_dicts",
+    "utc_z",
+]
@@ -0,0 +1,427 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+
+# Upper bounds (le) of the histogram buckets; +Inf is always added
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5, 1.0)
+SIZE_BUCKETS = (128, 1024, 8192, 65536, 524288, 4194304, 33554432)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# Rows fetched per step when an instrumented cursor is iterated
+ITER_BATCH_SIZE = 256
+
+# Route label for requests that matched no route (404s, 405s), so scanners can't
+# create a series per probed path
+UNMATCHED_ROUTE = "unmatched"
+
+# First object a statement names (DDL: the table, index or trigger being created)
+_TABLE_RE = re.compile(
+    r'\b(?:FROM|INTO|UPDATE|TABLE|INDEX|TRIGGER)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?"?(\w+)',
+    re.IGNORECASE,
+)
+
+
+class Histogram:
+    """Prometheus-style histogram: count per bucket (cumulated when rendered), sum and count."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # le is inclusive: a value equal to a bound falls in that bound's bucket
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> Iterable[str]:
+        sep = "," if labels else ""
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield f'{name}_bucket{{{labels}{sep}le="{_number(bound)}"}} {total}'
+        yield f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {_number(self.sum)}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+@lru_cache(maxsize=1024)
+def statement_labels(sql: str) -> Tuple[str, str]:
+    """(operation, table) for a SQL statement, e.g. ("SELECT", "transactions")."""
+    words = sql.split(None, 1)
+    operation = words[0].upper() if words else ""
+    table = _TABLE_RE.search(sql)
+    return operation, table.group(1) if table else ""
+
+
+class MetricsRegistry:
+    """
+    HTTP request and SQLite statement metrics for one process, rendered in the
+    Prometheus text format. Observations come from the event loop (requests) and
+    from threadpool threads (statements), so every update takes the lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._sizes: Dict[Tuple[str, str], Histogram] = {}
+        self._queries: Dict[Tuple[str, str], Histogram] = {}
+        self._rows: Dict[Tuple[str, str], Histogram] = {}
+        self._query_errors: Dict[Tuple[str, str], int] = {}
+
+    def observe_request(
+        self, method: str, route: str, status_code: int, size: int, seconds: float
+    ) -> None:
+        key = (method, route)
+        with self._lock:
+            counts_key = (method, route, str(status_code))
+            self._requests[counts_key] = self._requests.get(counts_key, 0) + 1
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._sizes[key] = Histogram(SIZE_BUCKETS)
+            latency.observe(seconds)
+            self._sizes[key].observe(size)
+
+    def observe_query(self, sql: str, seconds: float, rows: int, failed: bool = False) -> None:
+        key = statement_labels(sql)
+        with self._lock:
+            if failed:
+                self._query_errors[key] = self._query_errors.get(key, 0) + 1
+                return
+            timing = self._queries.get(key)
+            if timing is None:
+                timing = self._queries[key] = Histogram(QUERY_BUCKETS)
+                self._rows[key] = Histogram(ROW_BUCKETS)
+            timing.observe(seconds)
+            self._rows[key].observe(rows)
+
+    def instrument(self, conn: sqlite3.Connection) -> "InstrumentedConnection":
+        """Connection wrapper for api.db.set_connection_wrapper."""
+        return InstrumentedConnection(conn, self)
+
+    def render(self) -> str:
+        out: List[str] = []
+        request = ("method", "route")
+        statement = ("operation", "table")
+        with self._lock:
+            _counters(
+                out,
+                "http_requests_total",
+                "HTTP requests by route and status.",
+                ("method", "route", "status"),
+                self._requests,
+            )
+            _histograms(
+                out,
+                "http_request_duration_seconds",
+                "Time from request start to the last body byte sent.",
+                request,
+                self._latency,
+            )
+            _histograms(
+                out, "http_response_size_bytes", "Response body size.", request, self._sizes
+            )
+            _histograms(
+                out,
+                "sqlite_query_duration_seconds",
+                "Time in execute() plus fetching every row, by statement.",
+                statement,
+                self._queries,
+            )
+            _histograms(
+                out,
+                "sqlite_query_rows",
+                "Rows fetched (queries) or changed (writes) per statement.",
+                statement,
+                self._rows,
+            )
+            _counters(
+                out,
+                "sqlite_query_errors_total",
+                "Statements that raised.",
+                statement,
+                self._query_errors,
+            )
+        return "\n".join(out) + "\n"
+
+
+def render_stats(
+    prefix: str, stats: Mapping[str, Any], counters: Iterable[str] = (), help_text: str = ""
+) -> str:
+    """
+    Numeric fields of a stats() dict (e.g. ConnectionPool.stats()) as metrics named
+    <prefix>_<field>: gauges, except the `counters` (suffixed _total). Booleans become
+    0/1; None, strings and nested values are skipped.
+    """
+    counters = set(counters)
+    out: List[str] = []
+    for field, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if not isinstance(value, (int, float)):
+            continue
+        if field in counters:
+            name = f"{prefix}_{field.removesuffix('_total')}_total"
+            _header(out, name, "counter", help_text)
+        else:
+            name = f"{prefix}_{field}"
+            _header(out, name, "gauge", help_text)
+        out.append(f"{name} {_number(value)}")
+    return "\n".join(out) + "\n" if out else ""
+
+
+# -----------------------------
+# SQLite statement timing
+# -----------------------------
+class InstrumentedConnection:
+    """
+    Thin proxy around a pooled sqlite3 connection: execute() and executemany()
+    return an InstrumentedCursor; everything else (row_factory, commit, close,
+    `with conn:` transactions) goes straight to the real connection.
+    """
+
+    __slots__ = ("_conn", "_metrics")
+
+    def __init__(self, conn: sqlite3.Connection, metrics: MetricsRegistry) -> None:
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_metrics", metrics)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._conn, name, value)
+
+    def __enter__(self) -> "InstrumentedConnection":
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        return self._conn.__exit__(*exc_info)
+
+    def execute(self, sql: str, parameters: Any = ()) -> "InstrumentedCursor":
+        return self._run(self._conn.execute, sql, parameters)
+
+    def executemany(self, sql: str, parameters: Iterable[Any]) -> "InstrumentedCursor":
+        return self._run(self._conn.executemany, sql, parameters)
+
+    def _run(
+        self, method: Callable[..., sqlite3.Cursor], sql: str, parameters: Any
+    ) -> "InstrumentedCursor":
+        start = time.perf_counter()
+        try:
+            cursor = method(sql, parameters)
+        except Exception:
+            self._metrics.observe_query(sql, time.perf_counter() - start, 0, failed=True)
+            raise
+        return InstrumentedCursor(cursor, self._metrics, sql, time.perf_counter() - start)
+
+
+class InstrumentedCursor:
+    """
+    SQLite does most of a query's work while rows are fetched, not in execute(), so
+    the statement is recorded once it is finished with: fetchall(), a fetch that
+    comes back empty, close(), or the cursor being dropped (the usual
+    `conn.execute(...).fetchone()`).
+    """
+
+    __slots__ = ("_cursor", "_metrics", "_sql", "_seconds", "_rows", "_done")
+
+    def __init__(
+        self, cursor: sqlite3.Cursor, metrics: MetricsRegistry, sql: str, seconds: float
+    ) -> None:
+        self._cursor = cursor
+        self._metrics = metrics
+        self._sql = sql
+        self._seconds = seconds
+        self._rows = 0
+        self._done = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __iter__(self) -> Iterator[Any]:
+        # Timed a batch at a time: a clock read per row would double the cost of a scan
+        while True:
+            rows = self.fetchmany(ITER_BATCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def __next__(self) -> Any:
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def fetchone(self) -> Any:
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._seconds += time.perf_counter() - start
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(self._cursor.arraysize if size is None else size)
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self) -> List[Any]:
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self) -> None:
+        self._finish()
+        self._cursor.close()
+
+    def __del__(self) -> None:
+        self._finish()
+
+    def _finish(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        cursor = self._cursor
+        # Writes without RETURNING have no result columns: count the rows they changed
+        rows = self._rows if cursor.description is not None else max(cursor.rowcount, 0)
+        self._metrics.observe_query(self._sql, self._seconds, rows)
+
+
+# -----------------------------
+# Request middleware
+# -----------------------------
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task per request) recording
+    latency, status and body size per route template (e.g. "/transactions/{transaction_id}").
+    Latency runs until the last body chunk is sent, so streamed exports count in full.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        size = 0
+
+        async def send_and_measure(message: Dict[str, Any]) -> None:
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            # The router stores the matched route in the scope it was handed
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.registry.observe_request(
+                scope["method"], route, status_code, size, time.perf_counter() - start
+            )
+
+
+def _counters(
+    out: List[str],
+    name: str,
+    help_text: str,
+    label_names: Sequence[str],
+    series: Mapping[Tuple[str, ...], int],
+) -> None:
+    _header(out, name, "counter", help_text)
+    for key, count in sorted(series.items()):
+        out.append(f"{name}{{{_labels(label_names, key)}}} {count}")
+
+
+def _histograms(
+    out: List[str],
+    name: str,
+    help_text: str,
+    label_names: Sequence[str],
+    series: Mapping[Tuple[str, ...], Histogram],
+) -> None:
+    _header(out, name, "histogram", help_text)
+    for key, hist in sorted(series.items()):
+        out.extend(hist.lines(name, _labels(label_names, key)))
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _header(out: List[str], name: str, kind: str, help_text: str) -> None:
+    if help_text:
+        out.append(f"# HELP {name} {help_text}")
+    out.append(f"# TYPE {name} {kind}")
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+__all__ = [
+    "Histogram",
+    "InstrumentedConnection",
+    "InstrumentedCursor",
+    "MetricsMiddleware",
+    "MetricsRegistry",
+    "UNMATCHED_ROUTE",
+    "render_stats",
+    "statement_labels",
+]
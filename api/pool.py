@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Applied once to every new connection, in this order
+DEFAULT_PRAGMAS: Dict[str, str] = {
+    "journal_mode": "WAL",  # readers no longer block behind a writer
+    "synchronous": "NORMAL",  # safe with WAL, one fsync per checkpoint instead of per commit
+    "cache_size": "-16000",  # negative = KiB, so ~16 MB page cache per connection
+    "mmap_size": "134217728",  # 128 MB of the file read through mmap
+    "temp_store": "MEMORY",
+    "busy_timeout": "5000",  # ms to wait on a locked database before failing
+}
+
+
+def parse_pragmas(spec: Optional[str]) -> Dict[str, str]:
+    """Parse "synchronous=FULL,cache_size=-64000" into a dict (used for SQLITE_PRAGMAS)."""
+    pragmas: Dict[str, str] = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip().isidentifier():
+            raise ValueError(f"Invalid PRAGMA setting: {item!r}")
+        pragmas[name.strip()] = value.strip()
+    return pragmas
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No connection became free within the pool timeout."""
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    A sqlite3 connection whose close() hands it back to its pool, so existing
+    `with closing(get_connection())` call sites keep working unchanged.
+    """
+
+    _pool: Optional["ConnectionPool"] = None
+    _checked_out = False
+
+    def close(self) -> None:
+        pool = self._pool
+        if pool is not None and self._checked_out:
+            pool.release(self)
+        else:
+            super().close()
+
+    def __del__(self) -> None:
+        # Dropped without close(): give the slot back so the pool can't leak dry
+        pool = self._pool
+        if pool is not None and self._checked_out:
+            pool._forget()
+
+
+class ConnectionPool:
+    """
+    Fixed-size, thread-safe pool of SQLite connections to one database file.
+
+    Idle connections are reused last-in-first-out (warmest page cache first). When
+    all `size` connections are checked out, callers wait up to `timeout` seconds.
+    `setup` runs once on each new connection, after the PRAGMAs (e.g. to register
+    SQL functions).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        size: int = 40,
+        pragmas: Optional[Dict[str, str]] = None,
+        timeout: float = 30.0,
+        setup: Optional[Callable[[sqlite3.Connection], None]] = None,
+    ) -> None:
+        self.path = path
+        self.setup = setup
+        self.size = max(1, size)
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+        self._idle: List[PooledConnection] = []
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.path, factory=PooledConnection, check_same_thread=False
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.setup is not None:
+            self.setup(conn)
+        conn._pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        with self._cond:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if self._idle:
+                self.hits += 1
+                conn = self._idle.pop()
+            elif self._created < self.size:
+                self.misses += 1
+                self._created += 1
+                conn = None
+            else:
+                self.waits += 1
+                start = time.perf_counter()
+                ready = self._cond.wait_for(
+                    lambda: self._idle or self._created < self.size or self._closed,
+                    timeout=self.timeout,
+                )
+                waited = time.perf_counter() - start
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+                if not ready or self._closed:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"No SQLite connection free after {self.timeout:.1f}s "
+                        f"(pool size {self.size})"
+                    )
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    self._created += 1
+                    conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._forget()
+                raise
+        conn.row_factory = sqlite3.Row
+        conn._checked_out = True
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        conn._checked_out = False
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            if not self._closed:
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+            self._created -= 1
+        sqlite3.Connection.close(conn)
+
+    def _forget(self) -> None:
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Close idle connections now; checked-out ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            requests = self.hits + self.misses + self.waits
+            return {
+                "path": self.path,
+                "size": self.size,
+                "open": self._created,
+                "idle": len(self._idle),
+                "in_use": self._created - len(self._idle),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "hit_ratio": round(self.hits / requests, 4) if requests else None,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "pragmas": dict(self.pragmas),
+            }
+
+
+__all__ = [
+    "DEFAULT_PRAGMAS",
+    "ConnectionPool",
+    "PoolTimeout",
+    "PooledConnection",
+    "parse_pragmas",
+]
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import functools
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl
+
+from anyio import to_thread
+from fastapi.routing import APIRoute
+
+
+# Header (any value but "0") or query parameter (?profile=1) asking for a profile
+PROFILE_HEADER = b"x-profile"
+PROFILE_PARAM = "profile"
+# Functions listed in the summary, for each sort order
+SUMMARY_LIMIT = 30
+
+_SLUG_RE = re.compile(r"[^A-Za-z0-9]+")
+
+# Set while a profiled request is being handled; copied into threadpool threads
+_session: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """
+    cProfile data for one request. cProfile only sees the thread that enabled it, so
+    the event loop thread and each threadpool call running an endpoint get their
+    own profiler, merged when the profile is written.
+    """
+
+    def __init__(self, method: str, path: str, query: str) -> None:
+        self.method = method
+        self.path = path
+        self.query = query
+        self.status_code = 0
+        self.seconds = 0.0
+        self.started = datetime.now(timezone.utc)
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        slug = _SLUG_RE.sub("-", self.path).strip("-") or "root"
+        return f"{self.started:%Y%m%dT%H%M%S.%fZ}-{self.method}-{slug}"
+
+    @property
+    def profiled(self) -> bool:
+        """Whether any profiler of this session could be enabled."""
+        return bool(self._profiles)
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        """
+        Profile the block in this thread; run it unprofiled if another profiler is
+        already active (Python 3.12+ allows one per interpreter, which then sees
+        every thread, e.g. the loop thread's profiler covers the endpoint too).
+        """
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            yield
+            return
+        with self._lock:
+            self._profiles.append(profiler)
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    def write(self, directory: str) -> str:
+        """Write <name>.pstats and a <name>.txt summary; returns the .pstats path."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.name)
+        stats = pstats.Stats(self._profiles[0])
+        for profiler in self._profiles[1:]:
+            stats.add(profiler)
+        stats.dump_stats(base + ".pstats")
+
+        summary = io.StringIO()
+        target = f"{self.path}?{self.query}" if self.query else self.path
+        summary.write(
+            f"{self.method} {target} -> {self.status_code} in {1000 * self.seconds:.2f} ms "
+            f"({len(self._profiles)} profiled threads; the event loop thread's time includes "
+            f"waiting in select() while the endpoint runs)\n"
+            f"Full profile: {os.path.basename(base)}.pstats "
+            f"(python -m pstats, snakeviz, ...)\n"
+        )
+        stats.stream = summary
+        stats.strip_dirs()
+        for order in ("cumulative", "tottime"):
+            summary.write(f"\n=== Top {SUMMARY_LIMIT} by {order} ===\n")
+            stats.sort_stats(order).print_stats(SUMMARY_LIMIT)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        return base + ".pstats"
+
+
+def profile_requested(scope: Dict[str, Any]) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value not in (b"", b"0")
+    query = scope.get("query_string", b"")
+    if PROFILE_PARAM.encode() not in query:
+        return False
+    return any(
+        name == PROFILE_PARAM and value not in ("", "0")
+        for name, value in parse_qsl(query.decode("latin-1"), keep_blank_values=True)
+    )
+
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class ProfileMiddleware:
+    """
+    Runs a request under cProfile when it carries an X-Profile header or ?profile=1
+    and `authorize` accepts its Authorization header; anything else passes straight
+    through after the header check. The profile covers the event loop thread
+    (routing, middleware, response serialization) and the endpoint function in its
+    threadpool thread (via ProfiledRoute); sync dependencies and response model
+    validation run in other threadpool calls and are not included.
+
+    One request is profiled at a time (cProfile holds the thread's profile hook), so
+    a flagged request arriving meanwhile is served unprofiled, as is any flagged
+    request while another profiler (e.g. `python -m cProfile`) is active. Unrelated requests
+    interleaved on the event loop while the profiled one awaits also show up in its
+    loop thread profile, so profile on a quiet server when that matters.
+    """
+
+    def __init__(
+        self, app: ASGIApp, directory: str, authorize: Callable[[Optional[str]], bool]
+    ) -> None:
+        self.app = app
+        self.directory = directory
+        self.authorize = authorize
+        self._busy = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._busy or not profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        authorization = next(
+            (value for name, value in scope["headers"] if name == b"authorization"), None
+        )
+        if not self.authorize(authorization and authorization.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(
+            scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1")
+        )
+        file_name = (session.name + ".pstats").encode()
+
+        async def send_with_header(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and session.profiled:
+                session.status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", file_name))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self._busy = True
+        token = _session.set(session)
+        start = time.perf_counter()
+        try:
+            with session.profile():
+                await self.app(scope, receive, send_with_header)
+        finally:
+            session.seconds = time.perf_counter() - start
+            _session.reset(token)
+            self._busy = False
+            if session.profiled:
+                # Off the event loop: pstats merging and two file writes
+                await to_thread.run_sync(session.write, self.directory)
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose sync endpoint enables the current request's profiler in the
+    threadpool thread it runs in. Unprofiled requests pay one ContextVar lookup.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+
+def _profiled(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    if asyncio.iscoroutinefunction(endpoint):
+        # Runs on the event loop thread, which the middleware already profiles
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def call(*args: Any, **kwargs: Any) -> Any:
+        session = _session.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        with session.profile():
+            return endpoint(*args, **kwargs)
+
+    return call
+
+
+__all__ = [
+    "PROFILE_HEADER",
+    "PROFILE_PARAM",
+    "ProfileMiddleware",
+    "ProfileSession",
+    "ProfiledRoute",
+    "profile_requested",
+]
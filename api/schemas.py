@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -51,12 +51,96 @@ class TransactionUpdate(BaseModel):
 
 
 class Transaction(TransactionBase):
+    # Computed by SQLite from amount (api.db._ensure_value_band); ignored on writes
+    value_band: Optional[str] = None
     id: int
 
 
+class TransactionPatch(TransactionUpdate):
+    """One item of PATCH /transactions/bulk: the row id plus the fields to change."""
+
+    id: int
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str
+
+
+class BulkResult(BaseModel):
+    processed: int
+    succeeded: int
+    results: List[BulkItemResult]
+
+
+class SearchHit(BaseModel):
+    id: int
+    score: float
+    snippet: str
+    sms_date: datetime
+    transaction_type: str
+    amount: int
+    contact_name: Optional[str] = None
+
+
+class SearchResults(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    hits: List[SearchHit]
+
+
+class TypeTotals(BaseModel):
+    transaction_type: str
+    count: int
+    total_amount: int
+    total_fees: int
+    avg_amount: float
+    min_amount: int
+    max_amount: int
+
+
+class StatsSummary(BaseModel):
+    count: int
+    total_amount: int
+    total_fees: int
+    by_type: List[TypeTotals]
+
+
+class VolumeBucket(BaseModel):
+    period: str
+    count: int
+    total_amount: int
+    total_fees: int
+
+
+class CounterpartyTotal(BaseModel):
+    counterparty: str
+    count: int
+    total_amount: int
+
+
+class HistogramBucket(BaseModel):
+    lower: int
+    upper: int
+    count: int
+
+
 __all__ = [
     "TransactionBase",
     "TransactionCreate",
     "TransactionUpdate",
     "Transaction",
+    "TransactionPatch",
+    "BulkItemResult",
+    "BulkResult",
+    "SearchHit",
+    "SearchResults",
+    "TypeTotals",
+    "StatsSummary",
+    "VolumeBucket",
+    "CounterpartyTotal",
+    "HistogramBucket",
 ]
\ No newline at end of file
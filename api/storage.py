@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+
+# How new rows are written (reads understand every form, whatever the mode):
+#   full        sms_body, message and raw_json stored as given (the original layout)
+#   compact     message equal to sms_body stored as a zero-length BLOB, and raw_json
+#               stored as a BLOB of its JSON with the values that repeat a column
+#               (RAW_JSON_COLUMN_KEYS) left out. The parsed fields themselves are
+#               kept, so a later change to the extractor can't rewrite stored rows.
+# Markers are BLOBs because the columns have TEXT affinity, which would turn an
+# INTEGER into text; a BLOB is stored as is and can't be mistaken for client data.
+#   compressed  compact, plus sms_body and that raw_json as zlib BLOBs whenever smaller
+STORAGE_MODES = ("full", "compact", "compressed")
+
+# Positions in the INSERT_SQL / to_row tuple
+SMS_ADDRESS, SMS_DATE, SMS_BODY, MESSAGE, READABLE_DATE, RAW_JSON = 0, 1, 3, 13, 14, 16
+
+# Preset dictionary for compression: the boilerplate of the common MoMo message
+# families and the keys of a compact raw_json, most frequent last (zlib finds
+# recent bytes cheapest). Template text only, no names or numbers from real
+# messages. Never edit one in place; add a new version byte and dictionary instead.
+ZDICT_V2 = (
+    '"value_band":"Medium Value","High Value","type":"unknown","pending/failed",'
+    '{"id":,"tx_id":"N/A","timestamp_ms":null,"readable_date":null,"raw_body":null,'
+    '"amount":.0,"type":"payment","fee":0.0,"status":"completed","balance":.0,'
+    '"counterparty":null,"occurred_at":"2024-,"sms_address":null,"value_band":"Low Value"}'
+    "<#> Dear Customer, your MTN MoMo application one-time password is :"
+    ". Be Vigilant. Yello!Umaze kugura RWF(1GB)/30days igura "
+    "You have transferred RWF to from your mobile money account imbank.bank at "
+    "Message to receiver: . External Transaction Id: "
+    "*164*S*Y'ello,A transaction of RWF by DIRECT PAYMENT LTD on your MOMO account "
+    "was successfully completed at . Message from debit receiver: . "
+    "You have received RWF from (*********) on your mobile money account at "
+    ". Message from sender: . Your new balance: RWF. Financial Transaction Id: "
+    "TxId: . Your payment of RWF to has been completed at . Your new balance: "
+    " RWF. Fee was 0 RWF. "
+    "*113*R*A bank deposit of RWF has been added to your mobile money account at "
+    ". Your NEW BALANCE : RWF. Cash Deposit::CASH::::0::2507"
+    "Thank you for using MTN MobileMoney.*EN#"
+    "*165*S* RWF transferred to (2507) from at 2024- . Fee was: 100 RWF. New balance: "
+    " RWF. Kugura ama inite cg interineti kuri MoMo, Kanda *182*2*1# .*EN#"
+).encode("utf-8")
+ZDICTS = {2: ZDICT_V2}
+COMPRESSION_VERSION = 2
+
+# Loader record keys (dsa.data_loader.build_transaction) whose value is also a
+# column; compact rows store them as null and take them from the row on read
+RAW_JSON_COLUMN_KEYS = ("timestamp_ms", "readable_date", "raw_body", "sms_address")
+
+# A zero-length BLOB in message means "same as sms_body"
+SAME_AS_BODY = b""
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# -----------------------------
+# Encoding (write side)
+# -----------------------------
+def compress_body(text: str, version: int = COMPRESSION_VERSION) -> bytes:
+    # Raw deflate (wbits=-15): no zlib header or checksum on a ~200 byte value
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=ZDICTS[version])
+    return bytes([version]) + compressor.compress(text.encode("utf-8")) + compressor.flush()
+
+
+def encode_body(text: str, mode: str) -> Union[str, bytes]:
+    if mode != "compressed" or not text:
+        return text
+    packed = compress_body(text)
+    return packed if len(packed) < len(text.encode("utf-8")) else text
+
+
+def fill_raw_json(
+    record: Dict[str, Any],
+    body: str,
+    sms_date: str,
+    readable_date: Optional[str],
+    sms_address: Optional[str],
+) -> Dict[str, Any]:
+    """A compact raw_json (RAW_JSON_COLUMN_KEYS set to null) with those values put back."""
+    columns = {
+        "timestamp_ms": _epoch_ms(sms_date),
+        "readable_date": readable_date,
+        "raw_body": body,
+        "sms_address": sms_address,
+    }
+    return {key: columns[key] if key in columns else value for key, value in record.items()}
+
+
+def encode_raw_json(
+    raw: Any, row: Sequence[Any], mode: str
+) -> Union[str, bytes]:
+    """
+    raw_json for storage in `mode`. The column values are only left out after
+    checking that fill_raw_json gives back exactly the same record (so a null,
+    or a value that differs from its column, stays), which keeps this lossless.
+    """
+    text = json.dumps(raw)
+    if mode == "full" or not isinstance(raw, dict):
+        return text
+    record = {key: None if key in RAW_JSON_COLUMN_KEYS else value for key, value in raw.items()}
+    try:
+        filled = fill_raw_json(
+            record, row[SMS_BODY], row[SMS_DATE], row[READABLE_DATE], row[SMS_ADDRESS]
+        )
+    except (TypeError, ValueError):  # sms_date that isn't an isoformat string
+        return text
+    if filled != raw:
+        return text
+    packed = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    if mode == "compressed":
+        compressed = compress_body(packed.decode("utf-8"))
+        if len(compressed) < len(packed):
+            return compressed
+    return packed
+
+
+def encode_row(values: Sequence[Any], mode: str) -> Tuple[Any, ...]:
+    """Store one INSERT_SQL tuple (raw_json still a Python object) in `mode`."""
+    row = list(values)
+    body = row[SMS_BODY]
+    if mode != "full" and row[MESSAGE] == body:
+        row[MESSAGE] = SAME_AS_BODY
+    row[RAW_JSON] = encode_raw_json(row[RAW_JSON], values, mode)
+    row[SMS_BODY] = encode_body(body, mode)
+    return tuple(row)
+
+
+# -----------------------------
+# Decoding (read side, registered as SQL functions)
+# -----------------------------
+def _epoch_ms(sms_date: str) -> int:
+    value = datetime.fromisoformat(sms_date)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+
+def decode_body(value: Any) -> Any:
+    if isinstance(value, bytes):
+        zdict = ZDICTS.get(value[0])
+        if zdict is None:
+            raise ValueError(
+                f"Value compressed with unknown dictionary version {value[0]}; "
+                "rebuild the database (python -m api.db --rebuild)"
+            )
+        decompressor = zlib.decompressobj(-15, zdict=zdict)
+        return (decompressor.decompress(value[1:]) + decompressor.flush()).decode("utf-8")
+    return value
+
+
+def decode_message(message: Any, body: Any) -> Any:
+    return decode_body(body) if message == SAME_AS_BODY else message
+
+
+def distinct_message(message: Any, body: Any) -> Any:
+    """message for the search index: NULL when it only repeats sms_body."""
+    if message == SAME_AS_BODY or message == body:
+        return None
+    return message
+
+
+def decode_raw_json(
+    raw: Any, body: Any, sms_date: Any, readable_date: Any, sms_address: Any
+) -> Any:
+    """raw_json as JSON text, whichever form it was stored in."""
+    if not isinstance(raw, bytes):
+        return raw
+    # A compact record, compressed unless it starts with "{"
+    text = raw.decode("utf-8") if raw[:1] == b"{" else decode_body(raw)
+    record = fill_raw_json(
+        json.loads(text), decode_body(body), sms_date, readable_date, sms_address
+    )
+    return json.dumps(record)
+
+
+def register_functions(conn: sqlite3.Connection) -> None:
+    """Install the decoders on a connection; the views and search triggers need them."""
+    conn.create_function("momo_body", 1, decode_body, deterministic=True)
+    conn.create_function("momo_message", 2, decode_message, deterministic=True)
+    conn.create_function("momo_distinct_message", 2, distinct_message, deterministic=True)
+    conn.create_function("momo_raw_json", 5, decode_raw_json, deterministic=True)
+
+
+# SQL that reads each encoded column back in its original form
+DECODED_COLUMNS = {
+    "sms_body": "momo_body(sms_body)",
+    "message": "momo_message(message, sms_body)",
+    "raw_json": "momo_raw_json(raw_json, sms_body, sms_date, readable_date, sms_address)",
+}
+
+
+def decoded_select(columns: Iterable[str]) -> str:
+    """SELECT (or RETURNING) list for `columns`, decoding the encoded ones."""
+    return ", ".join(
+        f"{DECODED_COLUMNS[c]} AS {c}" if c in DECODED_COLUMNS else c for c in columns
+    )
+
+
+# Columns fill_raw_json reads
+RAW_JSON_SOURCES = {"sms_address", "sms_body", "sms_date", "readable_date"}
+
+
+def materialize_clauses(changed: Set[str]) -> List[str]:
+    """
+    Extra SET clauses for an UPDATE that changes `changed` columns: a message or
+    raw_json that is only derived from those columns is written out in full first
+    (SET expressions see the old row), so the update can't change it by accident.
+    """
+    clauses = []
+    if "sms_body" in changed and "message" not in changed:
+        clauses.append(f"message = {DECODED_COLUMNS['message']}")
+    if changed & RAW_JSON_SOURCES and "raw_json" not in changed:
+        clauses.append(f"raw_json = {DECODED_COLUMNS['raw_json']}")
+    return clauses
+
+
+def patch_assignments(columns: Iterable[str]) -> List[str]:
+    """
+    SET clauses for an executemany UPDATE with one named parameter per column, where
+    NULL leaves the column alone. Same pinning rule as materialize_clauses, decided
+    per row from which parameters are set.
+    """
+    clauses = []
+    for column in columns:
+        if column == "message":
+            current = (
+                "CASE WHEN :sms_body IS NULL THEN message "
+                f"ELSE {DECODED_COLUMNS['message']} END"
+            )
+        elif column == "raw_json":
+            sources = ", ".join(f":{c}" for c in sorted(RAW_JSON_SOURCES))
+            current = (
+                f"CASE WHEN COALESCE({sources}) IS NULL THEN raw_json "
+                f"ELSE {DECODED_COLUMNS['raw_json']} END"
+            )
+        else:
+            current = column
+        clauses.append(f"{column} = COALESCE(:{column}, {current})")
+    return clauses
+
+
+# -----------------------------
+# Migration and size report
+# -----------------------------
+def storage_report(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Row count and bytes per row for the transactions table and the whole file."""
+    rows = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    try:
+        table_bytes = conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = 'transactions'"
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        table_bytes = None  # SQLite built without the dbstat table
+    text_bytes = conn.execute(
+        "SELECT COALESCE(SUM(length(CAST(sms_body AS BLOB)) + length(CAST(message AS BLOB))"
+        " + length(CAST(raw_json AS BLOB))), 0) FROM transactions"
+    ).fetchone()[0]
+
+    def per_row(total: Optional[int]) -> Optional[float]:
+        return round(total / rows, 1) if rows and total is not None else None
+
+    return {
+        "rows": rows,
+        "file_bytes": page_size * page_count,
+        "file_bytes_per_row": per_row(page_size * page_count),
+        "table_bytes": table_bytes,
+        "table_bytes_per_row": per_row(table_bytes),
+        "text_bytes_per_row": per_row(text_bytes),
+    }
+
+
+def reencode_rows(conn: sqlite3.Connection, mode: str, batch_size: int = 2000) -> int:
+    """
+    Rewrite sms_body, message and raw_json of every row in `mode`. Runs inside the
+    caller's transaction; the decoded values don't change, so neither does anything
+    derived from them (search index, rollups). Returns the number of rows rewritten.
+    """
+    select = decoded_select(
+        ["id", "sms_address", "sms_date", "sms_body", "message", "readable_date", "raw_json"]
+    )
+    last_id = 0
+    rewritten = 0
+    while True:
+        batch = conn.execute(
+            f"SELECT {select} FROM transactions WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not batch:
+            return rewritten
+        updates = []
+        for row_id, address, sms_date, body, message, readable_date, raw in batch:
+            values: List[Any] = [None] * (RAW_JSON + 1)
+            values[SMS_ADDRESS], values[SMS_DATE], values[SMS_BODY] = address, sms_date, body
+            values[MESSAGE], values[READABLE_DATE] = message, readable_date
+            values[RAW_JSON] = json.loads(raw) if raw is not None else None
+            encoded = encode_row(values, mode)
+            updates.append((encoded[SMS_BODY], encoded[MESSAGE], encoded[RAW_JSON], row_id))
+        conn.executemany(
+            "UPDATE transactions SET sms_body = ?, message = ?, raw_json = ? WHERE id = ?",
+            updates,
+        )
+        rewritten += len(updates)
+        last_id = batch[-1][0]
+
+
+__all__ = [
+    "DECODED_COLUMNS",
+    "STORAGE_MODES",
+    "decode_body",
+    "decode_raw_json",
+    "decoded_select",
+    "encode_body",
+    "encode_raw_json",
+    "encode_row",
+    "fill_raw_json",
+    "materialize_clauses",
+    "patch_assignments",
+    "reencode_rows",
+    "register_functions",
+    "storage_report",
+]
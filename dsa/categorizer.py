@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Pattern, Sequence, Set, Tuple
+
+try:  # Python 3.11+
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:
+    import sre_constants
+    import sre_parse
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Transaction type rules, highest priority first: the first rule in this list that
+# matches anywhere in the body decides the type ("unknown" if none does). "keyword"
+# is a case-sensitive substring, "regex" a Python regular expression. Set
+# CATEGORY_RULES_PATH to a JSON file holding a list of the same objects to replace them.
+DEFAULT_CATEGORY_RULES = (
+    # The four phrases dsa.data_loader.get_transaction_type checks
+    {"type": "money_in", "keyword": "You have received"},
+    {"type": "payment", "keyword": "Your payment of"},
+    {"type": "transfer_out", "keyword": "You have successfully sent"},
+    {"type": "cancellation", "keyword": "Your transaction has been cancelled"},
+    # Families the phrases above miss
+    {"type": "deposit", "keyword": "A bank deposit of"},
+    {"type": "deposit", "regex": r"\bDEPOSIT RWF \d"},
+    {"type": "transfer_out", "keyword": "RWF transferred to"},
+    {"type": "bank_transfer", "keyword": "You have transferred"},
+    {"type": "withdrawal", "regex": r"withdrawn [\d,]+ RWF"},
+    {"type": "airtime_bundle", "keyword": "Umaze kugura"},
+    {"type": "airtime_bundle", "keyword": "RWF by Data Bundle MTN"},
+    {"type": "failed", "regex": r"the transaction with amount [\d,]+ RWF for .* failed at"},
+    {"type": "reversal", "keyword": "has been reversed"},
+    {"type": "reversal", "keyword": "A reversal has been initiated"},
+    {"type": "payment", "regex": r"A transaction of [\d,]+ RWF by "},
+    {"type": "otp", "keyword": "one-time password"},
+)
+CATEGORY_RULES_PATH = os.getenv("CATEGORY_RULES_PATH") or None
+if CATEGORY_RULES_PATH and not os.path.isabs(CATEGORY_RULES_PATH):
+    CATEGORY_RULES_PATH = os.path.join(PROJECT_ROOT, CATEGORY_RULES_PATH)
+
+# Value bands by amount in RWF, highest first: at least VALUE_BAND_HIGH is "High Value",
+# at least VALUE_BAND_MEDIUM "Medium Value", anything below (no amount included) the last
+VALUE_BAND_HIGH = float(os.getenv("VALUE_BAND_HIGH", "50000"))
+VALUE_BAND_MEDIUM = float(os.getenv("VALUE_BAND_MEDIUM", "10000"))
+VALUE_BANDS = (
+    (VALUE_BAND_HIGH, "High Value"),
+    (VALUE_BAND_MEDIUM, "Medium Value"),
+    (0.0, "Low Value"),
+)
+
+Rule = Mapping[str, Any]
+
+UNKNOWN = "unknown"
+# Shorter required literals would match almost everywhere and prefilter nothing
+MIN_LITERAL = 3
+
+_ENDS = ""  # trie key holding the keywords that end at a node (never a character)
+
+
+class KeywordMatcher:
+    """
+    Finds which of many keywords occur in a text, Aho-Corasick style: the keywords
+    are merged into a trie and the trie is compiled into one regular expression
+    (shared prefixes become nested groups, an empty group marks each keyword end).
+    At any position the text picks a single path through the trie, so the cost is
+    O(len(text) * longest keyword) whatever the number of keywords, and the scan
+    runs inside the re engine rather than one Python step per character.
+    """
+
+    def __init__(self, keywords: Sequence[str]) -> None:
+        self.keywords = list(keywords)
+        trie: Dict[str, Any] = {}
+        for index, keyword in enumerate(self.keywords):
+            if not keyword:
+                raise ValueError("Keywords must not be empty")
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node.setdefault(_ENDS, []).append(index)
+        # Keyword indexes found when a match ends in group g: every keyword along the path
+        self._found: Dict[int, Tuple[int, ...]] = {}
+        self._groups = 0
+        pattern = self._emit(trie, ())
+        self._search = re.compile(pattern).search if self.keywords else None
+
+    def _emit(self, node: Dict[str, Any], found: Tuple[int, ...]) -> str:
+        prefix = ""
+        if _ENDS in node:
+            # Numbered in pattern order: this group opens before any of its children's
+            self._groups += 1
+            found = found + tuple(node[_ENDS])
+            self._found[self._groups] = found
+            prefix = "()"
+        branches = [
+            re.escape(char) + self._emit(node[char], found) for char in sorted(node) if char != _ENDS
+        ]
+        if not branches:
+            return prefix
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A keyword ends here: longer keywords through this node are optional
+        return f"{prefix}(?:{body})?" if prefix else body
+
+    def find(self, text: str) -> Set[int]:
+        """Indexes of every keyword that occurs in `text`."""
+        found: Set[int] = set()
+        search = self._search
+        pos = 0
+        while search is not None:
+            m = search(text, pos)
+            if m is None:
+                break
+            # The deepest keyword end matched closes last
+            found.update(self._found[m.lastindex])
+            pos = m.start() + 1
+        return found
+
+
+class Categorizer:
+    """
+    Classifies SMS bodies with an ordered list of rules (see DEFAULT_CATEGORY_RULES).
+
+    Keyword rules, and the longest literal every regex rule requires (e.g.
+    "withdrawn " in r"withdrawn [\\d,]+ RWF"), go into one KeywordMatcher, so one scan
+    of the body yields the candidate rules; only the regexes whose literal was
+    found are then run, in priority order. Regexes without such a literal (a top
+    level "|", case-insensitive, ...) are tried on every body, one by one.
+
+    It also buckets amounts into `value_bands` ((floor, name) pairs, see VALUE_BANDS):
+    value_band() in Python, value_band_sql() for the same bands computed by SQLite.
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[Rule] = DEFAULT_CATEGORY_RULES,
+        default: str = UNKNOWN,
+        value_bands: Sequence[Tuple[float, str]] = VALUE_BANDS,
+    ) -> None:
+        self.rules = [_check_rule(i, rule) for i, rule in enumerate(rules)]
+        self.default = default
+
+        if not value_bands or not all(math.isfinite(floor) for floor, _ in value_bands):
+            raise ValueError(
+                f"Value bands need at least one band, with finite floors: {value_bands!r}"
+            )
+        # Ascending floors for bisect; the lowest band also takes anything below its floor
+        ordered = sorted(value_bands)
+        self._band_floors = [float(floor) for floor, _ in ordered]
+        self._band_names = [name for _, name in ordered]
+
+        literals: List[str] = []
+        self._literal_rules: List[int] = []
+        self._regexes: Dict[int, Pattern[str]] = {}
+        unanchored: List[int] = []
+        for i, rule in enumerate(self.rules):
+            if "keyword" in rule:
+                literal: Optional[str] = rule["keyword"]
+            else:
+                self._regexes[i] = re.compile(rule["regex"])
+                literal = required_literal(rule["regex"])
+                if literal is None:
+                    unanchored.append(i)
+                    continue
+            literals.append(literal)
+            self._literal_rules.append(i)
+        self._literals = KeywordMatcher(literals)
+        self._unanchored = frozenset(unanchored)
+
+    def match(self, body: str) -> Optional[int]:
+        """Index of the highest-priority rule matching `body`, or None."""
+        literal_rules = self._literal_rules
+        candidates = {literal_rules[i] for i in self._literals.find(body)}
+        for rule in sorted(candidates | self._unanchored):
+            regex = self._regexes.get(rule)
+            if regex is None or regex.search(body):
+                return rule
+        return None
+
+    def classify(self, body: str) -> str:
+        rule = self.match(body or "")
+        return self.default if rule is None else self.rules[rule]["type"]
+
+    def value_band(self, amount: Optional[float]) -> str:
+        i = bisect_right(self._band_floors, amount or 0.0) - 1
+        return self._band_names[max(i, 0)]
+
+    def value_band_sql(self, column: str) -> str:
+        """SQL expression giving value_band() of `column` (a generated column, a SELECT)."""
+        names = [name.replace("'", "''") for name in self._band_names]
+        whens = " ".join(
+            f"WHEN {column} >= {floor!r} THEN '{name}'"
+            for floor, name in reversed(list(zip(self._band_floors[1:], names[1:])))
+        )
+        return f"CASE {whens} ELSE '{names[0]}' END" if whens else f"'{names[0]}'"
+
+
+def required_literal(pattern: str, min_length: int = MIN_LITERAL) -> Optional[str]:
+    """
+    The longest run of literal characters at the top level of `pattern`, which any
+    match must contain; None if there is none of at least `min_length` characters.
+    """
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & (re.IGNORECASE | re.VERBOSE):
+        return None
+    best, run = "", ""
+    for op, value in parsed:
+        if op is sre_constants.LITERAL:
+            run += chr(value)
+            if len(run) > len(best):
+                best = run
+        else:
+            run = ""
+    return best if len(best) >= min_length else None
+
+
+def _check_rule(index: int, rule: Rule) -> Dict[str, Any]:
+    kinds = [kind for kind in ("keyword", "regex") if kind in rule]
+    if not rule.get("type") or len(kinds) != 1:
+        raise ValueError(
+            f"Category rule {index} needs a type and exactly one of keyword or regex: {rule!r}"
+        )
+    if kinds[0] == "regex":
+        try:
+            re.compile(rule["regex"])
+        except re.error as exc:
+            raise ValueError(f"Category rule {index} has an invalid regex: {exc}") from exc
+    return {"type": rule["type"], kinds[0]: rule[kinds[0]]}
+
+
+def load_rules(path: Optional[str] = CATEGORY_RULES_PATH) -> List[Rule]:
+    """Rules from a JSON file (a list of rule objects); the defaults when `path` is None."""
+    if path is None:
+        return list(DEFAULT_CATEGORY_RULES)
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError(f"{path} must hold a JSON list of category rules")
+    return rules
+
+
+@lru_cache(maxsize=None)
+def default_categorizer() -> Categorizer:
+    """
+    The Categorizer every loader classifies with (through dsa.sms_extractor), built
+    once per process from load_rules(): the defaults or CATEGORY_RULES_PATH. Its
+    value bands (VALUE_BANDS) back the value_band column (api.db.ensure_table).
+    """
+    return Categorizer(load_rules())
+
+
+__all__ = [
+    "CATEGORY_RULES_PATH",
+    "Categorizer",
+    "DEFAULT_CATEGORY_RULES",
+    "KeywordMatcher",
+    "UNKNOWN",
+    "VALUE_BANDS",
+    "VALUE_BAND_HIGH",
+    "VALUE_BAND_MEDIUM",
+    "default_categorizer",
+    "load_rules",
+    "required_literal",
+]
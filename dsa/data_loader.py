@@ -1,8 +1,13 @@
 from lxml import etree as ET
 import re
 import json
+import logging
 import time
 
+from dsa.record_store import RecordStore
+from dsa.sms_extractor import extract_sms_fields
+from dsa.telemetry import IngestTelemetry, log_event
+
 # DATA CLEANING UTILITIES
 
 
@@ -55,69 +60,228 @@ def get_transaction_type(body):
     return "unknown"
 
 
-# 2. MAIN DATA LOADING FUNCTION
+# 2. STREAMING XML READER
 
 
-def load_data_from_xml(xml_filepath):
+def iter_sms_attributes(xml_filepath, telemetry=None, dead_letter=None):
     """
-    This reads the XML, processes every SMS, and returns a neat list of dictionaries.
+    Streams the <sms> elements out of the XML one at a time and yields their attributes as a dict.
+    Each element is cleared (and detached from the root) once we're done with it, so memory stays
+    flat no matter how big the backup is. With a telemetry object (dsa/telemetry.py) the bytes
+    read are counted as the parser pulls them. With a dead_letter writer (dsa/dead_letter.py),
+    every spot lxml had to recover from is reported as an xml_error entry at the end (the writer
+    skips ones it already reported for this file).
+    """
+    source = xml_filepath if telemetry is None else telemetry.wrap_file(xml_filepath)
+    # Same forgiving behaviour as the full parser: recover=True skips over minor malformations
+    context = ET.iterparse(source, events=("end",), tag="sms", recover=True)
+    try:
+        for _, sms_element in context:
+            # Only direct children of the root count, like root.findall("sms") did; nested
+            # <sms> elements stay put and go with the top-level element holding them
+            parent = sms_element.getparent()
+            if parent is None or parent.getparent() is not None:
+                continue
+            yield dict(sms_element.attrib)
+
+            # Free the element and any already-processed siblings still hanging off the root
+            sms_element.clear()
+            while sms_element.getprevious() is not None:
+                del parent[0]
+
+        if dead_letter is not None:
+            for error in context.error_log:
+                dead_letter.put(
+                    "xml_error",
+                    f"line {error.line}, column {error.column}: {error.type_name}: "
+                    f"{error.message.strip()}",
+                )
+    finally:
+        del context
+        if source is not xml_filepath:
+            source.close()
+
+
+def build_transaction(row_id, sms):
+    """
+    Turns the attributes of one <sms> element into our transaction dictionary.
     """
-    print(f"--- Loading and preparing data from XML file... ---")
+    body = sms.get("body", "")
+
+    # One pass over the body pulls out every field we need (see dsa/sms_extractor.py)
+    fields = extract_sms_fields(body)
+
+    return {
+        "id": row_id,  # Pkey for our API
+        "tx_id": fields.tx_id,  # System transaction ID
+        "timestamp_ms": int(sms.get("date", 0)),  # Time in milliseconds for quick sorting
+        "readable_date": sms.get("readable_date", "N/A"),  # The date we read easily
+        "raw_body": body,  # Keeping the original text, just in case
+        # The cleaned values:
+        "amount": fields.amount,
+        "type": fields.type,
+        "fee": fields.fee,
+        "status": fields.status,
+        "balance": fields.balance,
+        "counterparty": fields.counterparty,
+        "occurred_at": fields.occurred_at,
+        # The address (usually the service name)
+        "sms_address": sms.get("address", "N/A"),
+    }
+
+
+def iter_transactions_from_xml(xml_filepath, telemetry=None, dead_letter=None):
+    """
+    Generator version of load_data_from_xml: yields one transaction dictionary at a time
+    instead of building the whole list, so huge phone backups can be processed in constant memory.
+    With a dead_letter writer, messages failing the checks in dsa/dead_letter.py go there
+    instead (their ids are skipped, so ids still match positions in the file).
+    """
+    extract = _extractor(dead_letter)
+    if telemetry is not None:
+        yield from _iter_counted_transactions(xml_filepath, telemetry, dead_letter, extract)
+        return
 
     # We use a simple counter ('row_id') as the main API primary key (PK).
-    transaction_list = []
-    row_id = 1
+    for row_id, sms in enumerate(iter_sms_attributes(xml_filepath, None, dead_letter), start=1):
+        record = extract(row_id, sms)
+        if record is not None:
+            yield record
+
+
+def _extractor(dead_letter):
+    """build_transaction, or when quarantining, a version returning None for rejected messages."""
+    if dead_letter is None:
+        return build_transaction
+
+    # Imported here: dsa.dead_letter builds on this module
+    from dsa.dead_letter import extract_record
+
+    def extract(row_id, sms):
+        record, rejection = extract_record(row_id, sms)
+        if rejection is not None:
+            dead_letter.reject(rejection)
+        return record
+
+    return extract
+
+
+def _iter_counted_transactions(
+    xml_filepath, telemetry, dead_letter=None, extract=build_transaction, flush_every=256
+):
+    """
+    Same records, while timing XML parsing ("parse") apart from field extraction
+    ("extract") and counting what goes through (see dsa/telemetry.py). Counts and
+    times build up in locals and are handed over every `flush_every` messages.
+    """
+    sms_stream = iter_sms_attributes(xml_filepath, telemetry, dead_letter)
+    clock = time.perf_counter
+    row_id = 0
+    pending = [0, 0, 0, 0.0, 0.0]  # messages, unknown type, missing TxId, parse s, extract s
+
+    def flush():
+        messages, unknown, missing, parse_seconds, extract_seconds = pending
+        telemetry.count("messages_seen", messages)
+        telemetry.count("messages_parsed", messages)
+        telemetry.count("unknown_type", unknown)
+        telemetry.count("missing_tx_id", missing)
+        telemetry.add_time("parse", parse_seconds)
+        telemetry.add_time("extract", extract_seconds)
+        pending[:] = [0, 0, 0, 0.0, 0.0]
+        telemetry.tick()
+
+    while True:
+        start = clock()
+        sms = next(sms_stream, None)
+        parsed = clock()
+        pending[3] += parsed - start
+        if sms is None:
+            break
+        # We use a simple counter ('row_id') as the main API primary key (PK).
+        row_id += 1
+        record = extract(row_id, sms)
+        pending[4] += clock() - parsed
+        pending[0] += 1
+        if row_id % flush_every == 0:
+            flush()
+        if record is None:
+            continue
+        if record["type"] == "unknown":
+            pending[1] += 1
+        if record["tx_id"] == "N/A":
+            pending[2] += 1
+        yield record
+    flush()
+
+
+# 3. MAIN DATA LOADING FUNCTION
 
+
+def _load_into(collect, xml_filepath, pipeline, progress, quarantine=False):
+    """
+    Feeds every record of the XML to `collect` (list.extend, RecordStore.extend) and
+    reports the run as structured log events. False if the file couldn't be read.
+    """
+    telemetry = IngestTelemetry(pipeline, xml_filepath, progress)
+    dead_letter = None
+    if quarantine:
+        from dsa.dead_letter import DeadLetterWriter
+
+        dead_letter = DeadLetterWriter(pipeline, xml_filepath, telemetry)
     try:
-        # Use a forgiving XML parser to handle minor malformations in exported SMS files
-        parser = ET.XMLParser(recover=True)
-        tree = ET.parse(xml_filepath, parser)
-        root = tree.getroot()
-
-        # Loop through all <sms> tags in the XML
-        for sms_element in root.findall("sms"):
-            body = sms_element.get("body", "")
-
-            # Extracting the relevant information
-            transaction = {
-                "id": row_id,  # Pkey for our API
-                "tx_id": extract_tx_id(body),  # System transaction ID
-                "timestamp_ms": int(
-                    sms_element.get("date", 0)
-                ),  # Time in milliseconds for quick sorting
-                "readable_date": sms_element.get(
-                    "readable_date", "N/A"
-                ),  # The date we read easily
-                "raw_body": body,  # Keeping the original text, just in case
-                # The cleaned values:
-                "amount": clean_amount(body),
-                "type": get_transaction_type(body),
-                "fee": (
-                    clean_amount(body.lower().split("fee was")[-1])
-                    if "fee was" in body.lower()
-                    else 0.0
-                ),
-                "status": (
-                    "completed"
-                    if "completed" in body or "received" in body
-                    else "pending/failed"
-                ),
-                # The address (usually the service name)
-                "sms_address": sms_element.get("address", "N/A"),
-            }
-
-            transaction_list.append(transaction)
-            row_id += 1
-
-    except FileNotFoundError:
-        print(f"ERROR: XML file '{xml_filepath}' not found. Did you check the path?")
-        return []
+        try:
+            collect(iter_transactions_from_xml(xml_filepath, telemetry, dead_letter))
+        finally:
+            if dead_letter is not None:
+                dead_letter.close()
+
+    except (FileNotFoundError, OSError) as e:
+        log_event(
+            "ingest.error",
+            f"XML file '{xml_filepath}' not found. Did you check the path?",
+            level=logging.ERROR,
+            run_id=telemetry.run_id,
+            reason="file_not_found",
+        )
+        telemetry.finish("error", e)
+        return False
     except ET.XMLSyntaxError as e:
-        print(f"real error: {e}")
-        print(
-            f"ERROR: Hmm, there was an issue parsing the XML structure in '{xml_filepath}'."
+        log_event(
+            "ingest.error",
+            f"Could not parse the XML structure in '{xml_filepath}': {e}",
+            level=logging.ERROR,
+            run_id=telemetry.run_id,
+            reason="xml_syntax",
         )
+        telemetry.finish("error", e)
+        return False
+
+    telemetry.finish()
+    return True
+
+
+def load_data_from_xml(xml_filepath, progress=None, quarantine=False):
+    """
+    This reads the XML, processes every SMS, and returns a neat list of dictionaries.
+    `progress` is called with an IngestProgress every few seconds (dsa/telemetry.py).
+    With `quarantine`, bad messages and recovered XML errors are written to the
+    dead-letter files (dsa/dead_letter.py) instead of ending up in the list.
+    """
+    transaction_list = []
+    if not _load_into(
+        transaction_list.extend, xml_filepath, "load_data_from_xml", progress, quarantine
+    ):
         return []
+    return transaction_list
+
 
-    print(f"--- Data loading complete! {len(transaction_list)} transactions ready. ---")
-    return transaction_list
\ No newline at end of file
+def load_store_from_xml(xml_filepath, progress=None, quarantine=False):
+    """
+    Same records as load_data_from_xml, but packed into a columnar RecordStore (see
+    dsa/record_store.py) instead of one dict per SMS. Records are added as they stream
+    out of the XML, so no list of dicts is ever built; store[i] gives the dict back.
+    """
+    store = RecordStore()
+    if not _load_into(store.extend, xml_filepath, "load_store_from_xml", progress, quarantine):
+        return RecordStore()
+    return store
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from dsa.data_loader import build_transaction
+from dsa.telemetry import IngestTelemetry, log_event
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Quarantined messages are appended to quarantine.jsonl in this directory, and
+# replay results to replayed.jsonl beside it; relative to the project root
+DEAD_LETTER_PATH = os.getenv("DEAD_LETTER_PATH") or "data/logs/dead_letter/"
+if not os.path.isabs(DEAD_LETTER_PATH):
+    DEAD_LETTER_PATH = os.path.join(PROJECT_ROOT, DEAD_LETTER_PATH)
+QUARANTINE_FILE_NAME = "quarantine.jsonl"
+REPLAYED_FILE_NAME = "replayed.jsonl"
+# 0 keeps the old behaviour: bad messages are loaded as they are (or abort the load)
+DEAD_LETTER_ENABLED = os.getenv("DEAD_LETTER_ENABLED", "1") == "1"
+# Entries handed to the writer thread at a time
+DEAD_LETTER_BATCH_SIZE = int(os.getenv("DEAD_LETTER_BATCH_SIZE", "256"))
+# Batches waiting for the writer thread before the ingest has to wait for it
+MAX_PENDING_BATCHES = 16
+
+REASONS = {
+    "xml_error": "lxml recovered from malformed XML here; messages around it may be lost",
+    "bad_date": "the date attribute is missing or not an integer (epoch milliseconds)",
+    "empty_body": "the message has no body",
+    "amount_unparsed": "the body mentions an RWF amount but none was extracted",
+    "missing_tx_id": "a money_in or payment message without a TxId / Financial Transaction Id",
+    "extract_error": "field extraction raised",
+    "validation_error": "the extracted record doesn't fit the transactions schema",
+}
+# Types whose messages always carry a TxId; deposits, OTPs and the like legitimately don't
+TX_ID_REQUIRED_TYPES = frozenset({"money_in", "payment"})
+
+_AMOUNT_RE = re.compile(r"\d[\d,]*\s*RWF")
+
+
+class Rejection(NamedTuple):
+    """One message turned away, as passed from (possibly remote) workers to the writer."""
+
+    row_id: Optional[int]
+    sms: Optional[Dict[str, str]]  # the <sms> attributes, None for xml_error
+    reason: str
+    detail: str
+
+
+# -----------------------------
+# Checks
+# -----------------------------
+def check_record(record: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """(reason, detail) if an extracted record (build_transaction) is suspect, else None."""
+    if record["tx_id"] == "N/A" and record["type"] in TX_ID_REQUIRED_TYPES:
+        return "missing_tx_id", f"type {record['type']}"
+    if not record["amount"]:
+        match = _AMOUNT_RE.search(record["raw_body"])
+        if match:
+            return "amount_unparsed", f"found {match.group(0)!r}"
+    return None
+
+
+def extract_record(
+    row_id: int, sms: Dict[str, str]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Rejection]]:
+    """
+    build_transaction plus the checks above: (record, None) for a good message,
+    (None, rejection) for one to quarantine. Never raises for a bad message.
+    """
+    date = sms.get("date")
+    if not date or not date.lstrip("-").isdigit():
+        return None, Rejection(row_id, sms, "bad_date", f"date={date!r}")
+    if not (sms.get("body") or "").strip():
+        return None, Rejection(row_id, sms, "empty_body", "")
+    try:
+        record = build_transaction(row_id, sms)
+    except Exception as exc:
+        return None, Rejection(row_id, sms, "extract_error", f"{type(exc).__name__}: {exc}")
+    problem = check_record(record)
+    if problem is not None:
+        return None, Rejection(row_id, sms, *problem)
+    return record, None
+
+
+def sms_from_record(record: Dict[str, Any]) -> Dict[str, str]:
+    """The <sms> attributes build_transaction reads, rebuilt from one of its records."""
+    return {
+        "date": str(record["timestamp_ms"]),
+        "body": record["raw_body"],
+        "readable_date": record["readable_date"],
+        "address": record["sms_address"],
+    }
+
+
+def message_key(sms: Dict[str, str]) -> str:
+    """Identifies a message across runs: quarantining it again doesn't make it pending twice."""
+    payload = json.dumps(sms, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def xml_error_key(source: Optional[str], detail: str) -> str:
+    """Identifies a recovered XML error (file, line, column, message) across runs."""
+    payload = json.dumps([source, detail], ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+# -----------------------------
+# Writer
+# -----------------------------
+_STOP = None  # end of the writer thread's queue
+
+
+class DeadLetterWriter:
+    """
+    Append-only, batched quarantine for one ingest run. put() only builds the entry
+    and appends it to the current batch; full batches are serialized and written to
+    quarantine.jsonl by a background thread, so a run with many bad messages keeps
+    streaming. Nothing (file, thread) is created until the first rejection.
+
+    An xml_error already in quarantine.jsonl for the same source is not written or
+    counted again: every run re-parses the whole file, even when it skips all of it.
+
+    put() is thread-safe (ETL stages reject from their own threads). close() writes
+    what is left, waits for the thread, logs an ingest.dead_letter event with the
+    counts by reason and re-raises a write error, if any.
+    """
+
+    def __init__(
+        self,
+        pipeline: str,
+        source: Optional[str] = None,
+        telemetry: Optional[IngestTelemetry] = None,
+        directory: str = DEAD_LETTER_PATH,
+        batch_size: int = DEAD_LETTER_BATCH_SIZE,
+    ) -> None:
+        self.pipeline = pipeline
+        self.source = source
+        self.telemetry = telemetry
+        self.run_id = telemetry.run_id if telemetry is not None else uuid.uuid4().hex[:12]
+        self.path = os.path.join(directory, QUARANTINE_FILE_NAME)
+        self.batch_size = max(1, batch_size)
+        self.counts: Dict[str, int] = {}
+        self._batch: List[Dict[str, Any]] = []
+        self._seq = 0
+        self._xml_error_keys: Optional[set] = None  # read from the file on the first xml_error
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue(
+            MAX_PENDING_BATCHES
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._closed = False
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def put(
+        self,
+        reason: str,
+        detail: str = "",
+        sms: Optional[Dict[str, str]] = None,
+        row_id: Optional[int] = None,
+    ) -> None:
+        if reason not in REASONS:
+            raise ValueError(f"Unknown dead-letter reason: {reason!r}")
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("DeadLetterWriter is closed")
+            if reason == "xml_error":
+                key = xml_error_key(self.source, detail)
+                if self._xml_error_keys is None:
+                    self._xml_error_keys = {
+                        entry.get("key")
+                        for entry in _read_jsonl(self.path)
+                        if entry.get("reason") == "xml_error"
+                    }
+                if key in self._xml_error_keys:
+                    return
+                self._xml_error_keys.add(key)
+            else:
+                key = message_key(sms) if sms is not None else None
+            self._seq += 1
+            self._batch.append(
+                {
+                    "id": f"{self.run_id}-{self._seq}",
+                    "key": key,
+                    "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                    "run_id": self.run_id,
+                    "pipeline": self.pipeline,
+                    "source": self.source,
+                    "row_id": row_id,
+                    "reason": reason,
+                    "detail": detail,
+                    "sms": sms,
+                }
+            )
+            self.counts[reason] = self.counts.get(reason, 0) + 1
+            if self.telemetry is not None:
+                self.telemetry.count("quarantined")
+            if len(self._batch) >= self.batch_size:
+                self._hand_off()
+
+    def reject(self, rejection: Rejection) -> None:
+        self.put(rejection.reason, rejection.detail, rejection.sms, rejection.row_id)
+
+    def reject_all(self, rejections: Iterable[Rejection]) -> None:
+        for rejection in rejections:
+            self.reject(rejection)
+
+    def _hand_off(self) -> None:
+        # Called with the lock held
+        batch, self._batch = self._batch, []
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._write_batches, name="dead-letter-writer", daemon=True
+            )
+            self._thread.start()
+        self._queue.put(batch)
+
+    def _write_batches(self) -> None:
+        f = None
+        try:
+            while True:
+                batch = self._queue.get()
+                if batch is _STOP:
+                    return
+                if self._error is not None:
+                    continue  # keep draining so put() never blocks on a dead writer
+                try:
+                    if f is None:
+                        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                        f = open(self.path, "a", encoding="utf-8")
+                    f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch))
+                    f.flush()
+                except BaseException as exc:
+                    self._error = exc
+        finally:
+            if f is not None:
+                f.close()
+
+    def close(self) -> Dict[str, int]:
+        """Write the rest, stop the writer thread and return the counts by reason."""
+        with self._lock:
+            if self._closed:
+                return dict(self.counts)
+            self._closed = True
+            if self._batch:
+                self._hand_off()
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        if self.counts:
+            log_event(
+                "ingest.dead_letter",
+                f"{self.pipeline}: {self.total} messages quarantined in {self.path}",
+                level=logging.WARNING,
+                run_id=self.run_id,
+                path=self.path,
+                quarantined=self.total,
+                reasons=dict(self.counts),
+            )
+        if self._error is not None:
+            raise self._error
+        return dict(self.counts)
+
+    def __enter__(self) -> "DeadLetterWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+# -----------------------------
+# Reading back (replay)
+# -----------------------------
+def _read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            # A torn last line (crash mid-write) is skipped, not fatal
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def read_quarantine(directory: str = DEAD_LETTER_PATH) -> Iterator[Dict[str, Any]]:
+    """Every quarantine entry ever written, oldest first."""
+    return _read_jsonl(os.path.join(directory, QUARANTINE_FILE_NAME))
+
+
+def pending_entries(
+    directory: str = DEAD_LETTER_PATH, reasons: Optional[Iterable[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Quarantined messages not yet replayed successfully: the latest entry per message
+    key, optionally only for some `reasons`. xml_error entries carry no message and
+    are only reports, so they are never pending.
+    """
+    replayed = {entry["key"] for entry in _read_jsonl(os.path.join(directory, REPLAYED_FILE_NAME))}
+    wanted = set(reasons) if reasons is not None else None
+    latest: Dict[str, Dict[str, Any]] = {}
+    for entry in read_quarantine(directory):
+        key = entry.get("key")
+        if key is None or key in replayed or entry["reason"] == "xml_error":
+            continue
+        latest.pop(key, None)  # re-insert so the order follows the latest entry
+        latest[key] = entry
+    return [
+        entry for entry in latest.values() if wanted is None or entry["reason"] in wanted
+    ]
+
+
+def mark_replayed(
+    results: Iterable[Tuple[Dict[str, Any], str]], directory: str = DEAD_LETTER_PATH
+) -> int:
+    """Append (entry, result) pairs to the replay ledger; they stop being pending."""
+    now = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    lines = [
+        json.dumps({"key": entry["key"], "id": entry["id"], "ts": now, "result": result})
+        + "\n"
+        for entry, result in results
+    ]
+    if lines:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, REPLAYED_FILE_NAME), "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+    return len(lines)
+
+
+__all__ = [
+    "DEAD_LETTER_ENABLED",
+    "DEAD_LETTER_PATH",
+    "DeadLetterWriter",
+    "REASONS",
+    "Rejection",
+    "TX_ID_REQUIRED_TYPES",
+    "check_record",
+    "extract_record",
+    "mark_replayed",
+    "message_key",
+    "pending_entries",
+    "read_quarantine",
+    "sms_from_record",
+    "xml_error_key",
+]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+
+# Ensure project root on sys.path to import dsa.data_loader
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from lxml import etree as ET
+
+from dsa.data_loader import build_transaction, iter_transactions_from_xml
+
+
+RAW_XML_PATH = os.path.join(PROJECT_ROOT, "data", "raw", "momo.xml")
+MODES = ("tree", "stream")
+
+
+def inflate_xml(source_path: str, target_path: str, factor: int) -> int:
+    """Write a copy of `source_path` whose <sms> elements are repeated `factor` times."""
+    with open(source_path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    sms_lines = re.findall(r"<sms .*?/>", text)
+    with open(target_path, "w", encoding="utf-8") as out:
+        out.write(f'<smses count="{len(sms_lines) * factor}">\n')
+        for _ in range(factor):
+            for line in sms_lines:
+                out.write(line)
+                out.write("\n")
+        out.write("</smses>\n")
+    return len(sms_lines) * factor
+
+
+def _run_tree(xml_path: str) -> int:
+    # The previous loader: parse the whole document, then materialise every record
+    parser = ET.XMLParser(recover=True)
+    root = ET.parse(xml_path, parser).getroot()
+    records = [
+        build_transaction(row_id, dict(sms.attrib))
+        for row_id, sms in enumerate(root.findall("sms"), start=1)
+    ]
+    return len(records)
+
+
+def _run_stream(xml_path: str) -> int:
+    count = 0
+    for _ in iter_transactions_from_xml(xml_path):
+        count += 1
+    return count
+
+
+def measure(mode: str, xml_path: str) -> Dict[str, Any]:
+    """Run one loader mode in this process and report records/sec and peak RSS."""
+    runner = _run_tree if mode == "tree" else _run_stream
+    start = time.perf_counter()
+    records = runner(xml_path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is reported in KiB on Linux
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "mode": mode,
+        "records": records,
+        "seconds": round(elapsed, 4),
+        "records_per_sec": round(records / elapsed, 1) if elapsed > 0 else None,
+        "peak_rss_mb": round(peak_rss_kb / 1024.0, 1),
+    }
+
+
+def benchmark(factor: int = 200, source_path: str = RAW_XML_PATH) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_path = os.path.join(tmp, "momo_inflated.xml")
+        total = inflate_xml(source_path, xml_path, factor)
+        size_mb = os.path.getsize(xml_path) / (1024.0 * 1024.0)
+
+        print("=== Ingest Benchmark (XML loader) ===")
+        print(f"Inflated file: {total} messages, {size_mb:.1f} MB (x{factor})")
+
+        # Each mode runs in a fresh interpreter so peak RSS is not shared between them
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, "--measure", mode, xml_path],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results.append(result)
+            print(
+                f"{mode:>6}: {result['records_per_sec']:>10} records/sec, "
+                f"peak RSS {result['peak_rss_mb']} MB"
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the SMS XML loader")
+    parser.add_argument("--factor", type=int, default=200, help="times to repeat momo.xml")
+    parser.add_argument("--source", default=RAW_XML_PATH)
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "XML"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        mode, xml_path = args.measure
+        print(json.dumps(measure(mode, xml_path)))
+        return
+
+    results = benchmark(factor=args.factor, source_path=args.source)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
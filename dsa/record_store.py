@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+# Keys of a loader record (dsa.data_loader.build_transaction), in its order
+FIELDS = (
+    "id",
+    "tx_id",
+    "timestamp_ms",
+    "readable_date",
+    "raw_body",
+    "amount",
+    "type",
+    "fee",
+    "status",
+    "balance",
+    "counterparty",
+    "occurred_at",
+    "sms_address",
+)
+INT_FIELDS = ("id", "timestamp_ms")
+# balance may be None, stored as NaN (the extractor never produces a real NaN)
+FLOAT_FIELDS = ("amount", "fee", "balance")
+# Few distinct values, repeated on every row: one small code per row
+CATEGORICAL_FIELDS = ("type", "status", "sms_address", "counterparty")
+# Mostly unique text: bytes in the shared pool, (offset, length) per row
+TEXT_FIELDS = ("tx_id", "readable_date", "raw_body", "occurred_at")
+
+# Code width grows with the number of categories: 1, 2, then 4 bytes per row
+_WIDER = {"B": ("H", 0xFF), "H": ("I", 0xFFFF)}
+
+
+class StringPool:
+    """Every string of a store, UTF-8 encoded back to back in one buffer."""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def add(self, text: str) -> Tuple[int, int]:
+        encoded = text.encode("utf-8")
+        offset = len(self.data)
+        self.data += encoded
+        return offset, len(encoded)
+
+    def get(self, offset: int, length: int) -> str:
+        return str(memoryview(self.data)[offset : offset + length], "utf-8")
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.data)
+
+
+class Categorical:
+    """Interned values plus one code per row; None is a category like any other."""
+
+    def __init__(self) -> None:
+        self.values: List[Optional[str]] = []
+        self._code_of: Dict[Optional[str], int] = {}
+        self.codes = array("B")
+
+    def append(self, value: Optional[str]) -> None:
+        code = self._code_of.get(value)
+        if code is None:
+            code = self._code_of[value] = len(self.values)
+            self.values.append(value)
+            wider = _WIDER.get(self.codes.typecode)
+            if wider is not None and code > wider[1]:
+                self.codes = array(wider[0], self.codes)
+        self.codes.append(code)
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        return self.values[self.codes[i]]
+
+    def nbytes(self) -> int:
+        return (
+            sys.getsizeof(self.codes)
+            + sys.getsizeof(self.values)
+            + sys.getsizeof(self._code_of)
+            + sum(sys.getsizeof(v) for v in self.values if v is not None)
+        )
+
+
+class TextColumn:
+    """Per-row (offset, length) into a StringPool; offset -1 means None."""
+
+    def __init__(self, pool: StringPool) -> None:
+        self.pool = pool
+        self.offsets = array("q")
+        self.lengths = array("I")
+
+    def append(self, value: Optional[str]) -> None:
+        offset, length = (-1, 0) if value is None else self.pool.add(value)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        offset = self.offsets[i]
+        return None if offset < 0 else self.pool.get(offset, self.lengths[i])
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.offsets) + sys.getsizeof(self.lengths)
+
+
+class RecordStore:
+    """
+    Columnar container for loader records: int64/float64 arrays for the numbers,
+    categorical codes for the repeated strings and one shared string pool for the
+    rest (bodies included). No per-record Python objects are kept; store[i] builds
+    the record dict on demand, equal to what build_transaction returned.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = ()) -> None:
+        self.pool = StringPool()
+        self.ints = {name: array("q") for name in INT_FIELDS}
+        self.floats = {name: array("d") for name in FLOAT_FIELDS}
+        self.categoricals = {name: Categorical() for name in CATEGORICAL_FIELDS}
+        self.texts = {name: TextColumn(self.pool) for name in TEXT_FIELDS}
+        self._length = 0
+        self.extend(records)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        for name, column in self.ints.items():
+            column.append(record[name])
+        for name, column in self.floats.items():
+            value = record[name]
+            column.append(math.nan if value is None else value)
+        for name, column in self.categoricals.items():
+            column.append(record[name])
+        for name, column in self.texts.items():
+            column.append(record[name])
+        self._length += 1
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def row(self, i: int) -> Dict[str, Any]:
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("RecordStore index out of range")
+        values: Dict[str, Any] = {}
+        for name, column in self.ints.items():
+            values[name] = column[i]
+        for name, column in self.floats.items():
+            value = column[i]
+            values[name] = None if math.isnan(value) else value
+        for name, column in self.categoricals.items():
+            values[name] = column[i]
+        for name, column in self.texts.items():
+            values[name] = column[i]
+        return {name: values[name] for name in FIELDS}
+
+    def __getitem__(self, i: Union[int, slice]) -> Any:
+        if isinstance(i, slice):
+            return [self.row(j) for j in range(*i.indices(self._length))]
+        return self.row(i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._length):
+            yield self.row(i)
+
+    def column(self, name: str) -> Any:
+        """
+        The raw storage of one field (an array for numbers) for whole-column work,
+        e.g. sum(store.column("amount")) without building any row.
+        """
+        if name in self.ints:
+            return self.ints[name]
+        if name in self.floats:
+            return self.floats[name]
+        if name in self.categoricals:
+            return self.categoricals[name]
+        return self.texts[name]
+
+    def nbytes(self) -> Dict[str, int]:
+        """Bytes held per part of the store (allocated, so including array slack)."""
+        return {
+            "numbers": sum(sys.getsizeof(c) for c in (*self.ints.values(), *self.floats.values())),
+            "categoricals": sum(c.nbytes() for c in self.categoricals.values()),
+            "text_index": sum(c.nbytes() for c in self.texts.values()),
+            "string_pool": self.pool.nbytes(),
+        }
+
+
+__all__ = [
+    "FIELDS",
+    "Categorical",
+    "RecordStore",
+    "StringPool",
+    "TextColumn",
+]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List
+
+
+# Ensure project root on sys.path to import dsa.*
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from dsa.data_loader import build_transaction, iter_sms_attributes
+from dsa.record_store import RecordStore
+
+
+RAW_XML_PATH = os.path.join(PROJECT_ROOT, "data", "raw", "momo.xml")
+MODES = ("dicts", "store")
+
+
+def synthetic_messages(
+    count: int, templates: List[Dict[str, str]]
+) -> Iterator[Dict[str, Any]]:
+    """
+    `count` loader records built from `templates` (<sms> attributes), repeated with
+    later dates. Every attribute is a fresh string object, as parsing a real backup
+    would give, so the list of dicts doesn't get to share one body between copies.
+    """
+    day_ms = 86_400_000
+    for row_id in range(1, count + 1):
+        copy, i = divmod(row_id - 1, len(templates))
+        sms = {key: value.encode().decode() for key, value in templates[i].items()}
+        sms["date"] = str(int(sms.get("date", 0)) + copy * day_ms)
+        yield build_transaction(row_id, sms)
+
+
+def measure(mode: str, count: int, xml_path: str) -> Dict[str, Any]:
+    """Build one container in this process; report the bytes it keeps and the time taken."""
+    templates = list(iter_sms_attributes(xml_path))
+    if not templates:
+        raise RuntimeError(f"No <sms> messages found in {xml_path}")
+    messages = synthetic_messages(count, templates)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    container: Any = list(messages) if mode == "dicts" else RecordStore(messages)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Reading every row back: free for the list, a dict built per row for the store
+    start = time.perf_counter()
+    total = sum(row["amount"] for row in container)
+    scan_seconds = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "records": len(container),
+        "retained_mb": round(retained / 1e6, 1),
+        "bytes_per_record": round(retained / len(container), 1),
+        "build_seconds": round(elapsed, 2),
+        "row_scan_seconds": round(scan_seconds, 2),
+        "amount_total": total,
+        # ru_maxrss is reported in KiB on Linux (and includes tracemalloc's own overhead)
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+    }
+
+
+def benchmark(count: int = 1_000_000, xml_path: str = RAW_XML_PATH) -> List[Dict[str, Any]]:
+    print("=== Record Store Memory Benchmark ===")
+    print(f"Synthetic messages: {count:,} (repo messages repeated)")
+    results: List[Dict[str, Any]] = []
+    # Each mode runs in a fresh interpreter so one container can't reuse the other's memory
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure", mode, str(count), xml_path],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(
+            f"{mode:>6}: {result['retained_mb']:>8} MB retained, "
+            f"{result['bytes_per_record']:>7} bytes/record, "
+            f"built in {result['build_seconds']}s"
+        )
+    dicts, store = results
+    assert dicts["amount_total"] == store["amount_total"]
+    print(f"Store / dicts memory: {store['retained_mb'] / dicts['retained_mb']:.2f}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare memory of a list of record dicts and a columnar RecordStore"
+    )
+    parser.add_argument("--count", type=int, default=1_000_000, help="synthetic messages")
+    parser.add_argument("--xml", default=RAW_XML_PATH, help="messages to repeat")
+    parser.add_argument("--json", action="store_true", help="also print results as JSON")
+    parser.add_argument(
+        "--measure", nargs=3, metavar=("MODE", "COUNT", "XML"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.measure:
+        mode, count, xml_path = args.measure
+        print(json.dumps(measure(mode, int(count), xml_path)))
+        return
+
+    results = benchmark(args.count, args.xml)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import argparse
+import json
 import os
 import sys
 import random
-import statistics
+import sqlite3
 import time
-from typing import Dict, List, Optional, Tuple, Any
+import tracemalloc
+from bisect import bisect_left, bisect_right
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple, Any
 
 
 # Ensure project root on sys.path to import api.db
@@ -14,19 +20,83 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 try:
-    from api.db import get_connection
+    from api.db import database_exists, get_connection
 except Exception:  # pragma: no cover
-    from db import get_connection
+    from db import database_exists, get_connection
 
 
+# Only the columns the access patterns search on
+BENCH_COLUMNS = ["id", "transaction_id", "sms_date", "amount"]
+DEFAULT_SIZES = [10**2, 10**3, 10**4, 10**5, 10**6]
+STRUCTURES = ("list", "dict", "bisect", "sqlite")
+# Access pattern -> (column, kind); dicts can only answer the point lookups
+PATTERNS = {
+    "id": ("id", "point"),
+    "transaction_id": ("transaction_id", "point"),
+    "date_range": ("sms_date", "range"),
+    "amount_range": ("amount", "range"),
+}
+# A range query covers this fraction of the rows (at least one)
+RANGE_SELECTIVITY = 0.001
+# Full scans get fewer queries on big sizes: at most this many rows scanned per pattern
+SCAN_BUDGET_ROWS = 10**7
+
+
+# -----------------------------
+# Data
+# -----------------------------
 def load_transactions_from_db(limit: int = 100) -> List[Dict[str, Any]]:
-    with get_connection() as conn:
+    if not database_exists():
+        return []
+    with closing(get_connection()) as conn:
         rows = conn.execute(
-            "SELECT * FROM transactions ORDER BY id ASC LIMIT ?", (limit,)
+            f"SELECT {', '.join(BENCH_COLUMNS)} FROM transactions ORDER BY id ASC LIMIT ?",
+            (limit,),
         ).fetchall()
         return [dict(row) for row in rows]
 
 
+def synthetic_rows(
+    count: int, start_id: int = 1, start: Optional[datetime] = None, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Rows shaped like the table's: ids and dates ascending, MoMo-like amounts."""
+    rng = random.Random(seed)
+    moment = start or datetime(2024, 5, 10, tzinfo=timezone.utc)
+    rows = []
+    for row_id in range(start_id, start_id + count):
+        moment += timedelta(seconds=rng.randint(30, 7200))
+        rows.append(
+            {
+                "id": row_id,
+                # 11 digits like a Financial Transaction Id, unique per row
+                "transaction_id": str(50_000_000_000 + row_id * 37),
+                "sms_date": moment.isoformat(),
+                "amount": max(100, int(round(rng.lognormvariate(8.5, 1.3), -2))),
+            }
+        )
+    return rows
+
+
+def make_dataset(
+    size: int, use_db: bool = True, seed: int = 0
+) -> Tuple[List[Dict[str, Any]], int]:
+    """`size` rows: the database's first rows, topped up with synthetic ones."""
+    rows = load_transactions_from_db(limit=size) if use_db else []
+    from_db = len(rows)
+    if from_db < size:
+        last = rows[-1] if rows else None
+        rows += synthetic_rows(
+            size - from_db,
+            start_id=last["id"] + 1 if last else 1,
+            start=datetime.fromisoformat(last["sms_date"]) if last else None,
+            seed=seed,
+        )
+    return rows, from_db
+
+
+# -----------------------------
+# Structures
+# -----------------------------
 def linear_search(
     transactions: List[Dict[str, Any]], target_id: int
 ) -> Optional[Dict[str, Any]]:
@@ -46,49 +116,266 @@ def build_index(transactions: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]
     return {int(t["id"]): t for t in transactions}
 
 
-def benchmark(num_targets: int = 20, repetitions: int = 1000) -> None:
-    transactions = load_transactions_from_db(limit=max(num_targets, 100))
-    if len(transactions) < 20:
-        raise RuntimeError(
-            "Need at least 20 transactions in the database to benchmark."
-        )
+def build_dicts(rows: List[Dict[str, Any]]) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+    return {
+        "id": build_index(rows),
+        "transaction_id": {r["transaction_id"]: r for r in rows if r["transaction_id"]},
+    }
+
+
+def build_sorted(
+    rows: List[Dict[str, Any]]
+) -> Dict[str, Tuple[List[Any], List[Dict[str, Any]]]]:
+    """Per column: the sorted keys and the rows in the same order (NULLs left out)."""
+    arrays = {}
+    for column, _ in PATTERNS.values():
+        ordered = sorted((r for r in rows if r[column] is not None), key=lambda r: r[column])
+        arrays[column] = ([r[column] for r in ordered], ordered)
+    return arrays
+
+
+def build_sqlite(rows: List[Dict[str, Any]]) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE transactions (id INTEGER PRIMARY KEY, transaction_id TEXT, "
+        "sms_date TEXT, amount INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO transactions VALUES (?, ?, ?, ?)",
+        ((r["id"], r["transaction_id"], r["sms_date"], r["amount"]) for r in rows),
+    )
+    # Same indexes as api/db.py
+    for column in ("transaction_id", "sms_date", "amount"):
+        conn.execute(f"CREATE INDEX idx_transactions_{column} ON transactions({column})")
+    return conn
+
+
+def _sqlite_bytes(conn: sqlite3.Connection) -> int:
+    # SQLite allocates outside Python, so tracemalloc can't see it; count its pages
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_size * conn.execute("PRAGMA page_count").fetchone()[0]
+
+
+def _traced(build: Callable[[], Any]) -> Tuple[Any, int, float]:
+    """Build a structure; return it with the bytes it allocated and the seconds it took."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        built = build()
+        seconds = time.perf_counter() - start
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return built, allocated, seconds
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def query_functions(
+    rows: List[Dict[str, Any]],
+    dicts: Dict[str, Dict[Any, Dict[str, Any]]],
+    arrays: Dict[str, Tuple[List[Any], List[Dict[str, Any]]]],
+    conn: sqlite3.Connection,
+) -> Dict[str, Dict[str, Callable[[Any], int]]]:
+    """pattern -> structure -> fn(query) returning the number of matching rows."""
+    fns: Dict[str, Dict[str, Callable[[Any], int]]] = {}
+    for pattern, (column, kind) in PATTERNS.items():
+        keys, ordered = arrays[column]
+        if kind == "point":
+            index = dicts[column]
+
+            def scan(q: Any, column: str = column) -> int:
+                if column == "id":
+                    return int(linear_search(rows, q) is not None)
+                return int(any(r[column] == q for r in rows))
+
+            def by_bisect(q: Any, keys: List[Any] = keys) -> int:
+                i = bisect_left(keys, q)
+                return int(i < len(keys) and keys[i] == q)
+
+            sql = f"SELECT {', '.join(BENCH_COLUMNS)} FROM transactions WHERE {column} = ?"
+            fns[pattern] = {
+                "list": scan,
+                "dict": lambda q, index=index: int(dict_lookup(index, q) is not None),
+                "bisect": by_bisect,
+                "sqlite": lambda q, sql=sql: int(
+                    conn.execute(sql, (q,)).fetchone() is not None
+                ),
+            }
+        else:
+            sql = (
+                f"SELECT {', '.join(BENCH_COLUMNS)} FROM transactions "
+                f"WHERE {column} BETWEEN ? AND ?"
+            )
+            fns[pattern] = {
+                "list": lambda q, c=column: len([r for r in rows if q[0] <= r[c] <= q[1]]),
+                "bisect": lambda q, keys=keys, ordered=ordered: len(
+                    ordered[bisect_left(keys, q[0]) : bisect_right(keys, q[1])]
+                ),
+                "sqlite": lambda q, sql=sql: len(conn.execute(sql, q).fetchall()),
+            }
+    return fns
+
+
+def make_queries(
+    arrays: Dict[str, Tuple[List[Any], List[Dict[str, Any]]]], count: int, rng: random.Random
+) -> Dict[str, List[Any]]:
+    """Point lookups of existing keys; ranges spanning RANGE_SELECTIVITY of the rows."""
+    queries: Dict[str, List[Any]] = {}
+    for pattern, (column, kind) in PATTERNS.items():
+        keys = arrays[column][0]
+        if kind == "point":
+            queries[pattern] = [rng.choice(keys) for _ in range(count)]
+        else:
+            width = max(1, int(len(keys) * RANGE_SELECTIVITY))
+            starts = [rng.randrange(max(1, len(keys) - width)) for _ in range(count)]
+            queries[pattern] = [
+                (keys[i], keys[min(i + width - 1, len(keys) - 1)]) for i in starts
+            ]
+    return queries
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _latencies(fn: Callable[[Any], int], queries: List[Any]) -> Dict[str, Any]:
+    samples = []
+    for q in queries:
+        start = time.perf_counter_ns()
+        fn(q)
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    return {
+        "queries": len(samples),
+        "p50_us": round(_percentile(samples, 50), 2),
+        "p95_us": round(_percentile(samples, 95), 2),
+        "mean_us": round(sum(samples) / len(samples), 2),
+    }
+
+
+# -----------------------------
+# Benchmark
+# -----------------------------
+def benchmark_size(
+    size: int, num_queries: int = 200, use_db: bool = True, seed: int = 0
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    (rows, from_db), rows_bytes, _ = _traced(lambda: make_dataset(size, use_db, seed))
+    dicts, dict_bytes, dict_seconds = _traced(lambda: build_dicts(rows))
+    arrays, bisect_bytes, bisect_seconds = _traced(lambda: build_sorted(rows))
+    start = time.perf_counter()
+    conn = build_sqlite(rows)
+    sqlite_seconds = time.perf_counter() - start
+
+    fns = query_functions(rows, dicts, arrays, conn)
+    queries = make_queries(arrays, num_queries, rng)
+    # Full scans: fewer queries once the table is big, so 1e6 rows stays bearable
+    scan_queries = max(10, min(num_queries, SCAN_BUDGET_ROWS // size))
+
+    patterns: Dict[str, Dict[str, Any]] = {}
+    for pattern, by_structure in fns.items():
+        # Warmup, and every structure must find the same rows
+        for q in queries[pattern][:10]:
+            counts = {name: fn(q) for name, fn in by_structure.items()}
+            assert len(set(counts.values())) == 1, (pattern, q, counts)
+        patterns[pattern] = {
+            name: _latencies(fn, queries[pattern][: scan_queries if name == "list" else None])
+            for name, fn in by_structure.items()
+        }
 
-    candidate_ids = [int(t["id"]) for t in transactions]
-    targets = random.sample(candidate_ids, k=num_targets)
+    result = {
+        "size": size,
+        "rows_from_db": from_db,
+        "rows_synthetic": size - from_db,
+        # list is the rows themselves; the others are on top of them (sqlite holds a copy)
+        "memory_bytes": {
+            "list": rows_bytes,
+            "dict": dict_bytes,
+            "bisect": bisect_bytes,
+            "sqlite": _sqlite_bytes(conn),
+        },
+        "build_seconds": {
+            "list": 0.0,
+            "dict": round(dict_seconds, 4),
+            "bisect": round(bisect_seconds, 4),
+            "sqlite": round(sqlite_seconds, 4),
+        },
+        "patterns": patterns,
+    }
+    conn.close()
+    return result
 
-    index = build_index(transactions)
 
-    linear_times: List[float] = []
-    dict_times: List[float] = []
+def _print_size(result: Dict[str, Any]) -> None:
+    print(
+        f"--- {result['size']:,} rows ({result['rows_from_db']:,} from db, "
+        f"{result['rows_synthetic']:,} synthetic) ---"
+    )
+    memory = result["memory_bytes"]
+    print("Memory: " + ", ".join(f"{s} {memory[s] / 1e6:.2f} MB" for s in STRUCTURES))
+    print(f"{'pattern':16}" + "".join(f"{s + ' p50/p95 us':>26}" for s in STRUCTURES))
+    for pattern, by_structure in result["patterns"].items():
+        cells = []
+        for name in STRUCTURES:
+            stats = by_structure.get(name)
+            if stats is None:
+                cells.append(f"{'n/a':>26}")
+            else:
+                cells.append(f"{stats['p50_us']:>12,.1f} / {stats['p95_us']:<11,.1f}")
+        print(f"{pattern:16}" + "".join(cells))
 
-    # Warmup
-    for tid in targets:
-        _ = linear_search(transactions, tid)
-        _ = dict_lookup(index, tid)
 
-    # Timed runs
-    for tid in targets:
-        start = time.perf_counter()
-        for _ in range(repetitions):
-            _ = linear_search(transactions, tid)
-        linear_times.append(time.perf_counter() - start)
+def benchmark(
+    sizes: List[int] = DEFAULT_SIZES,
+    num_queries: int = 200,
+    use_db: bool = True,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    print("=== Search Benchmark ===")
+    print(f"Sizes: {', '.join(f'{s:,}' for s in sizes)}, Queries per pattern: {num_queries}")
+    results = []
+    for size in sizes:
+        result = benchmark_size(size, num_queries, use_db, seed)
+        _print_size(result)
+        results.append(result)
+    return {
+        "queries": num_queries,
+        "seed": seed,
+        "range_selectivity": RANGE_SELECTIVITY,
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "results": results,
+    }
 
-        start = time.perf_counter()
-        for _ in range(repetitions):
-            _ = dict_lookup(index, tid)
-        dict_times.append(time.perf_counter() - start)
 
-    linear_avg = statistics.mean(linear_times)
-    dict_avg = statistics.mean(dict_times)
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare list scan, dict, bisect and indexed SQLite lookups across sizes"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="comma-separated row counts (default: 100 to 1,000,000)",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="queries per pattern")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--synthetic-only", action="store_true", help="don't start from the database's rows"
+    )
+    parser.add_argument("--json", action="store_true", help="also print results as JSON")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
 
-    print("=== Search Benchmark (by id) ===")
-    print(f"Records searched: {len(transactions)}")
-    print(f"Targets: {num_targets}, Repetitions per target: {repetitions}")
-    print(f"Linear search avg time: {linear_avg:.6f}s")
-    print(f"Dict lookup avg time:  {dict_avg:.6f}s")
-    speedup = linear_avg / dict_avg if dict_avg > 0 else float("inf")
-    print(f"Estimated speedup (linear/dict): {speedup:.1f}x")
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s.strip()]
+    results = benchmark(sizes, args.queries, not args.synthetic_only, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
 
 
 if __name__ == "__main__":
-    benchmark()
\ No newline at end of file
+    main()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+
+# Ensure project root on sys.path to import api.* and dsa.*
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from fastapi.responses import JSONResponse
+
+from api import fast_json
+from api.app import TRANSACTION_COLUMNS, _rows_body, _rows_content
+from api.db import transform_item
+from dsa.categorizer import default_categorizer
+from dsa.data_loader import iter_transactions_from_xml
+
+
+RAW_XML_PATH = os.path.join(PROJECT_ROOT, "data", "raw", "momo.xml")
+
+
+def synthetic_table(xml_path: str, rows: int) -> sqlite3.Connection:
+    """In-memory table of `rows` transactions, the repo's messages repeated as needed."""
+    records = [transform_item(item) for item in iter_transactions_from_xml(xml_path)]
+    if not records:
+        raise RuntimeError(f"No <sms> messages found in {xml_path}")
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE transactions ({', '.join(TRANSACTION_COLUMNS)})")
+    placeholders = ", ".join("?" for _ in TRANSACTION_COLUMNS)
+
+    def values(row_id: int) -> List[Any]:
+        t = records[(row_id - 1) % len(records)]
+        data = t.model_dump()
+        data["sms_date"] = t.sms_date.isoformat()
+        data["raw_json"] = json.dumps(t.raw_json)
+        data["value_band"] = default_categorizer().value_band(t.amount)
+        return [row_id] + [data[c] for c in TRANSACTION_COLUMNS[1:]]
+
+    conn.executemany(
+        f"INSERT INTO transactions VALUES ({placeholders})",
+        (values(i) for i in range(1, rows + 1)),
+    )
+    return conn
+
+
+def _fetch(conn: sqlite3.Connection, row_factory: Any) -> List[Any]:
+    conn.row_factory = row_factory
+    return conn.execute("SELECT * FROM transactions ORDER BY id").fetchall()
+
+
+def _time(fn: Callable[[], bytes], repetitions: int) -> List[float]:
+    samples = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def benchmark(
+    xml_path: str = RAW_XML_PATH, rows: int = 100_000, repetitions: int = 3
+) -> Dict[str, Any]:
+    conn = synthetic_table(xml_path, rows)
+    model_rows = _fetch(conn, sqlite3.Row)  # what the model path gets from the pool
+    plain_rows = _fetch(conn, None)  # what the fast path asks for
+    conn.close()
+
+    def model_path() -> bytes:
+        # What GET /transactions did per request: validate, jsonable_encoder, render
+        return JSONResponse(content=_rows_content(model_rows, None)).body
+
+    def fast_path() -> bytes:
+        return _rows_body(plain_rows, None)
+
+    def fast_path_stdlib() -> bytes:
+        # Same, without orjson: how much comes from skipping validation alone
+        saved, fast_json.orjson = fast_json.orjson, None
+        try:
+            return _rows_body(plain_rows, None)
+        finally:
+            fast_json.orjson = saved
+
+    # Warmup, and the fast path must produce the very same bytes
+    expected = model_path()
+    assert fast_path() == expected
+    assert fast_path_stdlib() == expected
+
+    timings = {
+        "model": _time(model_path, repetitions),
+        "fast_stdlib_json": _time(fast_path_stdlib, repetitions),
+        "fast": _time(fast_path, repetitions),
+    }
+    model_best = min(timings["model"])
+    results: Dict[str, Any] = {
+        "rows": rows,
+        "repetitions": repetitions,
+        "body_bytes": len(expected),
+        "orjson": fast_json.orjson is not None,
+    }
+    for name, samples in timings.items():
+        best = min(samples)
+        results[name] = {
+            "best_seconds": round(best, 4),
+            "median_seconds": round(statistics.median(samples), 4),
+            "rows_per_second": round(rows / best),
+            "speedup": round(model_best / best, 2),
+        }
+
+    print("=== Response Serialization Benchmark ===")
+    print(f"Rows: {rows}, Body: {len(expected) / 1e6:.1f} MB, Repetitions: {repetitions}")
+    for name in timings:
+        r = results[name]
+        print(
+            f"{name:18} {r['best_seconds']:8.3f}s  {r['rows_per_second']:>10,} rows/s"
+            f"  {r['speedup']}x"
+        )
+    if not results["orjson"]:
+        print("orjson not installed: 'fast' used the stdlib encoder")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare model-validated and fast JSON serialization of transaction rows"
+    )
+    parser.add_argument("--xml", default=RAW_XML_PATH)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="also print results as JSON")
+    args = parser.parse_args()
+
+    results = benchmark(args.xml, args.rows, args.repetitions)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
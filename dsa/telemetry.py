@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Callable, Dict, Iterator, NamedTuple, Optional
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# JSON log lines are appended here (relative to the project root; empty: stderr only), and
+# etl_summary.json with the latest run is written beside it
+INGEST_LOG_PATH = os.getenv("INGEST_LOG_PATH", "data/logs/dead_letter/etl.log") or None
+if INGEST_LOG_PATH and not os.path.isabs(INGEST_LOG_PATH):
+    INGEST_LOG_PATH = os.path.join(PROJECT_ROOT, INGEST_LOG_PATH)
+# Where etl_summary.json goes when there is no log file
+DEFAULT_SUMMARY_DIR = os.path.join(PROJECT_ROOT, "data", "logs", "dead_letter")
+SUMMARY_FILE_NAME = "etl_summary.json"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Seconds between progress reports (callback and log line) during a run
+PROGRESS_INTERVAL = float(os.getenv("INGEST_PROGRESS_INTERVAL", "5"))
+
+COUNTERS = (
+    "messages_seen",  # <sms> elements read from the XML, including ones already stored
+    "messages_parsed",  # new messages run through field extraction
+    "unknown_type",  # parsed messages no rule classified
+    "missing_tx_id",  # parsed messages without a TxId / Financial Transaction Id
+    "rows_inserted",  # rows actually written (duplicates of stored TxIds are skipped)
+    "quarantined",  # dead-letter entries written (dsa/dead_letter.py), XML errors included
+    "bytes_read",  # bytes of XML read so far
+)
+
+logger = logging.getLogger("momo.ingest")
+
+
+class IngestProgress(NamedTuple):
+    """Handed to the progress callback every PROGRESS_INTERVAL seconds and at the end."""
+
+    run_id: str
+    seconds: float
+    messages_seen: int
+    rows_inserted: int
+    records_per_second: float  # messages seen per second since the previous report
+    average_records_per_second: float
+    bytes_read: int
+    bytes_total: Optional[int]
+
+    @property
+    def percent(self) -> Optional[float]:
+        if not self.bytes_total:
+            return None
+        return min(100.0, 100.0 * self.bytes_read / self.bytes_total)
+
+
+ProgressCallback = Callable[[IngestProgress], None]
+
+
+class IngestTelemetry:
+    """
+    Counters (COUNTERS) and per-stage timers for one ingest run, reported as
+    structured log events on the "momo.ingest" logger: ingest.start,
+    ingest.progress (every `interval` seconds, via tick()) and ingest.summary.
+    Where those end up is the application's choice (configure_ingest_logging);
+    without a handler only warnings reach stderr.
+    """
+
+    def __init__(
+        self,
+        pipeline: str,
+        source: str,
+        progress: Optional[ProgressCallback] = None,
+        interval: float = PROGRESS_INTERVAL,
+    ) -> None:
+        self.run_id = uuid.uuid4().hex[:12]
+        self.pipeline = pipeline
+        self.source = source
+        self.progress = progress
+        self.interval = interval
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.stages: Dict[str, float] = {}
+        self.started_at = datetime.now(timezone.utc)
+        try:
+            self.bytes_total: Optional[int] = os.path.getsize(source)
+        except OSError:
+            self.bytes_total = None
+        self._start = time.perf_counter()
+        self._last_report = (self._start, 0)
+        self.summary: Optional[Dict[str, Any]] = None
+        log_event(
+            "ingest.start",
+            f"{pipeline}: loading {source}",
+            run_id=self.run_id,
+            pipeline=pipeline,
+            source=source,
+            bytes_total=self.bytes_total,
+        )
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def tick(self) -> None:
+        """Report progress if `interval` seconds passed since the last report (cheap otherwise)."""
+        if time.perf_counter() - self._last_report[0] >= self.interval:
+            self._report()
+
+    def _report(self) -> IngestProgress:
+        now = time.perf_counter()
+        seen = self.counters["messages_seen"]
+        last_time, last_seen = self._last_report
+        self._last_report = (now, seen)
+        elapsed = now - self._start
+        report = IngestProgress(
+            run_id=self.run_id,
+            seconds=round(elapsed, 3),
+            messages_seen=seen,
+            rows_inserted=self.counters["rows_inserted"],
+            records_per_second=(
+                round((seen - last_seen) / (now - last_time), 1) if now > last_time else 0.0
+            ),
+            average_records_per_second=round(seen / elapsed, 1) if elapsed else 0.0,
+            bytes_read=self.counters["bytes_read"],
+            bytes_total=self.bytes_total,
+        )
+        percent = report.percent
+        log_event(
+            "ingest.progress",
+            f"{self.pipeline}: {seen} messages, {report.rows_inserted} rows, "
+            f"{report.records_per_second} msg/s"
+            + (f", {percent:.1f}% of the file" if percent is not None else ""),
+            **report._asdict(),
+            percent=None if percent is None else round(percent, 1),
+        )
+        if self.progress is not None:
+            self.progress(report)
+        return report
+
+    def finish(self, status: str = "ok", error: Optional[BaseException] = None) -> Dict[str, Any]:
+        """Log the ingest.summary event (final progress first) and return its fields."""
+        if status == "ok":
+            self._report()
+        seconds = time.perf_counter() - self._start
+        seen = self.counters["messages_seen"]
+        self.summary = {
+            "run_id": self.run_id,
+            "pipeline": self.pipeline,
+            "source": self.source,
+            "status": status,
+            "started_at": self.started_at.isoformat(),
+            "seconds": round(seconds, 3),
+            "records_per_second": round(seen / seconds, 1) if seconds else None,
+            "counters": dict(self.counters),
+            "stage_seconds": {name: round(value, 4) for name, value in self.stages.items()},
+        }
+        if error is not None:
+            self.summary["error"] = f"{type(error).__name__}: {error}"
+        log_event(
+            "ingest.summary",
+            f"{self.pipeline}: {status}, {seen} messages seen, "
+            f"{self.counters['rows_inserted']} rows inserted in {seconds:.2f}s",
+            level=logging.INFO if error is None else logging.ERROR,
+            **self.summary,
+        )
+        return self.summary
+
+    def wrap_file(self, path: str) -> "CountingFile":
+        """Open `path` for reading, adding every read to the bytes_read counter."""
+        return CountingFile(open(path, "rb"), self)
+
+
+class CountingFile:
+    """Read-only binary file adding every read to the bytes_read counter (for lxml)."""
+
+    def __init__(self, raw: BinaryIO, telemetry: IngestTelemetry) -> None:
+        self._raw = raw
+        self._counters = telemetry.counters
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._raw.read(size)
+        self._counters["bytes_read"] += len(data)
+        return data
+
+    def close(self) -> None:
+        self._raw.close()
+
+
+# -----------------------------
+# Structured logging
+# -----------------------------
+def log_event(event: str, message: str, level: int = logging.INFO, **fields: Any) -> None:
+    """One structured event: `message` is for humans, `fields` for the JSON line."""
+    logger.log(level, message, extra={"event": event, "fields": fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, event, message, then the event's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "event": getattr(record, "event", record.name),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SummaryFileHandler(logging.Handler):
+    """Overwrites `path` with the fields of each ingest.summary event (the latest run)."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if getattr(record, "event", None) != "ingest.summary":
+            return
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(getattr(record, "fields", {}), f, indent=2, default=str)
+                f.write("\n")
+            os.replace(tmp_path, self.path)
+        except Exception:
+            self.handleError(record)
+
+
+def configure_ingest_logging(
+    log_path: Optional[str] = INGEST_LOG_PATH, level: str = LOG_LEVEL
+) -> None:
+    """
+    Application entry points call this once: JSON lines on stderr and appended to
+    `log_path` (INGEST_LOG_PATH), and the latest summary in etl_summary.json beside
+    it. With no `log_path` only stderr gets the lines and the summary goes to
+    data/logs/dead_letter/. Calling it again adds no handler twice.
+    """
+    logger.setLevel(level)
+    log_path = os.path.abspath(log_path) if log_path else None
+    summary_dir = os.path.dirname(log_path) if log_path else DEFAULT_SUMMARY_DIR
+    summary_path = os.path.join(summary_dir, SUMMARY_FILE_NAME)
+    os.makedirs(summary_dir, exist_ok=True)
+    # Handlers already installed are marked with what they write to
+    targets = {getattr(handler, "ingest_target", None) for handler in logger.handlers}
+    handlers: Dict[str, Callable[[], logging.Handler]] = {
+        "<stderr>": lambda: logging.StreamHandler(sys.stderr),
+        summary_path: lambda: SummaryFileHandler(summary_path),
+    }
+    if log_path:
+        handlers[log_path] = lambda: logging.FileHandler(log_path, encoding="utf-8")
+    for target, make_handler in handlers.items():
+        if target in targets:
+            continue
+        handler = make_handler()
+        handler.setFormatter(JsonFormatter())
+        handler.ingest_target = target  # type: ignore[attr-defined]
+        logger.addHandler(handler)
+
+
+def print_progress(progress: IngestProgress) -> None:
+    """Progress callback for the command-line loaders: one line per report."""
+    percent = progress.percent
+    print(
+        f"  {progress.seconds:8.1f}s  {progress.messages_seen:>10} messages  "
+        f"{progress.rows_inserted:>10} rows  {progress.records_per_second:>10.1f} msg/s"
+        + (f"  {percent:5.1f}%" if percent is not None else ""),
+        flush=True,
+    )
+
+
+__all__ = [
+    "COUNTERS",
+    "CountingFile",
+    "INGEST_LOG_PATH",
+    "IngestProgress",
+    "IngestTelemetry",
+    "JsonFormatter",
+    "configure_ingest_logging",
+    "log_event",
+    "print_progress",
+]
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+# Loader records (dsa.data_loader.build_transaction) by default; the API passes its column names
+DEFAULT_EQUALITY_KEYS = ("tx_id", "sms_address", "type")
+DEFAULT_RANGE_KEYS = ("timestamp_ms", "amount")
+
+Record = Dict[str, Any]
+# (low, high), both inclusive; None leaves that side open
+Bounds = Tuple[Any, Any]
+
+
+class TransactionIndex:
+    """
+    In-memory index over transaction records, keyed by `id_key`.
+
+    Equality keys get a hash index (value -> set of ids); range keys get a sorted
+    array of (value, id) pairs searched with bisect. Records with a None value are
+    left out of that key's index, as SQL comparisons with NULL never match.
+
+    query() intersects any mix of predicates: it starts from the predicate with the
+    fewest candidates (known up front from set sizes and bisect positions) and checks
+    the others on those records only. Results come back in ascending id order.
+    All methods are thread-safe.
+    """
+
+    def __init__(
+        self,
+        records: Iterable[Record] = (),
+        id_key: str = "id",
+        equality_keys: Sequence[str] = DEFAULT_EQUALITY_KEYS,
+        range_keys: Sequence[str] = DEFAULT_RANGE_KEYS,
+    ) -> None:
+        self.id_key = id_key
+        self.equality_keys = tuple(equality_keys)
+        # Ids are always range-searchable (cursor pagination, ordered output)
+        self.range_keys = tuple(dict.fromkeys((id_key, *range_keys)))
+        self._records: Dict[Any, Record] = {}
+        self._hashes: Dict[str, Dict[Any, Set[Any]]] = {k: {} for k in self.equality_keys}
+        self._sorted: Dict[str, List[Tuple[Any, Any]]] = {k: [] for k in self.range_keys}
+        self._lock = threading.RLock()
+        self.load(records)
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def load(self, records: Iterable[Record]) -> int:
+        """Bulk insert (replacing same-id records): append everything, then sort once."""
+        incoming = {record[self.id_key]: record for record in records}
+        with self._lock:
+            for record_id in incoming.keys() & self._records.keys():
+                self._unindex(self._records[record_id])
+            for record_id, record in incoming.items():
+                self._records[record_id] = record
+                self._index_equality(record)
+                for key in self.range_keys:
+                    if record.get(key) is not None:
+                        self._sorted[key].append((record[key], record_id))
+            for pairs in self._sorted.values():
+                pairs.sort()
+            return len(incoming)
+
+    def insert(self, record: Record) -> None:
+        """Add a record, replacing any record with the same id."""
+        with self._lock:
+            record_id = record[self.id_key]
+            if record_id in self._records:
+                self._unindex(self._records[record_id])
+            self._records[record_id] = record
+            self._index(record)
+
+    def update(self, record_id: Any, changes: Record) -> Record:
+        """Apply `changes` to a stored record; only the indexes of changed keys are touched."""
+        with self._lock:
+            old = self._records[record_id]
+            new = {**old, **changes, self.id_key: record_id}
+            for key in self.equality_keys:
+                if old.get(key) != new.get(key):
+                    self._hash_remove(key, old.get(key), record_id)
+                    self._hash_add(key, new.get(key), record_id)
+            for key in self.range_keys:
+                if old.get(key) != new.get(key):
+                    self._sorted_remove(key, old.get(key), record_id)
+                    self._sorted_add(key, new.get(key), record_id)
+            self._records[record_id] = new
+            return new
+
+    def delete(self, record_id: Any) -> Optional[Record]:
+        """Remove a record; returns it, or None if it wasn't there."""
+        with self._lock:
+            record = self._records.pop(record_id, None)
+            if record is not None:
+                self._unindex(record)
+            return record
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            for values in self._hashes.values():
+                values.clear()
+            for pairs in self._sorted.values():
+                pairs.clear()
+
+    def _index(self, record: Record) -> None:
+        record_id = record[self.id_key]
+        self._index_equality(record)
+        for key in self.range_keys:
+            self._sorted_add(key, record.get(key), record_id)
+
+    def _index_equality(self, record: Record) -> None:
+        for key in self.equality_keys:
+            self._hash_add(key, record.get(key), record[self.id_key])
+
+    def _unindex(self, record: Record) -> None:
+        record_id = record[self.id_key]
+        for key in self.equality_keys:
+            self._hash_remove(key, record.get(key), record_id)
+        for key in self.range_keys:
+            self._sorted_remove(key, record.get(key), record_id)
+
+    def _hash_add(self, key: str, value: Any, record_id: Any) -> None:
+        if value is not None:
+            self._hashes[key].setdefault(value, set()).add(record_id)
+
+    def _hash_remove(self, key: str, value: Any, record_id: Any) -> None:
+        ids = self._hashes[key].get(value)
+        if ids is not None:
+            ids.discard(record_id)
+            if not ids:
+                del self._hashes[key][value]
+
+    def _sorted_add(self, key: str, value: Any, record_id: Any) -> None:
+        if value is not None:
+            insort(self._sorted[key], (value, record_id))
+
+    def _sorted_remove(self, key: str, value: Any, record_id: Any) -> None:
+        if value is None:
+            return
+        pairs = self._sorted[key]
+        i = bisect_left(pairs, (value, record_id))
+        if i < len(pairs) and pairs[i] == (value, record_id):
+            del pairs[i]
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, record_id: Any) -> bool:
+        return record_id in self._records
+
+    def get(self, record_id: Any) -> Optional[Record]:
+        return self._records.get(record_id)
+
+    def _span(self, key: str, bounds: Bounds) -> Tuple[int, int]:
+        """Positions in the sorted array of `key` covering `bounds`."""
+        pairs = self._sorted[key]
+        low, high = bounds
+        # (value,) sorts before every (value, id) and (value, _MAX) after them
+        start = 0 if low is None else bisect_left(pairs, (low,))
+        end = len(pairs) if high is None else bisect_right(pairs, (high, _MAX))
+        return start, max(start, end)
+
+    def _candidates(
+        self, equals: Dict[str, Any], ranges: Dict[str, Bounds]
+    ) -> Tuple[Iterable[Any], Optional[str]]:
+        """Ids from the most selective predicate and the key it came from (None: all ids)."""
+        best: Optional[Iterable[Any]] = None
+        best_count = len(self._records) + 1
+        source = None
+        for key, value in equals.items():
+            ids = self._hashes[key].get(value, ())
+            if len(ids) < best_count:
+                best, best_count, source = ids, len(ids), key
+        for key, bounds in ranges.items():
+            start, end = self._span(key, bounds)
+            if end - start < best_count:
+                pairs = self._sorted[key]
+                best = (pairs[i][1] for i in range(start, end))
+                best_count, source = end - start, key
+        if best is None:
+            best = (record_id for _, record_id in self._sorted[self.id_key])
+        return best, source
+
+    def query(
+        self,
+        equals: Optional[Dict[str, Any]] = None,
+        ranges: Optional[Dict[str, Bounds]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Record]:
+        """
+        Records matching every predicate, in ascending id order.
+        `equals` maps equality keys to a value; `ranges` maps range keys (or the id
+        key) to inclusive (low, high) bounds, either of which may be None.
+        """
+        equals = dict(equals or {})
+        ranges = dict(ranges or {})
+        unknown = (set(equals) - set(self.equality_keys)) | (set(ranges) - set(self.range_keys))
+        if unknown:
+            raise KeyError(f"Not an indexed key: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            ids, source = self._candidates(equals, ranges)
+            equals.pop(source, None)
+            ranges.pop(source, None)
+            # Candidates walked off the id array are already in order: stop at the limit
+            ordered = source is None or source == self.id_key
+            matched = []
+            for record_id in ids:
+                record = self._records[record_id]
+                if _matches(record, equals, ranges):
+                    matched.append(record)
+                    if ordered and limit is not None and len(matched) >= limit:
+                        break
+            if not ordered:
+                matched.sort(key=lambda record: record[self.id_key])
+            return matched[:limit] if limit is not None else matched
+
+    def count(
+        self, equals: Optional[Dict[str, Any]] = None, ranges: Optional[Dict[str, Bounds]] = None
+    ) -> int:
+        return len(self.query(equals, ranges))
+
+    def __iter__(self) -> Iterator[Record]:
+        with self._lock:
+            return iter([self._records[i] for _, i in self._sorted[self.id_key]])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "records": len(self._records),
+                "equality_keys": {k: len(v) for k, v in self._hashes.items()},
+                "range_keys": {k: len(v) for k, v in self._sorted.items()},
+            }
+
+
+class _Max:
+    """Compares greater than anything: the upper sentinel for (value, _MAX) bounds."""
+
+    def __lt__(self, other: Any) -> bool:
+        return False
+
+    def __gt__(self, other: Any) -> bool:
+        return True
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, _Max)
+
+    __hash__ = object.__hash__
+
+
+_MAX = _Max()
+
+
+def _matches(record: Record, equals: Dict[str, Any], ranges: Dict[str, Bounds]) -> bool:
+    for key, value in equals.items():
+        if record.get(key) != value:
+            return False
+    for key, (low, high) in ranges.items():
+        value = record.get(key)
+        if value is None:
+            return False
+        if low is not None and value < low:
+            return False
+        if high is not None and value > high:
+            return False
+    return True
+
+
+__all__ = [
+    "DEFAULT_EQUALITY_KEYS",
+    "DEFAULT_RANGE_KEYS",
+    "TransactionIndex",
+]
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from dsa.categorizer import Categorizer, default_categorizer
+from dsa.telemetry import IngestTelemetry
+from etl.pipeline import Stage
+
+
+class Categorize(Stage):
+    """
+    Sets each record's "type" from its body with `categorizer`; counts unknown_type
+    when given telemetry. build_transaction has already classified every record with
+    dsa.categorizer.default_categorizer(), the one all loaders share, so with the
+    default this stage only counts.
+    """
+
+    name = "categorize"
+
+    def __init__(
+        self,
+        categorizer: Optional[Categorizer] = None,
+        telemetry: Optional[IngestTelemetry] = None,
+    ) -> None:
+        self.categorizer = categorizer or default_categorizer()
+        self.telemetry = telemetry
+
+    def process(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.categorizer is not default_categorizer():
+            classify = self.categorizer.classify
+            for record in records:
+                record["type"] = classify(record["raw_body"])
+        if self.telemetry is not None:
+            default = self.categorizer.default
+            self.telemetry.count(
+                "unknown_type", sum(1 for record in records if record["type"] == default)
+            )
+        return records
+
+
+__all__ = ["Categorize"]
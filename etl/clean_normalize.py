@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from dsa.data_loader import build_transaction
+from dsa.dead_letter import DeadLetterWriter, extract_record
+from dsa.telemetry import IngestTelemetry
+from etl.pipeline import Stage
+
+
+class CleanNormalize(Stage):
+    """
+    (row_id, <sms> attributes) -> loader records: one extraction pass per body
+    (dsa/sms_extractor.py) gives numeric amount, fee and balance, the TxId ("N/A"
+    when there is none), counterparty and timestamps, with the raw body kept as is.
+    Counts messages_parsed and missing_tx_id when given telemetry. With
+    `dead_letter`, messages failing the dsa/dead_letter.py checks are quarantined
+    there and dropped from the batch.
+    """
+
+    name = "clean_normalize"
+
+    def __init__(
+        self,
+        telemetry: Optional[IngestTelemetry] = None,
+        dead_letter: Optional[DeadLetterWriter] = None,
+    ) -> None:
+        self.telemetry = telemetry
+        self.dead_letter = dead_letter
+
+    def process(self, batch: List[Tuple[int, Dict[str, str]]]) -> List[Dict[str, Any]]:
+        if self.dead_letter is None:
+            records = [build_transaction(row_id, sms) for row_id, sms in batch]
+        else:
+            records = []
+            for row_id, sms in batch:
+                record, rejection = extract_record(row_id, sms)
+                if rejection is None:
+                    records.append(record)
+                else:
+                    self.dead_letter.reject(rejection)
+        if self.telemetry is not None:
+            self.telemetry.count("messages_parsed", len(batch))
+            self.telemetry.count(
+                "missing_tx_id", sum(1 for record in records if record["tx_id"] == "N/A")
+            )
+        return records
+
+
+__all__ = ["CleanNormalize"]
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _project_path(value: str) -> str:
+    """Relative paths in the environment are relative to the project root."""
+    return value if os.path.isabs(value) else os.path.join(PROJECT_ROOT, value)
+
+
+# Same variables as .env.example; defaults match api.db
+XML_INPUT_PATH = _project_path(os.getenv("XML_INPUT_PATH", "data/raw/momo.xml"))
+DATABASE_PATH = _project_path(os.getenv("DATABASE_PATH", "data/db.sqlite3"))
+
+# Messages per batch handed from one stage to the next (and per executemany)
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "1000"))
+# Batches buffered between two stages; with the batch size this bounds memory
+QUEUE_SIZE = int(os.getenv("ETL_QUEUE_SIZE", "4"))
+# 0 runs every stage in the calling thread (plain generator chaining)
+ETL_THREADS = os.getenv("ETL_THREADS", "1") == "1"
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    """Settings for one pipeline run; the defaults come from the environment."""
+
+    xml_path: str = XML_INPUT_PATH
+    database_path: str = DATABASE_PATH
+    batch_size: int = BATCH_SIZE
+    queue_size: int = QUEUE_SIZE
+    threaded: bool = ETL_THREADS
+
+    def __post_init__(self) -> None:
+        if self.batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if self.queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+
+
+__all__ = [
+    "BATCH_SIZE",
+    "DATABASE_PATH",
+    "ETL_THREADS",
+    "PipelineConfig",
+    "QUEUE_SIZE",
+    "XML_INPUT_PATH",
+]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Dict, List, Optional, Set
+
+from api.db import (
+    INSERT_NEW_SQL,
+    IngestPlan,
+    begin_load,
+    connect,
+    finish_load,
+    row_days,
+    to_row,
+    transform_item,
+)
+from dsa.dead_letter import DeadLetterWriter, sms_from_record
+from dsa.telemetry import IngestTelemetry
+from etl.parse import XmlSource
+from etl.pipeline import Stage
+
+
+class LoadDb(Stage):
+    """
+    Validates records into table rows and inserts them into the database at
+    `database_path` (own connection), skipping transaction_ids already stored. Like
+    api.db.initialize_database, the whole run is one write transaction: the rows,
+    their daily rollups, the search index and the source's new high-water mark
+    (read from `source` at the end) commit together or not at all.
+    Inserted rows are also counted in `telemetry` (rows_inserted), when given.
+    With `dead_letter`, records failing validation are quarantined instead of
+    failing the run.
+    """
+
+    name = "load"
+
+    def __init__(
+        self,
+        database_path: str,
+        plan: IngestPlan,
+        source: XmlSource,
+        telemetry: Optional[IngestTelemetry] = None,
+        dead_letter: Optional[DeadLetterWriter] = None,
+    ) -> None:
+        self.database_path = database_path
+        self.plan = plan
+        self.source = source
+        self.telemetry = telemetry
+        self.dead_letter = dead_letter
+        self.inserted = 0
+        self._days: Set[str] = set()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self) -> None:
+        self.inserted = 0
+        self._days = set()
+        self._conn = connect(self.database_path)
+        begin_load(self._conn, self.plan)
+
+    def process(self, records: List[Dict[str, Any]]) -> List[Any]:
+        if self.dead_letter is None:
+            rows = [to_row(transform_item(record)) for record in records]
+        else:
+            rows = []
+            for record in records:
+                try:
+                    rows.append(to_row(transform_item(record)))
+                except (ValueError, OverflowError, OSError) as exc:  # ValidationError included
+                    self.dead_letter.put(
+                        "validation_error",
+                        f"{type(exc).__name__}: {exc}",
+                        sms_from_record(record),
+                        record["id"],
+                    )
+        # rowcount, unlike total_changes, leaves out the search-index triggers
+        inserted = self._conn.executemany(INSERT_NEW_SQL, rows).rowcount
+        self.inserted += inserted
+        if self.telemetry is not None:
+            self.telemetry.count("rows_inserted", inserted)
+        self._days.update(row_days(rows))
+        return rows
+
+    def close(self, ok: bool) -> None:
+        conn, self._conn = self._conn, None
+        try:
+            if ok:
+                if self.dead_letter is not None:
+                    # Every stage is done: rows are only stored once their rejects are on disk
+                    self.dead_letter.close()
+                finish_load(conn, self.plan, self._days, self.source.high_water_ms)
+                conn.commit()
+            else:
+                conn.rollback()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+__all__ = ["LoadDb"]
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from api.db import iter_chunks
+from dsa.dead_letter import DeadLetterWriter
+from dsa.telemetry import IngestTelemetry
+from etl.config import BATCH_SIZE
+from etl.pipeline import Source
+
+
+class XmlSource(Source):
+    """
+    Streams an SMS backup as batches of (row_id, <sms> attributes), one element in
+    memory at a time (dsa.data_loader.iter_sms_attributes). Messages dated at or
+    below `since_ms` are skipped; the largest date seen, skipped or not, ends up in
+    high_water_ms for the next incremental run. With `telemetry`, messages seen,
+    bytes read and parse time are counted and progress is reported between batches.
+    With `dead_letter`, recovered XML errors go there and messages with an
+    unreadable date are passed on for CleanNormalize to quarantine.
+    """
+
+    name = "parse"
+
+    def __init__(
+        self,
+        xml_path: str,
+        batch_size: int = BATCH_SIZE,
+        since_ms: int = -1,
+        telemetry: Optional[IngestTelemetry] = None,
+        dead_letter: Optional[DeadLetterWriter] = None,
+    ) -> None:
+        self.xml_path = xml_path
+        self.batch_size = batch_size
+        self.since_ms = since_ms
+        self.telemetry = telemetry
+        self.dead_letter = dead_letter
+        self._scan = {"high_water_ms": since_ms}
+
+    @property
+    def high_water_ms(self) -> int:
+        return self._scan["high_water_ms"]
+
+    def batches(self) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+        return iter_chunks(
+            self.xml_path,
+            self.batch_size,
+            self.since_ms,
+            self._scan,
+            self.telemetry,
+            self.dead_letter,
+        )
+
+
+__all__ = ["XmlSource"]
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from etl.config import ETL_THREADS, QUEUE_SIZE
+
+
+Batch = List[Any]
+
+# End of stream marker passed down the queues
+_DONE = object()
+# How often a thread blocked on a queue checks whether another stage failed
+_POLL_SECONDS = 0.1
+
+
+class Source:
+    """First stage of a pipeline: produces the batches."""
+
+    name = "source"
+
+    def batches(self) -> Iterator[Batch]:
+        raise NotImplementedError
+
+
+class Stage:
+    """
+    One step of a pipeline: process() turns a batch into the batch for the next
+    stage (an empty result is dropped). open() and close() bracket a run; close()
+    is told whether the whole run succeeded, so a loader can commit or roll back.
+    """
+
+    name = "stage"
+
+    def open(self) -> None:
+        pass
+
+    def process(self, batch: Batch) -> Batch:
+        raise NotImplementedError
+
+    def close(self, ok: bool) -> None:
+        pass
+
+
+@dataclass
+class StageStats:
+    """Counters for one stage. busy is time spent in the stage's own code; wait is
+    time blocked on its queues (starved by the stage before, or held back by the next)."""
+
+    name: str
+    batches: int = 0
+    items_in: int = 0
+    items_out: int = 0
+    busy_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    max_batch_seconds: float = 0.0
+
+    def record(self, items_in: int, items_out: int, seconds: float) -> None:
+        self.batches += 1
+        self.items_in += items_in
+        self.items_out += items_out
+        self.busy_seconds += seconds
+        self.max_batch_seconds = max(self.max_batch_seconds, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "batches": self.batches,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "items_per_second": round(self.items_in / self.busy_seconds) if self.busy_seconds else None,
+            "mean_batch_ms": (
+                round(1000 * self.busy_seconds / self.batches, 2) if self.batches else None
+            ),
+            "max_batch_ms": round(1000 * self.max_batch_seconds, 2),
+        }
+
+
+@dataclass
+class PipelineReport:
+    seconds: float
+    threaded: bool
+    stages: List[StageStats] = field(default_factory=list)
+    # Rows actually written, when the last stage is a loader that skips duplicates
+    inserted: Optional[int] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        items = self.stages[0].items_out if self.stages else 0
+        return {
+            "seconds": round(self.seconds, 3),
+            "threaded": self.threaded,
+            "items": items,
+            "items_per_second": round(items / self.seconds) if self.seconds else None,
+            "inserted": self.inserted,
+            "stages": [s.as_dict() for s in self.stages],
+        }
+
+
+class Pipeline:
+    """
+    source -> stages[0] -> stages[1] -> ... with the output of the last stage dropped.
+
+    Threaded (the default), each stage runs in its own thread with a queue of at
+    most `queue_size` batches in front of it, so a slow stage holds the ones before
+    it back instead of letting batches pile up: memory stays around
+    (stages + 1) * queue_size batches whatever the input size. Unthreaded, the
+    stages are plain generators chained in the calling thread, one batch in flight.
+    If any stage raises, the others stop, every stage is closed with ok=False and
+    the first error is re-raised.
+    """
+
+    def __init__(
+        self,
+        source: Source,
+        stages: Sequence[Stage],
+        queue_size: int = QUEUE_SIZE,
+        threaded: bool = ETL_THREADS,
+    ) -> None:
+        self.source = source
+        self.stages = list(stages)
+        self.queue_size = max(1, queue_size)
+        self.threaded = threaded
+
+    def run(self) -> PipelineReport:
+        stats = [StageStats(self.source.name)] + [StageStats(s.name) for s in self.stages]
+        opened: List[Stage] = []
+        ok = False
+        start = time.perf_counter()
+        try:
+            for stage in self.stages:
+                stage.open()
+                opened.append(stage)
+            if self.threaded:
+                self._run_threaded(stats)
+            else:
+                self._run_serial(stats)
+            ok = True
+        finally:
+            for stage in opened:
+                stage.close(ok)
+        return PipelineReport(time.perf_counter() - start, self.threaded, stats)
+
+    def _run_serial(self, stats: List[StageStats]) -> None:
+        batches = _timed_source(self.source.batches(), stats[0])
+        for stage, stage_stats in zip(self.stages, stats[1:]):
+            batches = _timed_stage(stage, batches, stage_stats)
+        for _ in batches:
+            pass
+
+    def _run_threaded(self, stats: List[StageStats]) -> None:
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        # queues[i] feeds self.stages[i]
+        queues: List[queue.Queue] = [queue.Queue(self.queue_size) for _ in self.stages]
+
+        def feed(batches: Iterator[Batch], out: Optional[queue.Queue], own: StageStats) -> None:
+            try:
+                for batch in batches:
+                    if out is not None and not _put(out, batch, stop, own):
+                        return
+                if out is not None:
+                    _put(out, _DONE, stop, own)
+            except BaseException as exc:
+                errors.append(exc)
+                stop.set()
+
+        workers = []
+        for i, stage_stats in enumerate(stats):
+            if i == 0:
+                batches = _timed_source(self.source.batches(), stage_stats)
+            else:
+                inbox = _drain(queues[i - 1], stop, stage_stats)
+                batches = _timed_stage(self.stages[i - 1], inbox, stage_stats)
+            out = queues[i] if i < len(queues) else None
+            workers.append(
+                threading.Thread(
+                    target=feed,
+                    args=(batches, out, stage_stats),
+                    name=f"etl-{stage_stats.name}",
+                    daemon=True,
+                )
+            )
+
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except BaseException:
+            # e.g. Ctrl-C: let the stages wind down before closing them
+            stop.set()
+            for worker in workers:
+                worker.join()
+            raise
+        if errors:
+            raise errors[0]
+
+
+def _timed_source(batches: Iterable[Batch], stats: StageStats) -> Iterator[Batch]:
+    batches = iter(batches)
+    while True:
+        start = time.perf_counter()
+        batch = next(batches, None)
+        if batch is None:
+            return
+        stats.record(len(batch), len(batch), time.perf_counter() - start)
+        yield batch
+
+
+def _timed_stage(stage: Stage, batches: Iterable[Batch], stats: StageStats) -> Iterator[Batch]:
+    for batch in batches:
+        start = time.perf_counter()
+        out = stage.process(batch)
+        stats.record(len(batch), len(out), time.perf_counter() - start)
+        if out:
+            yield out
+
+
+def _put(out: queue.Queue, item: Any, stop: threading.Event, stats: StageStats) -> bool:
+    """Block until the next stage has room; False if the pipeline stopped meanwhile."""
+    start = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+    finally:
+        stats.wait_seconds += time.perf_counter() - start
+
+
+def _drain(inbox: queue.Queue, stop: threading.Event, stats: StageStats) -> Iterator[Batch]:
+    """Batches from the stage before, until it finishes (or the pipeline stops)."""
+    while True:
+        start = time.perf_counter()
+        while True:
+            try:
+                item = inbox.get(timeout=_POLL_SECONDS)
+                break
+            except queue.Empty:
+                if stop.is_set():
+                    return
+        stats.wait_seconds += time.perf_counter() - start
+        if item is _DONE:
+            return
+        yield item
+
+
+__all__ = [
+    "Batch",
+    "Pipeline",
+    "PipelineReport",
+    "Source",
+    "Stage",
+    "StageStats",
+]
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+from contextlib import closing
+from typing import List, Optional
+
+# Ensure project root on sys.path to import api.*, dsa.* and etl.*
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from api import db
+from dsa.dead_letter import DEAD_LETTER_ENABLED, DeadLetterWriter
+from dsa.telemetry import (
+    IngestTelemetry,
+    ProgressCallback,
+    configure_ingest_logging,
+    log_event,
+    print_progress,
+)
+from etl.categorize import Categorize
+from etl.clean_normalize import CleanNormalize
+from etl.config import PipelineConfig
+from etl.load_db import LoadDb
+from etl.parse import XmlSource
+from etl.pipeline import Pipeline, PipelineReport, Stage
+
+
+STAGE_NAMES = ("parse", "clean_normalize", "categorize", "load")
+
+
+def run_etl(
+    config: Optional[PipelineConfig] = None,
+    rebuild: bool = False,
+    until: str = "load",
+    progress: Optional[ProgressCallback] = None,
+    quarantine: Optional[bool] = None,
+) -> Optional[PipelineReport]:
+    """
+    Run parse -> clean_normalize -> categorize -> load over config.xml_path.
+
+    Loading into config.database_path is incremental, with the same ingest state as
+    api.db.initialize_database (so the two can be mixed): None is returned when the
+    XML hasn't changed since the last load. The run uses its own connection; the
+    API's DATABASE_PATH and connection pool are left alone. `until` stops after an
+    earlier stage, which writes nothing and always reads the whole file, e.g. to
+    time parsing and extraction on their own.
+
+    Like initialize_database, the run is reported as "momo.ingest" log events
+    (dsa/telemetry.py) with each stage's busy time, and `progress` is called with an
+    IngestProgress every few seconds.
+
+    With `quarantine` (default DEAD_LETTER_ENABLED) and `until` "load", bad messages
+    go to the dead-letter file as in initialize_database (see dsa/dead_letter.py).
+    """
+    config = config or PipelineConfig()
+    quarantine = DEAD_LETTER_ENABLED if quarantine is None else quarantine
+    if until not in STAGE_NAMES:
+        raise ValueError(f"until must be one of {', '.join(STAGE_NAMES)}")
+    load = until == "load"
+
+    # Before any reset: a wrong XML path must not cost the existing database
+    if not os.path.exists(config.xml_path):
+        log_event(
+            "ingest.error",
+            f"XML file '{config.xml_path}' not found. Did you check the path?",
+            level=logging.ERROR,
+            source=config.xml_path,
+            reason="file_not_found",
+        )
+        return None
+
+    if load and (rebuild or not db.database_exists(config.database_path)):
+        db.reset_database_file(config.database_path)
+    source_path = os.path.abspath(config.xml_path)
+    telemetry = IngestTelemetry("etl", source_path, progress)
+
+    plan = None
+    if load:
+        with telemetry.stage("plan"), closing(db.connect(config.database_path)) as conn:
+            db.ensure_table(conn)
+            plan = db.plan_ingest(conn, source_path)
+        if plan is None:
+            telemetry.finish("up_to_date")
+            return None
+
+    # Runs stopping early write nothing, dead letters included
+    dead_letter = DeadLetterWriter("etl", source_path, telemetry) if load and quarantine else None
+    source = XmlSource(
+        source_path, config.batch_size, plan.since_ms if plan else -1, telemetry, dead_letter
+    )
+    stages: List[Stage] = [
+        CleanNormalize(telemetry, dead_letter),
+        Categorize(telemetry=telemetry),
+    ]
+    if load:
+        loader = LoadDb(config.database_path, plan, source, telemetry, dead_letter)
+        stages.append(loader)
+    stages = stages[: STAGE_NAMES.index(until)]
+    try:
+        try:
+            report = Pipeline(source, stages, config.queue_size, config.threaded).run()
+        finally:
+            if dead_letter is not None:
+                dead_letter.close()
+    except BaseException as exc:
+        telemetry.finish("error", exc)
+        raise
+    # The source's parse time is already counted by the XmlSource itself
+    for stage_stats in report.stages[1:]:
+        telemetry.add_time(stage_stats.name, stage_stats.busy_seconds)
+    telemetry.finish()
+    if load:
+        report.inserted = loader.inserted
+    return report
+
+
+def print_report(report: PipelineReport) -> None:
+    summary = report.as_dict()
+    mode = "threaded" if report.threaded else "serial"
+    print(f"=== ETL Pipeline ({mode}) ===")
+    print(
+        f"{'stage':16} {'batches':>8} {'items':>9} {'busy s':>8} {'wait s':>8} "
+        f"{'items/s':>10} {'mean ms':>8} {'max ms':>8}"
+    )
+    for s in summary["stages"]:
+        rate = s["items_per_second"]
+        print(
+            f"{s['name']:16} {s['batches']:>8} {s['items_in']:>9} {s['busy_seconds']:>8.3f} "
+            f"{s['wait_seconds']:>8.3f} {rate if rate is not None else '-':>10} "
+            f"{s['mean_batch_ms'] if s['mean_batch_ms'] is not None else '-':>8} "
+            f"{s['max_batch_ms']:>8}"
+        )
+    print(
+        f"Total: {summary['items']} messages in {summary['seconds']}s "
+        f"({summary['items_per_second']} messages/s)"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    defaults = PipelineConfig()
+    parser = argparse.ArgumentParser(
+        description="Staged ETL: parse -> clean/normalize -> categorize -> load into SQLite"
+    )
+    parser.add_argument("--xml", default=defaults.xml_path, help="SMS backup to load")
+    parser.add_argument("--db", default=defaults.database_path, help="SQLite database file")
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+    parser.add_argument(
+        "--queue-size", type=int, default=defaults.queue_size, help="batches buffered per stage"
+    )
+    parser.add_argument(
+        "--serial",
+        action="store_true",
+        default=not defaults.threaded,
+        help="chain the stages in one thread instead of one thread per stage",
+    )
+    parser.add_argument(
+        "--until",
+        choices=STAGE_NAMES,
+        default="load",
+        help="stop after this stage (nothing is written unless it is load)",
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="delete the database and reload everything"
+    )
+    parser.add_argument("--json", action="store_true", help="print the stage report as JSON")
+    parser.add_argument(
+        "--progress", action="store_true", help="print messages/s every few seconds"
+    )
+    args = parser.parse_args(argv)
+
+    config = PipelineConfig(
+        xml_path=args.xml,
+        database_path=os.path.abspath(args.db),
+        batch_size=args.batch_size,
+        queue_size=args.queue_size,
+        threaded=not args.serial,
+    )
+    configure_ingest_logging()
+    report = run_etl(
+        config,
+        rebuild=args.rebuild,
+        until=args.until,
+        progress=print_progress if args.progress else None,
+    )
+    if report is None:
+        if os.path.exists(config.xml_path):
+            print(f"{config.database_path} is up to date with {config.xml_path}")
+        return
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+        return
+    print_report(report)
+    if report.inserted is not None:
+        print(f"Inserted {report.inserted} transactions into {config.database_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Async load generator for the API (asyncio + httpx).
+
+Sends a weighted mix of list/get/create/update/delete requests, either from a
+fixed number of concurrent clients (closed loop, --concurrency) or at a target
+request rate (open loop, --rps), and reports throughput and p50/p95/p99 latency
+per route. In --rps mode latency is measured from when a request was due, so a
+server that falls behind shows it instead of quietly slowing the test down.
+
+Targets:
+  (default)       the app in this process via httpx.ASGITransport (no network)
+  --uvicorn       the app under uvicorn in a child process, over real HTTP
+  --base-url URL  a server that is already running
+The first two use a fresh database in a temp directory unless --db is given.
+
+Examples:
+  python script/load_test.py --concurrency 20 --duration 10
+  python script/load_test.py --uvicorn --rps 200 --mix list=80,get=20 --json
+  python script/load_test.py --uvicorn --seed 100000 --duration 30 --output load.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+# Ensure project root on sys.path to import api.* and dsa.*
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from api import db
+from dsa.data_loader import iter_transactions_from_xml
+
+
+API_USER = os.getenv("API_USER", "admin")
+API_PASS = os.getenv("API_PASS", "secret")
+
+OPERATIONS = ("list", "get", "create", "update", "delete")
+ROUTES = {
+    "list": "GET /transactions",
+    "get": "GET /transactions/{id}",
+    "create": "POST /transactions",
+    "update": "PUT /transactions/{id}",
+    "delete": "DELETE /transactions/{id}",
+}
+DEFAULT_MIX = "list=50,get=35,create=5,update=5,delete=5"
+MAX_PAGE_SIZE = 1000  # api.app.MAX_PAGE_SIZE
+SEED_BATCH = 5000  # rows per POST /transactions/bulk (the endpoint takes up to 10,000)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """"list=50,get=35,..." -> weights per operation (operations left out get 0)."""
+    mix: Dict[str, float] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, sep, weight = item.partition("=")
+        name = name.strip()
+        if not sep or name not in OPERATIONS:
+            raise ValueError(f"Invalid mix entry {item!r}: use op=weight with op in {OPERATIONS}")
+        mix[name] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The mix needs at least one operation with a positive weight")
+    return mix
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def request_bodies(xml_path: str = db.RAW_XML_PATH) -> List[Dict[str, Any]]:
+    """POST /transactions bodies built from the repo's messages (without TxIds, so they can repeat)."""
+    bodies = []
+    for record in iter_transactions_from_xml(xml_path):
+        body = db.transform_item(record).model_dump(mode="json")
+        body["transaction_id"] = None
+        bodies.append(body)
+    if not bodies:
+        raise RuntimeError(f"No <sms> messages found in {xml_path}")
+    return bodies
+
+
+class RouteStats:
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    def add(self, status: Any, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self.statuses[str(status)] += 1
+        if not isinstance(status, int) or status >= 500:
+            self.errors += 1
+
+    def as_dict(self, elapsed: float) -> Dict[str, Any]:
+        ms = [s * 1000 for s in self.latencies]
+        return {
+            "requests": len(ms),
+            "errors": self.errors,
+            "status": dict(sorted(self.statuses.items())),
+            "throughput_rps": round(len(ms) / elapsed, 1) if elapsed else None,
+            "p50_ms": round(_percentile(ms, 50), 2),
+            "p95_ms": round(_percentile(ms, 95), 2),
+            "p99_ms": round(_percentile(ms, 99), 2),
+            "mean_ms": round(sum(ms) / len(ms), 2),
+            "max_ms": round(max(ms), 2),
+        }
+
+
+class LoadTest:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        mix: Dict[str, float],
+        bodies: List[Dict[str, Any]],
+        list_limit: int = 50,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.client = client
+        self.operations = list(mix)
+        self.weights = [mix[op] for op in self.operations]
+        self.bodies = bodies
+        self.list_limit = list_limit
+        self.rng = random.Random(seed)
+        self.ids: List[int] = []
+        self.stats: Dict[str, RouteStats] = {}
+        self.sent = 0
+
+    # -----------------------------
+    # Setup
+    # -----------------------------
+    async def load_ids(self) -> int:
+        """Every id in the table, paging with the cursor (get/update/delete pick from these)."""
+        ids: List[int] = []
+        cursor = 0
+        while True:
+            response = await self.client.get(
+                "/transactions",
+                params={"fields": "id", "limit": MAX_PAGE_SIZE, "cursor": cursor},
+            )
+            response.raise_for_status()
+            page = [row["id"] for row in response.json()]
+            ids.extend(page)
+            if len(page) < MAX_PAGE_SIZE:
+                break
+            cursor = page[-1]
+        self.ids = ids
+        return len(ids)
+
+    async def seed(self, rows: int) -> int:
+        """Bulk-create rows until the table holds at least `rows`; returns the number added."""
+        added = 0
+        copy = 0
+        while len(self.ids) < rows:
+            batch = []
+            for _ in range(min(SEED_BATCH, rows - len(self.ids))):
+                body = dict(self.bodies[copy % len(self.bodies)])
+                # Each pass over the templates lands a day later, spreading the dates out
+                days = copy // len(self.bodies)
+                body["sms_date"] = _shift_date(body["sms_date"], days)
+                batch.append(body)
+                copy += 1
+            response = await self.client.post("/transactions/bulk", json=batch)
+            response.raise_for_status()
+            new_ids = [item["id"] for item in response.json()["results"]]
+            self.ids.extend(new_ids)
+            added += len(new_ids)
+            print(f"Seeded {len(self.ids):,}/{rows:,} rows", file=sys.stderr)
+        return added
+
+    # -----------------------------
+    # Requests
+    # -----------------------------
+    def _random_id(self) -> int:
+        return self.rng.choice(self.ids) if self.ids else 1
+
+    def _take_id(self) -> int:
+        # Swap-remove, so deletes don't shift the whole list
+        if not self.ids:
+            return 1
+        i = self.rng.randrange(len(self.ids))
+        self.ids[i], self.ids[-1] = self.ids[-1], self.ids[i]
+        return self.ids.pop()
+
+    def _request(self, op: str) -> Tuple[str, str, Dict[str, Any]]:
+        if op == "list":
+            cursor = self._random_id() - 1
+            return "GET", "/transactions", {"params": {"limit": self.list_limit, "cursor": cursor}}
+        if op == "get":
+            return "GET", f"/transactions/{self._random_id()}", {}
+        if op == "create":
+            return "POST", "/transactions", {"json": self.rng.choice(self.bodies)}
+        if op == "update":
+            body = {"amount": self.rng.randrange(100, 100_000)}
+            return "PUT", f"/transactions/{self._random_id()}", {"json": body}
+        return "DELETE", f"/transactions/{self._take_id()}", {}
+
+    async def send(self, op: str, due: Optional[float] = None) -> None:
+        method, path, kwargs = self._request(op)
+        start = time.perf_counter() if due is None else due
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            status: Any = response.status_code
+            if op == "create" and status == 201:
+                self.ids.append(response.json()["id"])
+        except httpx.HTTPError as exc:
+            status = type(exc).__name__
+        elapsed = time.perf_counter() - start
+        self.stats.setdefault(ROUTES[op], RouteStats()).add(status, elapsed)
+
+    def _next_op(self) -> str:
+        return self.rng.choices(self.operations, self.weights)[0]
+
+    # -----------------------------
+    # Drivers
+    # -----------------------------
+    async def run_closed(self, concurrency: int, duration: float, total: Optional[int]) -> float:
+        """`concurrency` clients, each sending its next request as soon as the last returns."""
+        deadline = time.perf_counter() + duration
+
+        async def client_loop() -> None:
+            while time.perf_counter() < deadline and (total is None or self.sent < total):
+                self.sent += 1
+                await self.send(self._next_op())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+    async def run_open(
+        self, rps: float, max_in_flight: int, duration: float, total: Optional[int]
+    ) -> float:
+        """One request every 1/rps seconds, whatever the responses do (up to max_in_flight)."""
+        slots = asyncio.Semaphore(max_in_flight)
+        tasks = set()
+
+        async def fire(op: str, due: float) -> None:
+            try:
+                await self.send(op, due)
+            finally:
+                slots.release()
+
+        start = time.perf_counter()
+        while total is None or self.sent < total:
+            due = start + self.sent / rps
+            if due - start >= duration:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await slots.acquire()
+            self.sent += 1
+            task = asyncio.create_task(fire(self._next_op(), due))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        routes = {route: s.as_dict(elapsed) for route, s in sorted(self.stats.items())}
+        requests = sum(r["requests"] for r in routes.values())
+        return {
+            "duration_s": round(elapsed, 2),
+            "requests": requests,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "throughput_rps": round(requests / elapsed, 1) if elapsed else None,
+            "rows": len(self.ids),
+            "routes": routes,
+        }
+
+
+def _shift_date(value: str, days: int) -> str:
+    if not days:
+        return value
+    return (datetime.fromisoformat(value.replace("Z", "+00:00")) + timedelta(days=days)).isoformat()
+
+
+# -----------------------------
+# Targets
+# -----------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(port: int, database_path: str) -> None:
+    """Child process of --uvicorn: the app on `database_path`."""
+    import uvicorn
+
+    db.DATABASE_PATH = database_path
+    from api.app import app
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def _wait_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            if (await client.get("/transactions", params={"limit": 1})).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"The server wasn't ready after {timeout}s")
+
+
+@asynccontextmanager
+async def target(args: argparse.Namespace) -> AsyncIterator[Tuple[httpx.AsyncClient, str]]:
+    """An authenticated client for the chosen target, and a label for the report."""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    options: Dict[str, Any] = {"auth": (API_USER, API_PASS), "timeout": args.timeout}
+
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, **options) as client:
+            yield client, args.base_url
+        return
+
+    with tempfile.TemporaryDirectory(prefix="momo-load-") as tmp:
+        database_path = os.path.abspath(args.db or os.path.join(tmp, "db.sqlite3"))
+        if args.uvicorn:
+            port = _free_port()
+            server = subprocess.Popen(
+                [sys.executable, __file__, "--serve", str(port), database_path]
+            )
+            base_url = f"http://127.0.0.1:{port}"
+            try:
+                async with httpx.AsyncClient(base_url=base_url, limits=limits, **options) as client:
+                    await _wait_ready(client, server, args.startup_timeout)
+                    yield client, f"uvicorn {base_url} ({database_path})"
+            finally:
+                server.terminate()
+                server.wait()
+            return
+
+        db.DATABASE_PATH = database_path
+        from api.app import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://in-process", **options
+            ) as client:
+                yield client, f"in-process ({database_path})"
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    async with target(args) as (client, label):
+        test = LoadTest(client, mix, request_bodies(), args.list_limit, args.random_seed)
+        rows = await test.load_ids()
+        seeded = await test.seed(args.seed) if args.seed else 0
+        if args.rps:
+            elapsed = await test.run_open(
+                args.rps, args.concurrency, args.duration, args.requests
+            )
+        else:
+            elapsed = await test.run_closed(args.concurrency, args.duration, args.requests)
+        result = {
+            "target": label,
+            "mode": "rps" if args.rps else "concurrency",
+            "concurrency": args.concurrency,
+            "target_rps": args.rps,
+            "mix": mix,
+            "rows_at_start": rows + seeded,
+            "seeded_rows": seeded,
+            **test.report(elapsed),
+        }
+    return result
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print("=== API Load Test ===")
+    rate = f"{result['target_rps']} rps target" if result["target_rps"] else "closed loop"
+    print(
+        f"Target: {result['target']}, Concurrency: {result['concurrency']} ({rate}), "
+        f"Rows: {result['rows_at_start']:,}"
+    )
+    print(
+        f"{'route':26} {'requests':>9} {'errors':>7} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for route, r in result["routes"].items():
+        print(
+            f"{route:26} {r['requests']:>9} {r['errors']:>7} {r['throughput_rps']:>8} "
+            f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}"
+        )
+    print(
+        f"Total: {result['requests']} requests in {result['duration_s']}s "
+        f"({result['throughput_rps']} req/s), {result['errors']} errors"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load-test the API with a mix of list/get/create/update/delete requests"
+    )
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--base-url", help="test a running server instead of starting one")
+    where.add_argument(
+        "--uvicorn", action="store_true", help="start the app under uvicorn (default: in-process)"
+    )
+    parser.add_argument("--db", help="database file for the started app (default: a fresh temp file)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="clients, or max in flight with --rps"
+    )
+    parser.add_argument("--rps", type=float, help="send at this rate instead of closed loop")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--seed", type=int, help="bulk-create rows first until the table has N")
+    parser.add_argument("--list-limit", type=int, default=50, help="page size of list requests")
+    parser.add_argument("--random-seed", type=int, default=0, help="seed for the request mix")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout (s)")
+    parser.add_argument("--startup-timeout", type=float, default=300.0, help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--serve", nargs=2, metavar=("PORT", "DB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(int(args.serve[0]), args.serve[1])
+        return
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Load data/raw/momo.xml into data/db.sqlite3 through the staged ETL pipeline.
+# Extra arguments go to etl/run.py, e.g. --rebuild, --serial, --batch-size 2000, --json
+cd "$(dirname "$0")/.."
+python -m etl.run "$@"
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Loads run by the tests (API startup included) must not quarantine or log into data/logs
+os.environ.setdefault("DEAD_LETTER_ENABLED", "0")
+os.environ.setdefault("INGEST_LOG_PATH", os.path.join(tempfile.mkdtemp(), "etl.log"))
+
+SAMPLE_XML = """<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<smses count="3">
+<sms protocol="0" address="M-Money" date="1715351458724" type="1" body="You have received 2000 RWF from Jane Smith (*********013) on your mobile money account at 2024-05-10 16:30:51. Message from sender: . Your new balance:2000 RWF. Financial Transaction Id: 76662021700." readable_date="10 May 2024 4:30:58 PM" contact_name="(Unknown)"/>
+<sms protocol="0" address="M-Money" date="1715351506754" type="1" body="TxId: 73214484437. Your payment of 1,000 RWF to Jane Smith 12845 has been completed at 2024-05-10 16:31:39. Your new balance: 1,000 RWF. Fee was 0 RWF." readable_date="10 May 2024 4:31:46 PM" contact_name="(Unknown)"/>
+<sms protocol="0" address="M-Money" date="1715369560245" type="1" body="<#> Dear Customer, your one-time password is :2476." readable_date="10 May 2024 9:32:40 PM" contact_name="(Unknown)"/>
+</smses>
+"""
+
+
+@pytest.fixture
+def sample_xml(tmp_path):
+    """Path of a three-message SMS backup (money_in, payment, OTP) under tmp_path."""
+    path = tmp_path / "sample.xml"
+    path.write_text(SAMPLE_XML, encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """api.db pointed at an empty database file under tmp_path."""
+    from api import db
+
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "test.sqlite3"))
+    yield db
+    db.close_pool()
+
+
+@pytest.fixture
+def client(temp_db):
+    """A TestClient for api.app, authenticated, on the temp_db database (startup load included)."""
+    from fastapi.testclient import TestClient
+
+    from api.app import app, response_cache
+
+    response_cache.invalidate()
+    with TestClient(app) as test_client:
+        test_client.auth = ("admin", "secret")
+        yield test_client
+
+
+@pytest.fixture
+def transaction_body():
+    """Factory for POST /transactions bodies; only the fields a test cares about vary."""
+
+    def make(transaction_id=None, amount=1000, sms_date="2024-06-01T10:00:00", **fields):
+        body = {
+            "sms_address": "M-Money",
+            "sms_date": sms_date,
+            "sms_type": "1",
+            "sms_body": f"Payment {transaction_id}",
+            "transaction_type": "payment",
+            "amount": amount,
+            "transaction_id": transaction_id,
+            "message": f"Payment {transaction_id}",
+            "raw_json": {},
+        }
+        body.update(fields)
+        return body
+
+    return make
@@ -0,0 +1,87 @@
+from contextlib import closing
+
+
+def _row_count(db):
+    with closing(db.get_connection()) as conn:
+        return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+
+def test_bulk_create_reports_conflicts_per_item(client, transaction_body):
+    existing = client.post("/transactions", json=transaction_body("BULK-EXISTING"))
+    assert existing.status_code == 201, existing.text
+    existing_id = existing.json()["id"]
+
+    response = client.post(
+        "/transactions/bulk",
+        json=[
+            transaction_body("BULK-1"),
+            transaction_body("BULK-EXISTING"),
+            transaction_body("BULK-2"),
+            transaction_body("BULK-1"),
+        ],
+    )
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert body["processed"] == 4
+    assert body["succeeded"] == 2
+    results = body["results"]
+    assert [r["status"] for r in results] == ["created", "conflict", "created", "conflict"]
+    assert results[1]["id"] == existing_id
+    assert results[2]["id"] == results[0]["id"] + 1
+    assert results[3]["id"] == results[0]["id"]
+
+    assert client.get(f"/transactions/{results[0]['id']}").json()["transaction_id"] == "BULK-1"
+    assert client.get(f"/transactions/{results[2]['id']}").json()["transaction_id"] == "BULK-2"
+
+
+def test_bulk_create_all_conflicts_writes_nothing(client, temp_db, transaction_body):
+    first = client.post("/transactions/bulk", json=[transaction_body("BULK-ONLY")])
+    first_id = first.json()["results"][0]["id"]
+    total = _row_count(temp_db)
+
+    again = client.post("/transactions/bulk", json=[transaction_body("BULK-ONLY")])
+    assert again.status_code == 201
+    assert again.json()["succeeded"] == 0
+    assert again.json()["results"] == [{"index": 0, "id": first_id, "status": "conflict"}]
+    assert _row_count(temp_db) == total
+
+
+def test_bulk_create_rejects_the_whole_batch_on_invalid_items(client, temp_db, transaction_body):
+    total = _row_count(temp_db)
+    bad = transaction_body("BULK-BAD")
+    del bad["amount"]
+    response = client.post("/transactions/bulk", json=[transaction_body("BULK-GOOD"), bad])
+    assert response.status_code == 422
+    assert _row_count(temp_db) == total
+
+
+def test_bulk_update_is_all_or_nothing(client, transaction_body):
+    ids = [
+        r["id"]
+        for r in client.post(
+            "/transactions/bulk",
+            json=[transaction_body("UPD-A", 100), transaction_body("UPD-B", 200)],
+        ).json()["results"]
+    ]
+    response = client.patch(
+        "/transactions/bulk",
+        json=[{"id": ids[0], "amount": 999}, {"id": ids[1], "transaction_id": "UPD-A"}],
+    )
+    assert response.status_code == 409
+    assert client.get(f"/transactions/{ids[0]}").json()["amount"] == 100
+
+
+def test_bulk_update_and_delete_report_unknown_ids(client, transaction_body):
+    row_id = client.post("/transactions", json=transaction_body("UPD-C", 100)).json()["id"]
+
+    updated = client.patch(
+        "/transactions/bulk", json=[{"id": row_id, "amount": 150}, {"id": 10**9, "amount": 1}]
+    )
+    assert updated.status_code == 200, updated.text
+    assert [r["status"] for r in updated.json()["results"]] == ["updated", "not_found"]
+    assert client.get(f"/transactions/{row_id}").json()["amount"] == 150
+
+    deleted = client.request("DELETE", "/transactions/bulk", json=[row_id, 10**9])
+    assert deleted.status_code == 200, deleted.text
+    assert [r["status"] for r in deleted.json()["results"]] == ["deleted", "not_found"]
+    assert client.get(f"/transactions/{row_id}").status_code == 404
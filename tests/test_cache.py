@@ -0,0 +1,109 @@
+import pytest
+
+from api.cache import ResponseCache, etag_matches, make_etag
+
+
+def test_make_etag_is_strong_and_stable():
+    assert make_etag(b"abc") == make_etag(b"abc")
+    assert make_etag(b"abc") != make_etag(b"abd")
+    assert make_etag(b"abc").startswith('"') and make_etag(b"abc").endswith('"')
+
+
+def test_etag_matches():
+    etag = make_etag(b"body")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, key.encode(), {}, cache.version)
+    assert cache.get("a") is not None  # "b" is now the oldest
+    cache.put("c", b"c", {}, cache.version)
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_drops_entries_and_stale_puts():
+    cache = ResponseCache()
+    version = cache.version
+    cache.put("a", b"a", {}, version)
+    cache.invalidate()
+    assert cache.get("a") is None
+    # Built before the write: not stored
+    cache.put("b", b"b", {}, version)
+    assert cache.get("b") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    cache = ResponseCache(ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr("api.cache.time.monotonic", lambda: now[0])
+    cache.put("a", b"a", {}, cache.version)
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(max_entries=0)
+    entry = cache.put("a", b"a", {}, cache.version)
+    assert entry.etag == make_etag(b"a")
+    assert cache.get("a") is None
+
+
+# -----------------------------
+# Through the API
+# -----------------------------
+@pytest.fixture
+def cached_client(client, monkeypatch):
+    from api.app import response_cache
+
+    monkeypatch.setattr(response_cache, "max_entries", 16)
+    monkeypatch.setattr(response_cache, "ttl", 60.0)
+    return client
+
+
+def test_get_is_served_from_cache_with_etag(cached_client):
+    first = cached_client.get("/transactions", params={"limit": 5})
+    second = cached_client.get("/transactions", params={"limit": 5})
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+    assert first.headers["ETag"] == second.headers["ETag"]
+
+    not_modified = cached_client.get(
+        "/transactions", params={"limit": 5}, headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+def test_writes_invalidate_cached_responses(cached_client, transaction_body):
+    created = cached_client.post("/transactions", json=transaction_body("CACHE-1", 100))
+    row_id = created.json()["id"]
+    url = f"/transactions/{row_id}"
+    before = cached_client.get(url)
+    assert cached_client.get(url).headers["X-Cache"] == "HIT"
+
+    writes = [
+        lambda: cached_client.put(url, json={"amount": 200}),
+        lambda: cached_client.put("/transactions/by-txid/CACHE-1", json=transaction_body(None, 300)),
+        lambda: cached_client.patch("/transactions/bulk", json=[{"id": row_id, "amount": 400}]),
+    ]
+    etag = before.headers["ETag"]
+    for write in writes:
+        assert write().status_code in (200, 201)
+        after = cached_client.get(url)
+        assert after.headers["X-Cache"] == "MISS"
+        assert after.headers["ETag"] != etag
+        # The old validator no longer matches
+        assert cached_client.get(url, headers={"If-None-Match": etag}).status_code == 200
+        etag = after.headers["ETag"]
+
+    cached_client.delete(url)
+    assert cached_client.get(url).status_code == 404
@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import sys
+from contextlib import closing
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from dsa.categorizer import Categorizer, KeywordMatcher, load_rules, required_literal
+from dsa.data_loader import build_transaction, get_transaction_type, iter_sms_attributes
+from etl.categorize import Categorize
+
+
+RAW_XML_PATH = os.path.join(PROJECT_ROOT, "data", "raw", "momo.xml")
+
+
+def test_keyword_matcher_finds_overlapping_keywords():
+    matcher = KeywordMatcher(["he", "she", "his", "hers"])
+    assert matcher.find("ushers") == {0, 1, 3}
+    assert matcher.find("this") == {2}
+    assert matcher.find("nothing") == set()
+    assert KeywordMatcher([]).find("anything") == set()
+
+
+def test_defaults_agree_with_legacy_types_on_repo_xml():
+    categorizer = Categorizer()
+    unknown = 0
+    for sms in iter_sms_attributes(RAW_XML_PATH):
+        body = sms.get("body", "")
+        legacy = get_transaction_type(body)
+        if legacy != "unknown":
+            assert categorizer.classify(body) == legacy, body
+        elif categorizer.classify(body) == "unknown":
+            unknown += 1
+    assert unknown == 0
+
+
+def test_first_listed_rule_wins_wherever_it_matches():
+    categorizer = Categorizer(
+        [
+            {"type": "refund", "regex": r"refund of \d+ RWF"},
+            {"type": "payment", "keyword": "Your payment of"},
+            {"type": "fee", "keyword": "Fee was"},
+        ]
+    )
+    assert categorizer.classify("Fee was 5 RWF. Your payment of 10 RWF") == "payment"
+    assert categorizer.classify("Your payment of 10 RWF, refund of 10 RWF") == "refund"
+    # The regex's literal is there, the regex itself doesn't match
+    assert categorizer.classify("Your payment of 10 RWF, refund of ten RWF") == "payment"
+    assert categorizer.classify("") == "unknown"
+
+
+def test_regex_without_literal_is_still_checked():
+    categorizer = Categorizer(
+        [{"type": "otp", "regex": r"(?i)one-time password"}, {"type": "other", "keyword": "code"}]
+    )
+    assert required_literal(r"(?i)one-time password") is None
+    assert categorizer.classify("Your One-Time Password code") == "otp"
+    assert categorizer.classify("Your code") == "other"
+
+
+def test_hundreds_of_rules():
+    rules = [{"type": f"kw{i}", "keyword": f"marker {i:03d};"} for i in range(300)]
+    rules += [{"type": f"re{i}", "regex": rf"ref {i:03d}-\d+"} for i in range(300)]
+    categorizer = Categorizer(rules)
+    assert categorizer.classify("x marker 250; ref 007-12") == "kw250"
+    assert categorizer.classify("ref 007-12 and ref 006-1") == "re6"
+    assert categorizer.classify("marker 25; ref 7-12") == "unknown"
+
+
+def test_build_transaction_uses_the_shared_rules():
+    # Every loader (initialize_database, the API startup load, the ETL) goes through it
+    deposit = {"date": "0", "body": "A bank deposit of 5,000 RWF has been added"}
+    record = build_transaction(1, deposit)
+    assert record["type"] == "deposit"
+    otp = build_transaction(2, {"date": "0", "body": "<#> your one-time password is :2476."})
+    assert otp["type"] == "otp"
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        Categorizer([{"type": "x"}])
+    with pytest.raises(ValueError):
+        Categorizer([{"type": "x", "keyword": "a", "regex": "b"}])
+    with pytest.raises(ValueError):
+        Categorizer([{"type": "x", "regex": "("}])
+
+
+def test_rules_from_json_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([{"type": "airtime", "keyword": "Umaze kugura"}]))
+    stage = Categorize(Categorizer(load_rules(str(path))))
+    records = stage.process([{"raw_body": "Yello!Umaze kugura 500FRW", "type": "unknown"}])
+    assert records[0] == {"raw_body": "Yello!Umaze kugura 500FRW", "type": "airtime"}
+
+
+def test_default_stage_keeps_the_loader_types():
+    records = [{"raw_body": "You have received 10 RWF", "type": "money_in"}]
+    assert Categorize().process([dict(r) for r in records]) == records
+
+
+@pytest.mark.parametrize(
+    "amount, band",
+    [
+        (None, "Low Value"),
+        (-500, "Low Value"),
+        (0, "Low Value"),
+        (9999, "Low Value"),
+        (9999.99, "Low Value"),
+        (10000, "Medium Value"),
+        (49999, "Medium Value"),
+        (50000, "High Value"),
+        (10**9, "High Value"),
+    ],
+)
+def test_value_band_boundaries(amount, band):
+    categorizer = Categorizer()
+    assert categorizer.value_band(amount) == band
+    with closing(sqlite3.connect(":memory:")) as conn:
+        sql = f"SELECT {categorizer.value_band_sql('amount')} FROM (SELECT ? AS amount)"
+        assert conn.execute(sql, (amount or 0,)).fetchone()[0] == band
+
+
+def test_value_bands_from_settings():
+    categorizer = Categorizer(value_bands=[(100, "Mid"), (1000, "Top"), (0, "Bottom's")])
+    assert [categorizer.value_band(a) for a in (99, 100, 999, 1000)] == [
+        "Bottom's", "Mid", "Mid", "Top",
+    ]
+    assert Categorizer(value_bands=[(0, "Any")]).value_band_sql("amount") == "'Any'"
+    with pytest.raises(ValueError):
+        Categorizer(value_bands=[])
+    with pytest.raises(ValueError):
+        Categorizer(value_bands=[(float("inf"), "Never")])
+
+
+def test_value_band_column_follows_amount_and_settings(temp_db, monkeypatch):
+    temp_db.ensure_table()
+    with closing(temp_db.get_connection()) as conn, conn:
+        conn.executemany(
+            "INSERT INTO transactions (sms_address, sms_date, sms_type, sms_body, "
+            "transaction_type, amount, currency, message, raw_json) "
+            "VALUES ('M-Money', '2024-06-01', '1', 'x', 'payment', ?, 'RWF', 'x', '{}')",
+            [(9999,), (10000,), (50000,)],
+        )
+    query = "SELECT value_band FROM transactions ORDER BY id"
+    with closing(temp_db.get_connection()) as conn:
+        assert [r[0] for r in conn.execute(query)] == ["Low Value", "Medium Value", "High Value"]
+
+    # New thresholds: ensure_table re-creates the column with them
+    bands = [(0, "Low"), (10000, "High")]
+    monkeypatch.setattr(temp_db, "default_categorizer", lambda: Categorizer(value_bands=bands))
+    temp_db.ensure_table()
+    temp_db.ensure_table()
+    with closing(temp_db.get_connection()) as conn:
+        assert [r[0] for r in conn.execute(query)] == ["Low", "High", "High"]
+
+
+def test_api_returns_the_value_band(client, transaction_body):
+    created = client.post("/transactions", json=transaction_body("BAND1", amount=50000)).json()
+    assert created["value_band"] == "High Value"
+    # Ignored on writes: it always follows the amount
+    updated = client.put(
+        f"/transactions/{created['id']}",
+        json={"amount": 9999, "value_band": "High Value"},
+    ).json()
+    assert updated["value_band"] == "Low Value"
+    listed = client.get(f"/transactions?cursor={created['id'] - 1}&fields=amount,value_band")
+    assert listed.json() == [{"id": created["id"], "amount": 9999, "value_band": "Low Value"}]
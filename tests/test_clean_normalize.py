@@ -0,0 +1,124 @@
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from dsa.categorizer import default_categorizer
+from dsa.data_loader import (
+    build_transaction,
+    clean_amount,
+    extract_tx_id,
+    get_transaction_type,
+    iter_sms_attributes,
+)
+from dsa.dead_letter import DeadLetterWriter, pending_entries
+from dsa.sms_extractor import _match_template, _scan_fields, extract_sms_fields
+from dsa.telemetry import IngestTelemetry
+from etl.clean_normalize import CleanNormalize
+
+
+RAW_XML_PATH = os.path.join(PROJECT_ROOT, "data", "raw", "momo.xml")
+
+
+def repo_bodies():
+    return [sms.get("body", "") for sms in iter_sms_attributes(RAW_XML_PATH)]
+
+
+def test_extractor_matches_legacy_helpers_on_repo_xml():
+    for body in repo_bodies():
+        fields = extract_sms_fields(body)
+        assert fields.amount == clean_amount(body), body
+        assert fields.tx_id == extract_tx_id(body), body
+        assert fields.type == default_categorizer().classify(body), body
+        # The shared rules extend the legacy phrases, they never overrule them
+        if get_transaction_type(body) != "unknown":
+            assert fields.type == get_transaction_type(body), body
+
+
+def test_templates_agree_with_field_scan():
+    matched = 0
+    for body in repo_bodies():
+        template = _match_template(body)
+        if template is None:
+            continue
+        matched += 1
+        scanned = _scan_fields(body)
+        assert template.get("counterparty") == scanned["counterparty"], body
+        assert template["occurred_at"] == scanned["occurred_at"], body
+        assert template["balance"] == scanned["balance"], body
+    assert matched > 0
+
+
+def test_transfer_fields():
+    body = (
+        "*165*S*2,500 RWF transferred to Jane Smith (250791666666) from 36521838 at "
+        "2024-05-14 09:27:40 . Fee was: 100 RWF. New balance: 1480 RWF. Kanda *182*2*1# .*EN#"
+    )
+    fields = extract_sms_fields(body)
+    assert fields.amount == 2500.0
+    assert fields.fee == 100.0
+    assert fields.balance == 1480.0
+    assert fields.counterparty == "Jane Smith"
+    assert fields.occurred_at == "2024-05-14 09:27:40"
+    assert fields.tx_id == "N/A"
+
+
+def test_fallback_scan_for_unknown_layout():
+    body = (
+        "*143*S*Your transaction to Mediatrice UWAYISENGA (250788658286) with 3000 RWF "
+        "has been reversed at 2024-10-07 14:37:00. Your new balance is 10312 RWF."
+    )
+    fields = extract_sms_fields(body)
+    assert fields.amount == 3000.0
+    assert fields.counterparty == "Mediatrice UWAYISENGA"
+    assert fields.occurred_at == "2024-10-07 14:37:00"
+    assert fields.type == "reversal"
+
+
+def test_empty_body():
+    fields = extract_sms_fields("")
+    assert fields.amount == 0.0
+    assert fields.tx_id == "N/A"
+    assert fields.type == "unknown"
+
+
+def sample_batch(sample_xml):
+    return list(enumerate(iter_sms_attributes(sample_xml), start=1))
+
+
+def test_clean_normalize_builds_loader_records(sample_xml):
+    records = CleanNormalize().process(sample_batch(sample_xml))
+
+    assert records == [build_transaction(row_id, sms) for row_id, sms in sample_batch(sample_xml)]
+    assert [r["tx_id"] for r in records] == ["76662021700", "73214484437", "N/A"]
+    assert records[1]["amount"] == 1000.0
+
+
+def test_clean_normalize_counts_parsed_and_missing_tx_id(sample_xml):
+    telemetry = IngestTelemetry("test", sample_xml)
+    stage = CleanNormalize(telemetry)
+    stage.process(sample_batch(sample_xml))
+    stage.process([])
+
+    assert telemetry.counters["messages_parsed"] == 3
+    assert telemetry.counters["missing_tx_id"] == 1
+
+
+def test_clean_normalize_quarantines_bad_messages(sample_xml, tmp_path):
+    batch = sample_batch(sample_xml)
+    batch[0][1]["body"] = batch[0][1]["body"].replace("Financial Transaction Id: 76662021700.", "")
+    batch[1][1]["date"] = "yesterday"
+    telemetry = IngestTelemetry("test", sample_xml)
+    directory = str(tmp_path / "dead_letter")
+
+    with DeadLetterWriter("test", sample_xml, telemetry, directory) as dead_letter:
+        records = CleanNormalize(telemetry, dead_letter).process(batch)
+    assert [r["id"] for r in records] == [3]
+    assert dead_letter.counts == {"missing_tx_id": 1, "bad_date": 1}
+    assert [(e["row_id"], e["reason"]) for e in pending_entries(directory)] == [
+        (1, "missing_tx_id"),
+        (2, "bad_date"),
+    ]
+    assert telemetry.counters["messages_parsed"] == 3
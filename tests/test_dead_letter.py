@@ -0,0 +1,60 @@
+from conftest import SAMPLE_XML
+from dsa.data_loader import iter_transactions_from_xml
+from dsa.dead_letter import (
+    DeadLetterWriter,
+    mark_replayed,
+    pending_entries,
+    read_quarantine,
+    xml_error_key,
+)
+from dsa.telemetry import IngestTelemetry
+from etl.parse import XmlSource
+
+
+def test_bad_messages_are_quarantined(tmp_path):
+    bad_date = SAMPLE_XML.replace('date="1715351506754"', 'date="yesterday"')
+    no_tx_id = bad_date.replace("Financial Transaction Id: 76662021700.", "")
+    path = tmp_path / "bad.xml"
+    path.write_text(no_tx_id, encoding="utf-8")
+    path = str(path)
+    directory = str(tmp_path / "dead_letter")
+
+    telemetry = IngestTelemetry("test", path)
+    with DeadLetterWriter("test", path, telemetry, directory, batch_size=1) as dead_letter:
+        records = list(iter_transactions_from_xml(path, telemetry, dead_letter))
+    assert [r["id"] for r in records] == [3]
+    # The OTP's unescaped "<#>" is recovered from, and reported (with no message to replay)
+    assert dead_letter.counts == {"missing_tx_id": 1, "bad_date": 1, "xml_error": 1}
+    assert telemetry.counters["quarantined"] == 3
+
+    pending = pending_entries(directory)
+    assert [(e["row_id"], e["reason"]) for e in pending] == [(1, "missing_tx_id"), (2, "bad_date")]
+    assert pending[1]["sms"]["date"] == "yesterday"
+
+    # Quarantining the same messages again doesn't make them pending twice, and the
+    # XML error isn't reported again
+    with DeadLetterWriter("test", path, directory=directory) as dead_letter:
+        list(iter_transactions_from_xml(path, None, dead_letter))
+    assert dead_letter.counts == {"missing_tx_id": 1, "bad_date": 1}
+    assert len(pending_entries(directory)) == 2
+
+    mark_replayed([(pending[0], "inserted")], directory)
+    assert [e["reason"] for e in pending_entries(directory)] == ["bad_date"]
+    assert [e["reason"] for e in pending_entries(directory, ["missing_tx_id"])] == []
+
+
+def test_xml_errors_are_reported_once_across_runs(sample_xml, tmp_path):
+    directory = str(tmp_path / "dead_letter")
+    for since_ms in (-1, 1715369560245):
+        # The second run is incremental: every message is below the high-water mark
+        telemetry = IngestTelemetry("test", sample_xml)
+        with DeadLetterWriter("test", sample_xml, telemetry, directory) as dead_letter:
+            source = XmlSource(sample_xml, since_ms=since_ms, dead_letter=dead_letter)
+            list(source.batches())
+        assert dead_letter.counts == ({"xml_error": 1} if since_ms < 0 else {})
+        assert telemetry.counters["quarantined"] == (1 if since_ms < 0 else 0)
+
+    entries = list(read_quarantine(directory))
+    assert [e["reason"] for e in entries] == ["xml_error"]
+    assert entries[0]["key"] == xml_error_key(sample_xml, entries[0]["detail"])
+    assert pending_entries(directory) == []
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+from starlette.responses import JSONResponse
+
+from api import app as app_module
+from api import fast_json
+
+
+def test_stdlib_fallback_matches_json_response(monkeypatch):
+    content = {"amount": 1.5e20, "name": "Jane Smith ✓", "raw_json": {"fee": 0.1}, "none": None}
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert fast_json.dumps(content) == JSONResponse(content).body
+    assert fast_json.loads(fast_json.dumps(content)) == content
+
+
+@pytest.mark.parametrize("encoder", ["json", "orjson"])
+@pytest.mark.parametrize("endpoint", ["get", "list", "search"])
+def test_fast_path_returns_the_model_json(
+    client, transaction_body, monkeypatch, endpoint, encoder
+):
+    if encoder == "json":
+        monkeypatch.setattr(fast_json, "orjson", None)
+    elif fast_json.orjson is None:
+        pytest.skip("orjson is not installed")
+    body = transaction_body("FAST1", sms_body="Fast path check", raw_json={"big": 1.5e20})
+    new_id = client.post("/transactions", json=body).json()["id"]
+    url = {
+        "get": f"/transactions/{new_id}",
+        "list": f"/transactions?cursor={new_id - 1}",
+        "search": "/transactions/search?q=fast",
+    }[endpoint]
+
+    responses = {}
+    for fast in (False, True):
+        app_module.response_cache.invalidate()
+        monkeypatch.setattr(app_module, "FAST_JSON_ENDPOINTS", {endpoint} if fast else set())
+        responses[fast] = client.get(url)
+        assert responses[fast].status_code == 200
+
+    model, fast = responses[False], responses[True]
+    assert json.loads(fast.content) == json.loads(model.content)
+    assert b"path check" in fast.content
+    if encoder == "json":
+        assert fast.content == model.content
+        assert fast.headers["etag"] == model.headers["etag"]
+    elif endpoint != "search":  # search hits carry no raw_json
+        # orjson writes 1.5e20, the model path 1.5e+20: same JSON, different bytes
+        assert b'"big":1.5e20' in fast.content
+        assert b'"big":1.5e+20' in model.content
@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+    render_stats,
+    statement_labels,
+)
+
+
+def test_histogram_buckets_are_inclusive_and_cumulative():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 7):
+        histogram.observe(value)
+    assert list(histogram.lines("m", 'a="b"')) == [
+        'm_bucket{a="b",le="1"} 2',
+        'm_bucket{a="b",le="5"} 3',
+        'm_bucket{a="b",le="+Inf"} 4',
+        'm_sum{a="b"} 11.5',
+        'm_count{a="b"} 4',
+    ]
+
+
+def test_statement_labels():
+    assert statement_labels("SELECT * FROM transactions WHERE id = ?") == ("SELECT", "transactions")
+    assert statement_labels("insert into daily_rollups VALUES (?)") == ("INSERT", "daily_rollups")
+    assert statement_labels("CREATE INDEX IF NOT EXISTS idx_x ON t (x)") == ("CREATE", "idx_x")
+    assert statement_labels("PRAGMA journal_mode") == ("PRAGMA", "")
+
+
+def test_render_stats():
+    text = render_stats("pool", {"hits": 3, "size": 8, "closed": True, "path": "x"}, ["hits"])
+    assert "# TYPE pool_hits_total counter\npool_hits_total 3" in text
+    assert "# TYPE pool_size gauge\npool_size 8" in text
+    assert "pool_closed 1" in text
+    assert "pool_path" not in text
+
+
+@pytest.fixture
+def conn():
+    registry = MetricsRegistry()
+    raw = sqlite3.connect(":memory:")
+    conn = registry.instrument(raw)
+    conn.execute("CREATE TABLE t (x INTEGER)").close()
+    yield conn, registry
+    raw.close()
+
+
+def test_instrumented_queries_record_rows_once_finished(conn):
+    conn, registry = conn
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(3)]).close()
+    assert [row[0] for row in conn.execute("SELECT x FROM t ORDER BY x")] == [0, 1, 2]
+    assert conn.execute("SELECT x FROM t WHERE x > 0").fetchall() == [(1,), (2,)]
+
+    text = registry.render()
+    assert 'sqlite_query_rows_sum{operation="INSERT",table="t"} 3' in text
+    assert 'sqlite_query_rows_count{operation="SELECT",table="t"} 2' in text
+    assert 'sqlite_query_rows_sum{operation="SELECT",table="t"} 5' in text
+
+
+def test_instrumented_errors_are_counted(conn):
+    conn, registry = conn
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("SELECT * FROM missing")
+    assert 'sqlite_query_errors_total{operation="SELECT",table="missing"} 1' in registry.render()
+
+
+def test_instrumented_connection_keeps_transactions(conn):
+    conn, _ = conn
+    with pytest.raises(RuntimeError):
+        with conn:
+            conn.execute("INSERT INTO t VALUES (1)").close()
+            raise RuntimeError
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_middleware_labels_requests_by_route_template():
+    registry = MetricsRegistry()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nowhere")
+
+    text = registry.render()
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in text
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert 'http_response_size_bytes_sum{method="GET",route="/items/{item_id}"} 16' in text
+
+
+def test_metrics_endpoint(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "api_metrics_enabled " in response.text
+    assert "sqlite_pool_" in response.text
@@ -0,0 +1,77 @@
+from lxml import etree as ET
+
+from conftest import SAMPLE_XML
+from dsa.data_loader import (
+    iter_sms_attributes,
+    iter_transactions_from_xml,
+    load_data_from_xml,
+    load_store_from_xml,
+)
+
+
+def test_iter_transactions_yields_records_in_order(sample_xml):
+    records = list(iter_transactions_from_xml(sample_xml))
+
+    assert [r["id"] for r in records] == [1, 2, 3]
+    assert records[0]["type"] == "money_in"
+    assert records[0]["tx_id"] == "76662021700"
+    assert records[0]["amount"] == 2000.0
+    assert records[1]["type"] == "payment"
+    assert records[1]["tx_id"] == "73214484437"
+    assert records[1]["timestamp_ms"] == 1715351506754
+    assert records[2]["type"] == "otp"
+
+
+def test_iter_transactions_is_lazy(sample_xml):
+    stream = iter_transactions_from_xml(sample_xml)
+    first = next(stream)
+    assert first["id"] == 1
+    stream.close()
+
+
+def test_iter_matches_list_loader(sample_xml):
+    assert list(iter_transactions_from_xml(sample_xml)) == load_data_from_xml(sample_xml)
+
+
+def test_recovers_from_truncated_xml(tmp_path):
+    path = tmp_path / "truncated.xml"
+    path.write_text(SAMPLE_XML[: SAMPLE_XML.index("<sms", SAMPLE_XML.index("TxId"))])
+    records = list(iter_transactions_from_xml(str(path)))
+    assert [r["id"] for r in records] == [1, 2]
+
+
+def test_missing_file_returns_empty_list(tmp_path):
+    assert load_data_from_xml(str(tmp_path / "missing.xml")) == []
+
+
+def test_store_rows_match_list_loader(sample_xml):
+    records = load_data_from_xml(sample_xml)
+    store = load_store_from_xml(sample_xml)
+
+    assert len(store) == len(records)
+    assert list(store) == records
+    assert store[-1] == records[-1]
+    assert store[1:] == records[1:]
+    assert sum(store.column("amount")) == sum(r["amount"] for r in records)
+
+
+def test_store_missing_file_is_empty(tmp_path):
+    assert len(load_store_from_xml(str(tmp_path / "missing.xml"))) == 0
+
+
+def test_only_top_level_sms_elements_are_read(tmp_path):
+    nested = SAMPLE_XML.replace(
+        '<sms protocol="0" address="M-Money" date="1715351506754"',
+        '<backup><sms address="nested" date="1" body="x"/></backup>\n'
+        '<sms protocol="0" address="M-Money" date="1715351506754"',
+    )
+    nested = nested.replace(
+        'contact_name="(Unknown)"/>\n</smses>',
+        'contact_name="(Unknown)"><sms address="inner"/></sms>\n</smses>',
+    )
+    path = tmp_path / "nested.xml"
+    path.write_text(nested, encoding="utf-8")
+    root = ET.parse(str(path), ET.XMLParser(recover=True)).getroot()
+
+    assert list(iter_sms_attributes(str(path))) == [dict(e.attrib) for e in root.findall("sms")]
+    assert len(list(iter_sms_attributes(str(path)))) == 3
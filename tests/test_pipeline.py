@@ -0,0 +1,134 @@
+import sqlite3
+from contextlib import closing
+
+from api import db
+from dsa.data_loader import load_data_from_xml
+from etl.categorize import Categorize
+from etl.clean_normalize import CleanNormalize
+from etl.config import PipelineConfig
+from etl.parse import XmlSource
+from etl.pipeline import Pipeline, Stage
+from etl.run import run_etl
+
+
+class Collect(Stage):
+    name = "collect"
+
+    def __init__(self):
+        self.records = []
+
+    def process(self, batch):
+        self.records.extend(batch)
+        return batch
+
+
+def test_pipeline_matches_list_loader(sample_xml):
+    for threaded in (True, False):
+        sink = Collect()
+        stages = [CleanNormalize(), Categorize(), sink]
+        report = Pipeline(XmlSource(sample_xml, batch_size=2), stages, 1, threaded).run()
+
+        assert sink.records == load_data_from_xml(sample_xml)
+        assert [s.items_in for s in report.stages] == [3, 3, 3, 3]
+        assert report.stages[0].batches == 2
+
+
+def test_pipeline_skips_messages_below_high_water(sample_xml):
+    source = XmlSource(sample_xml, since_ms=1715351458724)
+    sink = Collect()
+    Pipeline(source, [CleanNormalize(), sink], threaded=False).run()
+
+    assert [r["id"] for r in sink.records] == [2, 3]
+    assert source.high_water_ms == 1715369560245
+
+
+def test_pipeline_closes_stages_and_reraises(sample_xml):
+    class Fail(Stage):
+        closed = None
+
+        def process(self, batch):
+            raise ValueError("bad batch")
+
+        def close(self, ok):
+            self.closed = ok
+
+    for threaded in (True, False):
+        failing = Fail()
+        pipeline = Pipeline(XmlSource(sample_xml, 1), [failing, Collect()], 1, threaded)
+        try:
+            pipeline.run()
+        except ValueError as exc:
+            assert str(exc) == "bad batch"
+        else:
+            raise AssertionError("the stage error was swallowed")
+        assert failing.closed is False
+
+
+def test_run_etl_loads_the_configured_database_only(tmp_path, sample_xml):
+    database_path = str(tmp_path / "etl.sqlite3")
+    api_path, api_pool = db.DATABASE_PATH, db._pool
+    config = PipelineConfig(xml_path=sample_xml, database_path=database_path, threaded=False)
+
+    report = run_etl(config, quarantine=False)
+    assert report.inserted == 3
+    # The API's database setting and pool are untouched
+    assert (db.DATABASE_PATH, db._pool) == (api_path, api_pool)
+
+    with closing(sqlite3.connect(database_path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 3
+        assert conn.execute("SELECT SUM(count) FROM daily_rollups").fetchone()[0] == 3
+    # Unchanged source: nothing to do
+    assert run_etl(config, quarantine=False) is None
+
+
+def test_run_etl_rebuild_replaces_the_database(tmp_path, sample_xml):
+    config = PipelineConfig(
+        xml_path=sample_xml, database_path=str(tmp_path / "etl.sqlite3"), threaded=False
+    )
+    run_etl(config, quarantine=False)
+    with closing(db.connect(config.database_path)) as conn, conn:
+        conn.execute("DELETE FROM transactions WHERE id = 1")
+    assert run_etl(config, rebuild=True, quarantine=False).inserted == 3
+
+
+def test_etl_and_initialize_database_store_the_same_types(
+    tmp_path, sample_xml, temp_db, monkeypatch
+):
+    config = PipelineConfig(
+        xml_path=sample_xml, database_path=str(tmp_path / "etl.sqlite3"), threaded=False
+    )
+    run_etl(config, quarantine=False)
+    monkeypatch.setattr(temp_db, "RAW_XML_PATH", sample_xml)
+    temp_db.initialize_database(quarantine=False)
+
+    query = "SELECT transaction_type FROM transactions ORDER BY id"
+    with closing(sqlite3.connect(config.database_path)) as etl, closing(
+        sqlite3.connect(temp_db.DATABASE_PATH)
+    ) as api:
+        etl_types = [row[0] for row in etl.execute(query)]
+        assert etl_types == [row[0] for row in api.execute(query)]
+    assert etl_types == ["money_in", "payment", "otp"]
+
+
+def test_rebuild_with_a_missing_xml_keeps_the_database(
+    tmp_path, sample_xml, temp_db, monkeypatch, caplog
+):
+    config = PipelineConfig(
+        xml_path=sample_xml, database_path=str(tmp_path / "etl.sqlite3"), threaded=False
+    )
+    run_etl(config, quarantine=False)
+    missing = PipelineConfig(
+        xml_path=str(tmp_path / "typo.xml"), database_path=config.database_path, threaded=False
+    )
+    caplog.clear()
+    assert run_etl(missing, rebuild=True, quarantine=False) is None
+    assert [(r.event, r.levelname) for r in caplog.records] == [("ingest.error", "ERROR")]
+
+    monkeypatch.setattr(temp_db, "RAW_XML_PATH", sample_xml)
+    temp_db.initialize_database(quarantine=False)
+    monkeypatch.setattr(temp_db, "RAW_XML_PATH", str(tmp_path / "typo.xml"))
+    assert temp_db.initialize_database(rebuild=True, quarantine=False) == 0
+
+    for path in (config.database_path, temp_db.DATABASE_PATH):
+        with closing(sqlite3.connect(path)) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 3
@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+
+import pytest
+
+from api.pool import ConnectionPool, PoolTimeout, parse_pragmas
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.sqlite3"), size=2, timeout=0.2)
+    yield pool
+    pool.close()
+
+
+def test_parse_pragmas():
+    assert parse_pragmas(" synchronous=FULL , cache_size=-64000,") == {
+        "synchronous": "FULL",
+        "cache_size": "-64000",
+    }
+    assert parse_pragmas(None) == {}
+    with pytest.raises(ValueError):
+        parse_pragmas("synchronous")
+    with pytest.raises(ValueError):
+        parse_pragmas("drop table=x")
+
+
+def test_pragmas_and_setup_run_on_new_connections(tmp_path):
+    calls = []
+    pool = ConnectionPool(
+        str(tmp_path / "pool.sqlite3"),
+        pragmas={"journal_mode": "WAL", "busy_timeout": "1234"},
+        setup=calls.append,
+    )
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+    assert calls == [conn]
+    assert isinstance(conn.execute("SELECT 1 AS one").fetchone(), sqlite3.Row)
+    conn.close()
+    pool.close()
+
+
+def test_close_returns_the_connection_for_reuse(pool):
+    first = pool.acquire()
+    first.close()
+    second = pool.acquire()
+    assert second is first
+    second.close()
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"], stats["open"], stats["idle"]) == (1, 1, 1, 1)
+
+
+def test_release_rolls_back_an_open_transaction(pool):
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    assert conn.in_transaction
+    conn.close()
+    again = pool.acquire()
+    assert not again.in_transaction
+    assert again.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    again.close()
+
+
+def test_exhausted_pool_times_out(pool):
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+    for conn in held:
+        conn.close()
+
+
+def test_waiter_gets_a_released_connection(pool):
+    held = [pool.acquire(), pool.acquire()]
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    held[0].close()
+    waiter.join(timeout=2)
+    assert got == [held[0]]
+    assert pool.stats()["waits"] == 1
+    got[0].close()
+    held[1].close()
+
+
+def test_closed_pool_closes_returned_connections(pool):
+    conn = pool.acquire()
+    idle = pool.acquire()
+    idle.close()
+    pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        pool.acquire()
+    conn.close()
+    assert pool.stats()["open"] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
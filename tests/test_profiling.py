@@ -0,0 +1,68 @@
+import cProfile
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import profiling
+from api.profiling import ProfiledRoute, ProfileMiddleware, ProfileSession
+
+
+@pytest.fixture
+def profiled_client(tmp_path):
+    app = FastAPI()
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(
+        ProfileMiddleware, directory=str(tmp_path), authorize=lambda header: header == "admin"
+    )
+
+    @app.get("/work")
+    def work():
+        return {"total": sum(range(1000))}
+
+    return TestClient(app), tmp_path
+
+
+def test_flagged_admin_request_is_profiled(profiled_client):
+    client, directory = profiled_client
+    response = client.get("/work", headers={"X-Profile": "1", "Authorization": "admin"})
+    assert response.status_code == 200
+    name = response.headers["X-Profile-File"]
+    assert name in os.listdir(directory)
+    summary = (directory / name.replace(".pstats", ".txt")).read_text()
+    assert summary.startswith("GET /work -> 200")
+
+
+def test_unflagged_or_unauthorized_requests_are_not_profiled(profiled_client):
+    client, directory = profiled_client
+    assert "X-Profile-File" not in client.get("/work", headers={"Authorization": "admin"}).headers
+    assert "X-Profile-File" not in client.get("/work?profile=1").headers
+    assert os.listdir(directory) == []
+
+
+class BusyProfile(cProfile.Profile):
+    """What Python 3.12+ does when another profiler is already active."""
+
+    def enable(self, *args, **kwargs):
+        raise ValueError("Another profiling tool is already active")
+
+
+def test_request_runs_unprofiled_when_another_profiler_is_active(profiled_client, monkeypatch):
+    client, directory = profiled_client
+    monkeypatch.setattr(profiling.cProfile, "Profile", BusyProfile)
+    response = client.get("/work", headers={"X-Profile": "1", "Authorization": "admin"})
+    assert response.status_code == 200
+    assert response.json() == {"total": 499500}
+    assert "X-Profile-File" not in response.headers
+    assert os.listdir(directory) == []
+
+
+def test_nested_profile_blocks_skip_a_busy_profiler(monkeypatch):
+    session = ProfileSession("GET", "/", "")
+    with session.profile():
+        monkeypatch.setattr(profiling.cProfile, "Profile", BusyProfile)
+        with session.profile():
+            pass
+    assert session.profiled
+    assert len(session._profiles) == 1
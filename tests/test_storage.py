@@ -0,0 +1,116 @@
+import json
+import re
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from api import storage
+from api.db import to_row, transform_item
+from dsa.data_loader import build_transaction
+
+
+SMS = {
+    "date": "1715351458724",
+    "readable_date": "10 May 2024 4:30:58 PM",
+    "address": "M-Money",
+    "body": (
+        "You have received 2000 RWF from Jane Smith (*********013) on your mobile money "
+        "account at 2024-05-10 16:30:51. Message from sender: . Your new balance:2000 RWF. "
+        "Financial Transaction Id: 76662021700."
+    ),
+}
+
+
+def sample_row(mode, row_id=1, sms=SMS):
+    """INSERT_SQL tuple for SMS, stored in `mode`."""
+    values = list(to_row(transform_item(build_transaction(row_id, sms))))
+    return storage.encode_row(_decoded_values(values), mode)
+
+
+def _decoded_values(values):
+    # to_row encodes for api.db.STORAGE_MODE (full in the tests): take the plain values back
+    values[storage.RAW_JSON] = json.loads(values[storage.RAW_JSON])
+    return values
+
+
+def decode(row):
+    return storage.decode_raw_json(
+        row[storage.RAW_JSON],
+        row[storage.SMS_BODY],
+        row[storage.SMS_DATE],
+        row[storage.READABLE_DATE],
+        row[storage.SMS_ADDRESS],
+    )
+
+
+@pytest.mark.parametrize("mode", ["compact", "compressed"])
+def test_compact_raw_json_round_trips(mode):
+    full = sample_row("full")
+    encoded = sample_row(mode)
+
+    assert isinstance(encoded[storage.RAW_JSON], bytes)
+    assert storage.decode_body(encoded[storage.SMS_BODY]) == full[storage.SMS_BODY]
+    assert decode(encoded) == full[storage.RAW_JSON]
+
+
+def test_raw_json_not_matching_its_columns_is_kept_in_full():
+    values = _decoded_values(list(sample_row("full")))
+    values[storage.RAW_JSON] = dict(values[storage.RAW_JSON], raw_body="edited elsewhere")
+    encoded = storage.encode_row(values, "compact")
+    assert encoded[storage.RAW_JSON] == json.dumps(values[storage.RAW_JSON])
+
+
+def test_compression_dictionary_holds_no_numbers():
+    assert not re.search(rb"\d{5,}", storage.ZDICTS[storage.COMPRESSION_VERSION])
+
+
+def plain_connection(db):
+    # Like the sqlite3 CLI or a BI tool: none of our SQL functions registered
+    return closing(sqlite3.connect(db.DATABASE_PATH))
+
+
+def test_full_mode_schema_needs_no_custom_functions(temp_db):
+    temp_db.ensure_table()
+    with plain_connection(temp_db) as conn, conn:
+        conn.execute(temp_db.INSERT_SQL, sample_row("full"))
+        conn.execute("UPDATE transactions SET contact_name = 'Jane' WHERE id = 1")
+        hits = conn.execute(
+            "SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH 'received'"
+        ).fetchall()
+        assert hits == [(1,)]
+        assert conn.execute("SELECT message FROM transactions_text").fetchone() == (None,)
+        conn.execute("DELETE FROM transactions WHERE id = 1")
+
+
+def test_compact_mode_switches_search_sql_and_back(temp_db, monkeypatch):
+    monkeypatch.setattr(temp_db, "STORAGE_MODE", "compact")
+    temp_db.ensure_table()
+    temp_db._insert_rows([sample_row("compact")])
+    with plain_connection(temp_db) as conn:
+        with pytest.raises(sqlite3.OperationalError, match="momo_body"):
+            conn.execute("DELETE FROM transactions WHERE id = 1")
+
+    monkeypatch.setattr(temp_db, "STORAGE_MODE", "full")
+    temp_db.migrate_storage("full", vacuum=False)
+    with plain_connection(temp_db) as conn, conn:
+        assert conn.execute(
+            "SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH 'received'"
+        ).fetchall() == [(1,)]
+        conn.execute("DELETE FROM transactions WHERE id = 1")
+
+
+@pytest.mark.parametrize("mode", ["full", "compact"])
+def test_api_decodes_rows_only_when_they_may_be_encoded(temp_db, monkeypatch, mode):
+    from fastapi.testclient import TestClient
+
+    from api import app as app_module
+
+    monkeypatch.setattr(temp_db, "STORAGE_MODE", mode)
+    monkeypatch.setattr(app_module, "STORAGE_MODE", mode)
+    app_module.response_cache.invalidate()
+    with TestClient(app_module.app) as client:
+        assert ("momo_" in app_module.ROW_SELECT) == (mode != "full")
+        first = client.get("/transactions/1", auth=("admin", "secret")).json()
+    assert isinstance(first["sms_body"], str)
+    assert first["raw_json"]["raw_body"] == first["sms_body"]
@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+
+import pytest
+
+from dsa import telemetry as telemetry_module
+from dsa.data_loader import iter_transactions_from_xml, load_data_from_xml
+from dsa.telemetry import IngestTelemetry, configure_ingest_logging
+
+
+@pytest.fixture
+def ingest_logger():
+    """The momo.ingest logger, with its handlers and level put back afterwards."""
+    logger = telemetry_module.logger
+    handlers, level = logger.handlers[:], logger.level
+    logger.handlers = []
+    yield logger
+    for handler in logger.handlers:
+        if handler not in handlers:
+            handler.close()
+    logger.handlers, logger.level = handlers, level
+
+
+def test_telemetry_counts_a_run(sample_xml):
+    telemetry = IngestTelemetry("test", sample_xml)
+    records = list(iter_transactions_from_xml(sample_xml, telemetry))
+    summary = telemetry.finish()
+
+    assert records == load_data_from_xml(sample_xml)
+    assert summary["status"] == "ok"
+    assert summary["counters"] == {
+        "messages_seen": 3,
+        "messages_parsed": 3,
+        "unknown_type": 0,
+        "missing_tx_id": 1,
+        "rows_inserted": 0,
+        "quarantined": 0,
+        "bytes_read": os.path.getsize(sample_xml),
+    }
+    assert set(summary["stage_seconds"]) == {"parse", "extract"}
+
+
+def test_without_a_log_path_json_goes_to_stderr(ingest_logger, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(telemetry_module, "DEFAULT_SUMMARY_DIR", str(tmp_path))
+    configure_ingest_logging(None)
+    configure_ingest_logging(None)
+    assert len(ingest_logger.handlers) == 2
+
+    summary = IngestTelemetry("test", "sample.xml").finish("up_to_date")
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert [line["event"] for line in lines] == ["ingest.start", "ingest.summary"]
+    assert lines[0]["message"] == "test: loading sample.xml"
+    assert os.listdir(tmp_path) == ["etl_summary.json"]
+    with open(tmp_path / "etl_summary.json", encoding="utf-8") as f:
+        assert json.load(f)["run_id"] == summary["run_id"]
+
+
+def test_log_path_adds_json_lines_and_summary(ingest_logger, sample_xml, tmp_path):
+    log_path = str(tmp_path / "logs" / "etl.log")
+    configure_ingest_logging(log_path)
+    configure_ingest_logging(log_path)
+    assert len(ingest_logger.handlers) == 3
+    assert type(ingest_logger.handlers[0]) is logging.StreamHandler
+
+    telemetry = IngestTelemetry("test", sample_xml)
+    summary = telemetry.finish()
+    with open(log_path, encoding="utf-8") as f:
+        events = [json.loads(line)["event"] for line in f]
+    assert events == ["ingest.start", "ingest.progress", "ingest.summary"]
+    with open(tmp_path / "logs" / "etl_summary.json", encoding="utf-8") as f:
+        assert json.load(f)["run_id"] == summary["run_id"]
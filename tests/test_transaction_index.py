@@ -0,0 +1,122 @@
+import pytest
+
+from dsa.transaction_index import TransactionIndex
+
+
+FIELDS = ("id", "tx_id", "sms_address", "type", "timestamp_ms", "amount")
+RECORDS = [
+    dict(zip(FIELDS, values))
+    for values in [
+        (1, "A", "M-Money", "payment", 100, 500),
+        (2, "B", "M-Money", "money_in", 200, 1500),
+        (3, "C", "Bank", "payment", 300, 2500),
+        (4, None, "M-Money", "payment", 400, None),
+        (5, "E", "M-Money", "payment", 300, 1500),
+    ]
+]
+
+
+def ids(records, key="id"):
+    return [record[key] for record in records]
+
+
+def brute_force(records, equals, ranges):
+    def keep(record):
+        if any(record.get(k) != v for k, v in equals.items()):
+            return False
+        for key, (low, high) in ranges.items():
+            value = record.get(key)
+            if value is None:
+                return False
+            if (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+    return sorted(r["id"] for r in records if keep(r))
+
+
+@pytest.fixture
+def index():
+    return TransactionIndex(RECORDS)
+
+
+def test_hash_lookup(index):
+    assert ids(index.query(equals={"tx_id": "C"})) == [3]
+    assert ids(index.query(equals={"type": "payment"})) == [1, 3, 4, 5]
+    assert index.query(equals={"tx_id": "missing"}) == []
+
+
+def test_none_values_are_not_indexed(index):
+    assert index.query(equals={"tx_id": None}) == []
+    assert 4 not in ids(index.query(ranges={"amount": (None, None)}))
+
+
+def test_range_bounds_are_inclusive(index):
+    assert ids(index.query(ranges={"amount": (1500, 2500)})) == [2, 3, 5]
+    assert ids(index.query(ranges={"timestamp_ms": (300, 300)})) == [3, 5]
+    assert ids(index.query(ranges={"timestamp_ms": (None, 200)})) == [1, 2]
+    assert ids(index.query(ranges={"timestamp_ms": (301, None)})) == [4]
+    assert index.query(ranges={"amount": (3000, 1000)}) == []
+
+
+def test_intersection_matches_brute_force(index):
+    cases = [
+        ({"type": "payment", "sms_address": "M-Money"}, {}),
+        ({"type": "payment"}, {"amount": (1000, None)}),
+        ({"sms_address": "M-Money"}, {"timestamp_ms": (150, 350), "amount": (None, 1500)}),
+        ({}, {"id": (2, 4), "timestamp_ms": (200, None)}),
+        ({"type": "money_in"}, {"amount": (2000, None)}),
+    ]
+    for equals, ranges in cases:
+        assert ids(index.query(equals, ranges)) == brute_force(RECORDS, equals, ranges)
+
+
+def test_results_are_in_id_order_and_limited(index):
+    # Walked off the amount array (not in id order), then sorted
+    assert ids(index.query(ranges={"amount": (1500, 1500)})) == [2, 5]
+    assert ids(index.query(equals={"type": "payment"}, limit=2)) == [1, 3]
+    assert ids(index.query(ranges={"id": (2, None)}, limit=2)) == [2, 3]
+
+
+def test_unknown_key_raises(index):
+    with pytest.raises(KeyError):
+        index.query(equals={"amount": 500})
+
+
+def test_update_moves_only_changed_keys(index):
+    index.update(3, {"type": "money_in", "amount": 100})
+    assert ids(index.query(equals={"type": "money_in"})) == [2, 3]
+    assert ids(index.query(ranges={"amount": (None, 499)})) == [3]
+    assert index.query(ranges={"amount": (2500, 2500)}) == []
+    assert index.get(3)["sms_address"] == "Bank"
+
+
+def test_insert_replaces_and_delete_unindexes(index):
+    index.insert({**RECORDS[0], "tx_id": "A2", "amount": 9000})
+    assert index.query(equals={"tx_id": "A"}) == []
+    assert ids(index.query(ranges={"amount": (9000, None)})) == [1]
+    assert len(index) == 5
+
+    assert index.delete(1)["tx_id"] == "A2"
+    assert index.delete(1) is None
+    assert 1 not in index
+    assert index.query(ranges={"amount": (9000, None)}) == []
+    assert ids(index) == [2, 3, 4, 5]
+
+
+def test_load_replaces_existing_ids(index):
+    assert index.load([{**RECORDS[1], "type": "payment"}, {**RECORDS[0], "id": 6}]) == 2
+    assert ids(index.query(equals={"type": "money_in"})) == []
+    assert ids(index.query(equals={"tx_id": "A"})) == [1, 6]
+    assert index.count(equals={"type": "payment"}) == 6
+    assert index.stats()["records"] == 6
+
+
+def test_custom_keys():
+    index = TransactionIndex(
+        [{"row": 1, "kind": "x", "size": 3}, {"row": 2, "kind": "x", "size": 1}],
+        id_key="row",
+        equality_keys=("kind",),
+        range_keys=("size",),
+    )
+    assert ids(index.query(equals={"kind": "x"}, ranges={"size": (2, None)}), "row") == [1]
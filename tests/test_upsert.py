@@ -0,0 +1,32 @@
+def test_upsert_creates_then_replaces(client, transaction_body):
+    url = "/transactions/by-txid/UPSERT-1"
+    created = client.put(url, json=transaction_body(None, 500))
+    assert created.status_code == 201, created.text
+    row = created.json()
+    assert row["transaction_id"] == "UPSERT-1"
+
+    replaced = client.put(url, json=transaction_body("ignored", 750))
+    assert replaced.status_code == 200, replaced.text
+    assert replaced.json()["id"] == row["id"]
+    assert replaced.json()["transaction_id"] == "UPSERT-1"
+    assert replaced.json()["amount"] == 750
+
+
+def test_upsert_retry_is_idempotent(client, transaction_body):
+    url = "/transactions/by-txid/UPSERT-2"
+    first = client.put(url, json=transaction_body(None, 300))
+    second = client.put(url, json=transaction_body(None, 300))
+    assert (first.status_code, second.status_code) == (201, 200)
+    assert second.json() == first.json()
+
+
+def test_upsert_moving_a_row_refreshes_both_days(client, transaction_body):
+    def day_count(day):
+        params = {"date_from": f"{day}T00:00:00", "date_to": f"{day}T23:59:59"}
+        return sum(bucket["count"] for bucket in client.get("/stats/volume", params=params).json())
+
+    url = "/transactions/by-txid/UPSERT-3"
+    before = day_count("2030-01-01"), day_count("2030-01-02")
+    client.put(url, json=transaction_body(None, sms_date="2030-01-01T09:00:00"))
+    client.put(url, json=transaction_body(None, sms_date="2030-01-02T09:00:00"))
+    assert (day_count("2030-01-01"), day_count("2030-01-02")) == (before[0], before[1] + 1)